@@ -5,19 +5,34 @@ SQLAlchemy ORM Version
 
 import os
 import sys
+import mimetypes
+from urllib.parse import quote as url_quote
 
 # Add the server directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, send_from_directory, jsonify, redirect, request, abort
+from werkzeug.security import safe_join
+from werkzeug.utils import send_from_directory as werkzeug_send_from_directory
 from flask_cors import CORS
 from config import config
-from database import init_db, get_db, engine, Base
+from database import init_db, get_db
+import database
 from routes import register_blueprints
 from auth import admin_required
+from json_provider import FastJSONProvider
+from models.blobs import Blobs
+import assets
+import compression
+import images
+import metrics
+import query_stats
+import slow_queries
+import storage
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='..')
+app.json = FastJSONProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
 
 # Enable CORS
@@ -26,6 +41,21 @@ CORS(app)
 # Register all API blueprints
 register_blueprints(app)
 
+# One pooled connection per request, released on teardown
+database.init_app(app)
+
+# Per-request query counts, Server-Timing and N+1 detection
+query_stats.init_app(app)
+
+# Log slow statements, with sampled EXPLAIN plans
+slow_queries.init_app(app)
+
+# Fingerprint and precompress static assets
+assets.ensure_built(app.static_folder)
+
+# Compress large JSON API responses
+compression.init_app(app)
+
 
 # ==========================================
 # Static File Serving
@@ -35,36 +65,116 @@ register_blueprints(app)
 @app.route('/index.html')
 def serve_index():
     """Serve the main index.html."""
+    page = assets.get_page('index.html')
+    if page:
+        return assets.send_asset(page)
     return send_from_directory(app.static_folder, 'index.html')
 
 
 @app.route('/login.html')
 def serve_login():
     """Serve the login page."""
+    page = assets.get_page('login.html')
+    if page:
+        return assets.send_asset(page)
     return send_from_directory(app.static_folder, 'login.html')
 
 
 @app.route('/uploads/<path:filename>')
 def serve_upload(filename):
     """Serve uploaded files."""
-    return send_from_directory(config.UPLOAD_FOLDER, filename)
+    # Never expose staged (in-progress) uploads, including via '..' segments
+    filename = storage.public_upload_path(filename)
+    if filename is None:
+        return jsonify({'error': 'Not found'}), 404
+    
+    # Flat legacy names may have been moved into the sharded layout
+    filename = storage.resolve_legacy_path(filename)
+    
+    # Files from before object storage was enabled stay on local disk
+    if os.path.isfile(os.path.join(config.UPLOAD_FOLDER, filename)):
+        return send_upload(filename)
+    
+    backend = storage.get_storage()
+    
+    # Image derivatives are generated in the background; until one exists,
+    # serve the original so srcset URLs work straight after upload
+    derivative = images.parse_derivative_path(filename)
+    if derivative and not backend.exists(filename):
+        original = Blobs.get_path(derivative[0])
+        if original:
+            url = backend.download_url(original)
+            if url:
+                return redirect(url)
+            # Not cacheable: the real derivative will appear at this URL later
+            return send_upload(original, cacheable=False)
+    
+    # Object storage: hand the client a presigned URL instead of proxying bytes
+    url = backend.download_url(filename)
+    if url:
+        return redirect(url)
+    
+    return send_upload(filename)
+
+
+def send_upload(filename, cacheable=True):
+    """
+    Send a locally stored upload with ETag/Range support.
+    Content-addressed and uniquely named files are cached as immutable, and
+    with UPLOAD_OFFLOAD set the fronting proxy streams the bytes instead.
+    """
+    immutable = cacheable and storage.is_immutable_path(filename)
+    
+    if config.UPLOAD_OFFLOAD == 'x-accel-redirect':
+        path = safe_join(config.UPLOAD_FOLDER, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        # nginx serves the file (including Range/If-None-Match) from an internal location
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = config.UPLOAD_ACCEL_PREFIX + url_quote(filename)
+    else:
+        response = werkzeug_send_from_directory(
+            config.UPLOAD_FOLDER,
+            filename,
+            request.environ,
+            etag=storage.content_etag(filename) if immutable else True,
+            use_x_sendfile=config.UPLOAD_OFFLOAD == 'x-sendfile',
+            response_class=app.response_class
+        )
+    
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={config.IMMUTABLE_MAX_AGE}, immutable'
+    elif not cacheable:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/css/<path:filename>')
 def serve_css(filename):
     """Serve CSS files."""
+    asset, immutable = assets.lookup(f'css/{filename}')
+    if asset:
+        return assets.send_asset(asset, immutable)
     return send_from_directory(os.path.join(app.static_folder, 'css'), filename)
 
 
 @app.route('/js/<path:filename>')
 def serve_js(filename):
     """Serve JavaScript files."""
+    asset, immutable = assets.lookup(f'js/{filename}')
+    if asset:
+        return assets.send_asset(asset, immutable)
     return send_from_directory(os.path.join(app.static_folder, 'js'), filename)
 
 
 @app.route('/api-client.js')
-def serve_api_client():
+@app.route('/api-client.<digest>.js')
+def serve_api_client(digest=None):
     """Serve the API client JavaScript."""
+    name = f'api-client.{digest}.js' if digest else 'api-client.js'
+    asset, immutable = assets.lookup(name)
+    if asset:
+        return assets.send_asset(asset, immutable)
     return send_from_directory(app.static_folder, 'api-client.js')
 
 
@@ -87,16 +197,28 @@ def run_migration():
     """Run database migrations (admin only)."""
     try:
         print('Running migration from web trigger...')
-        # With SQLAlchemy, migrations are handled by create_all or Alembic
-        # This endpoint now just ensures all tables exist
-        Base.metadata.create_all(bind=engine)
-        return jsonify({'success': True, 'message': 'Migration executed successfully'})
+        revision = database.migrate()
+        return jsonify({'success': True, 'message': 'Migration executed successfully', 'revision': revision})
         
     except Exception as e:
         print(f'Migration error: {e}')
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/admin/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """Get in-process metrics and pool occupancy for the worker that serves the request (admin only)."""
+    return jsonify({**metrics.snapshot(), 'db_pool': database.pool_stats()})
+
+
+@app.route('/api/admin/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    """Get recent slow queries (and sampled plans) seen by the worker that serves the request (admin only)."""
+    return jsonify({'pid': os.getpid(), 'threshold_ms': config.SLOW_QUERY_MS, 'queries': slow_queries.recent()})
+
+
 # ==========================================
 # Error Handlers
 # ==========================================
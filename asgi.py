@@ -0,0 +1,318 @@
+"""
+ASGI entry point for Knowledge Repository (experimental)
+Serves the read-heavy GET endpoints (article list, single article, search,
+favorites) with SQLAlchemy asyncio, so one process multiplexes hundreds of
+concurrent readers over a small connection pool instead of holding a thread
+per request. Responses match the Flask routes, except that a non-numeric
+filter is a 400 here rather than a database error. Every other request goes
+to the Flask app through a2wsgi when it is installed; without it, route only
+the paths above to this server and the rest to gunicorn (app:app).
+
+Not part of the default deployment: the dockerfile runs gunicorn app:app,
+and the per-request SQL instrumentation (query_stats, slow_queries) only
+covers requests the Flask app serves.
+
+Needs an async driver: asyncpg for PostgreSQL (DATABASE_URL is rewritten
+to postgresql+asyncpg:// unless ASYNC_DATABASE_URL is set), aiosqlite for
+SQLite.
+
+Usage:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+    # or under gunicorn with the uvicorn worker
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn --config gunicorn.conf.py asgi:app
+"""
+
+import re
+import itertools
+from urllib.parse import parse_qsl
+from werkzeug.http import parse_accept_header, parse_cookie
+from sqlalchemy import select, or_, case, bindparam
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from config import config
+from auth import verify_token
+from json_provider import dumps_bytes
+from models.orm import Article, ArticleTag, Category, Department, UserFavorite
+from models.articles import Articles, _BY_ID, _INCREMENT_VIEWS
+import compression
+import database
+import metrics
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # a2wsgi is optional - only the async read routes are served
+    WSGIMiddleware = None
+
+# Everything Article.to_dict() touches, loaded up front: lazy loads cannot
+# run under asyncio, and this also replaces the per-article relation queries
+_ARTICLE_RELATIONS = (
+    joinedload(Article.category),
+    joinedload(Article.department),
+    joinedload(Article.priority),
+    selectinload(Article.article_tags).joinedload(ArticleTag.tag),
+    selectinload(Article.attachments)
+)
+_ARTICLE_BY_ID = _BY_ID.options(*_ARTICLE_RELATIONS)
+
+# One query instead of three per favorite
+_USER_FAVORITES = (
+    select(UserFavorite.article_id, UserFavorite.created_at, Article.title, Article.summary,
+           Category.name, Department.name)
+    .join(Article, Article.id == UserFavorite.article_id)
+    .outerjoin(Category, Category.id == Article.category_id)
+    .outerjoin(Department, Department.id == Article.department_id)
+    .where(UserFavorite.user_id == bindparam('user_id'))
+    .order_by(UserFavorite.created_at.desc())
+)
+
+# Created on first use, inside the worker process and its event loop
+_primary = None
+_replicas = []
+_replica_cycle = itertools.count()
+
+
+class HTTPError(Exception):
+    """Error response raised by a handler."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the read handlers use."""
+
+    def __init__(self, scope):
+        self.method = scope['method']
+        self.path = scope['path']
+        # First value wins, as with Flask's request.args.get()
+        self.args = dict(reversed(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True)))
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.cookies = parse_cookie(self.headers.get('cookie', ''))
+
+
+def _engines():
+    global _primary, _replicas
+
+    if _primary is None:
+        _primary = database.create_async_engine_for(config.ASYNC_DATABASE_URL or config.DATABASE_URL)
+        _replicas = [database.create_async_engine_for(url) for url in config.DATABASE_REPLICA_URLS]
+    return _primary, _replicas
+
+
+async def _read(request, work):
+    """
+    Run `await work(db)` in a read session: on a replica (round robin) unless
+    the client is pinned to the primary after a write, retrying on the
+    primary when the replica cannot be reached.
+    """
+    primary, replicas = _engines()
+    engine = primary
+    if replicas and database.PIN_COOKIE not in request.cookies:
+        engine = replicas[next(_replica_cycle) % len(replicas)]
+        metrics.increment('db.replica.checkouts')
+
+    try:
+        async with AsyncSession(engine) as db:
+            return await work(db)
+    except (OperationalError, InterfaceError, OSError):  # asyncpg raises OSError when it cannot connect
+        if engine is primary:
+            raise
+        metrics.increment('db.replica.fallbacks')
+
+    async with AsyncSession(primary) as db:
+        return await work(db)
+
+
+def _int_arg(request, name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(400, f'Invalid {name}')
+
+
+async def get_articles(request):
+    """GET /api/articles with optional category/department/priority filters."""
+    query = select(Article).options(*_ARTICLE_RELATIONS)
+    for name, column in (
+        ('category_id', Article.category_id),
+        ('department_id', Article.department_id),
+        ('priority_id', Article.priority_id)
+    ):
+        value = _int_arg(request, name)
+        if value is not None:
+            query = query.where(column == value)
+    query = query.order_by(Article.updated_at.desc())
+
+    async def work(db):
+        articles = (await db.execute(query)).scalars().all()
+        return [a.to_dict() for a in articles]
+
+    return await _read(request, work)
+
+
+async def get_article(request, id):
+    """GET /api/articles/<id>; the view count is bumped on the primary."""
+    async def work(db):
+        article = (await db.execute(_ARTICLE_BY_ID, {'id': id})).scalars().first()
+        return article.to_dict() if article else None
+
+    article = await _read(request, work)
+    if article is None:
+        raise HTTPError(404, 'Article not found')
+
+    primary, _ = _engines()
+    async with AsyncSession(primary) as db:
+        await db.execute(_INCREMENT_VIEWS, {'article_id': id})
+        await db.commit()
+    return article
+
+
+async def search_articles(request):
+    """GET /api/articles/search?q=, ranked and with snippets as in Articles.search()."""
+    search_term = request.args.get('q', '')
+    if not search_term:
+        return []
+    pattern = f'%{search_term}%'
+
+    async def work(db):
+        article_match, attachment_match = await db.run_sync(Articles._match_conditions, search_term, pattern)
+        rank = case((article_match, 1), else_=0)
+        articles = (await db.execute(
+            select(Article).options(*_ARTICLE_RELATIONS)
+            .where(or_(article_match, attachment_match))
+            .order_by(rank.desc(), Article.updated_at.desc())
+        )).scalars().all()
+
+        result = []
+        attachment_only = []
+        for article in articles:
+            article_dict = article.to_dict()
+            article_dict['snippet'] = Articles._generate_snippet(article_dict, search_term)
+            article_dict['matchField'] = Articles._get_match_field(article_dict, search_term)
+            if article_dict['matchField'] == 'unknown':
+                attachment_only.append(article_dict)
+            result.append(article_dict)
+
+        if attachment_only:
+            await db.run_sync(Articles._add_attachment_snippets, attachment_only, search_term, pattern)
+        return result
+
+    return await _read(request, work)
+
+
+async def get_favorites(request):
+    """GET /api/favorites for the bearer token's user."""
+    auth_header = request.headers.get('authorization', '')
+    if not auth_header.startswith('Bearer '):
+        raise HTTPError(401, 'Access denied')
+    payload = verify_token(auth_header[7:])
+    if not payload:
+        raise HTTPError(403, 'Invalid or expired token')
+
+    async def work(db):
+        rows = await db.execute(_USER_FAVORITES, {'user_id': payload.get('id')})
+        return [
+            {
+                'article_id': article_id,
+                'created_at': created_at,
+                'title': title,
+                'summary': summary,
+                'category': category,
+                'department': department
+            }
+            for article_id, created_at, title, summary, category, department in rows
+        ]
+
+    return await _read(request, work)
+
+
+ROUTES = (
+    (re.compile(r'/api/articles'), get_articles),
+    (re.compile(r'/api/articles/search'), search_articles),
+    (re.compile(r'/api/articles/(\d+)'), get_article),
+    (re.compile(r'/api/favorites'), get_favorites)
+)
+
+
+def _match(method, path):
+    if method not in ('GET', 'HEAD'):
+        return None
+    for pattern, handler in ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            return handler, [int(arg) for arg in match.groups()]
+    return None
+
+
+async def _send_json(send, request, payload, status=200):
+    body = dumps_bytes(payload)
+    headers = [(b'content-type', b'application/json')]
+    if 'origin' in request.headers:
+        headers.append((b'access-control-allow-origin', b'*'))  # as flask-cors does for the Flask routes
+    if status == 200 and config.COMPRESSION_ENABLED:
+        headers.append((b'vary', b'Accept-Encoding'))
+        encoding, body = compression.encode_body(
+            body, parse_accept_header(request.headers.get('accept-encoding')), cacheable=True
+        )
+        if encoding is not None:
+            headers.append((b'content-encoding', encoding.encode('ascii')))
+    headers.append((b'content-length', str(len(body)).encode('ascii')))
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if request.method == 'HEAD' else body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _primary is not None:
+                for engine in [_primary] + _replicas:
+                    await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def _flask_fallback():
+    if WSGIMiddleware is None:
+        return None
+    from app import app as flask_app
+    # Flask requests run on a thread pool sized like a gthread worker, whatever
+    # GUNICORN_WORKER_CLASS says (sync would leave a single thread)
+    return WSGIMiddleware(flask_app, workers=config.WEB_THREADS)
+
+
+_fallback = _flask_fallback()
+
+
+async def app(scope, receive, send):
+    """ASGI application."""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    route = _match(scope['method'], scope['path']) if scope['type'] == 'http' else None
+    if route is None:
+        if _fallback is not None:
+            await _fallback(scope, receive, send)
+        elif scope['type'] == 'http':
+            await _send_json(send, Request(scope), {'error': 'Not found'}, 404)
+        return
+
+    handler, args = route
+    request = Request(scope)
+    metrics.increment('asgi.reads')
+    try:
+        payload, status = await handler(request, *args), 200
+    except HTTPError as e:
+        payload, status = {'error': str(e)}, e.status
+    except Exception as e:
+        payload, status = {'error': str(e)}, 500
+    await _send_json(send, request, payload, status)
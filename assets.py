@@ -0,0 +1,201 @@
+"""
+Static asset pipeline for Knowledge Repository
+Fingerprints CSS/JS filenames by content hash, precomputes gzip and brotli
+variants, and rewrites HTML pages to reference the fingerprinted names so
+browsers can cache assets forever.
+
+Usage (optional, the server also builds on startup):
+    python assets.py
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+from flask import request, send_file
+from config import config
+
+try:
+    import brotli
+except ImportError:  # brotli is optional - gzip variants are still served
+    brotli = None
+
+# Directories (relative to the static folder) whose files are fingerprinted
+ASSET_DIRS = ('css', 'js')
+ROOT_ASSETS = ('api-client.js',)
+HTML_PAGES = ('index.html', 'login.html')
+
+# Only text assets benefit from compression
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# src="css/app.css", href="/js/x.js?v=2", ...
+_REFERENCE_RE = re.compile(r'''((?:src|href)\s*=\s*["'])(/?)([^"'?#]+)(\?[^"'#]*)?(["'])''')
+
+
+class Asset:
+    """A static file with its content hash and precompressed variants."""
+
+    def __init__(self, logical, source, digest, mimetype):
+        self.logical = logical
+        self.source = source
+        self.digest = digest
+        self.mimetype = mimetype
+        self.variants = {'identity': source}
+
+    @property
+    def fingerprinted(self):
+        root, ext = os.path.splitext(self.logical)
+        return f'{root}.{self.digest}{ext}'
+
+
+_manifest = {}        # logical path -> Asset
+_fingerprinted = {}   # fingerprinted path -> Asset
+_pages = {}           # html page name -> Asset (rewritten copy)
+_built = False
+_build_lock = threading.Lock()
+
+
+def _write_atomic(path, data):
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _compress_variants(asset, data):
+    """Write gzip/brotli copies into the cache folder (skipped when already built)."""
+    if not asset.mimetype.startswith(COMPRESSIBLE_TYPES):
+        return
+
+    base = os.path.join(config.ASSET_CACHE_FOLDER, asset.digest)
+    encoders = {'gzip': ('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        encoders['br'] = ('.br', lambda d: brotli.compress(d, quality=11))
+
+    for encoding, (suffix, encode) in encoders.items():
+        path = base + suffix
+        if not os.path.exists(path):
+            _write_atomic(path, encode(data))
+        asset.variants[encoding] = path
+
+
+def _register(static_folder, logical):
+    source = os.path.join(static_folder, *logical.split('/'))
+    mimetype = mimetypes.guess_type(logical)[0] or 'application/octet-stream'
+    with open(source, 'rb') as f:
+        data = f.read()
+
+    asset = Asset(logical, source, hashlib.sha256(data).hexdigest()[:12], mimetype)
+    _compress_variants(asset, data)
+    _manifest[logical] = asset
+    _fingerprinted[asset.fingerprinted] = asset
+
+
+def _rewrite_html(html):
+    """Point src/href attributes at fingerprinted asset names."""
+    def replace(match):
+        prefix, slash, path, _, quote = match.groups()
+        asset = _manifest.get(path)
+        if not asset:
+            return match.group(0)
+        return f'{prefix}{slash}{asset.fingerprinted}{quote}'
+    return _REFERENCE_RE.sub(replace, html)
+
+
+def _register_page(static_folder, name):
+    source = os.path.join(static_folder, name)
+    with open(source, 'r', encoding='utf-8') as f:
+        data = _rewrite_html(f.read()).encode('utf-8')
+
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    rewritten = os.path.join(config.ASSET_CACHE_FOLDER, f'{digest}.html')
+    if not os.path.exists(rewritten):
+        _write_atomic(rewritten, data)
+
+    page = Asset(name, rewritten, digest, 'text/html')
+    _compress_variants(page, data)
+    _pages[name] = page
+
+
+def build(static_folder):
+    """Scan the static folder and (re)build the manifest and compressed variants."""
+    global _built
+
+    with _build_lock:
+        _manifest.clear()
+        _fingerprinted.clear()
+        _pages.clear()
+        os.makedirs(config.ASSET_CACHE_FOLDER, exist_ok=True)
+
+        for directory in ASSET_DIRS:
+            for dirpath, _, files in os.walk(os.path.join(static_folder, directory)):
+                for name in files:
+                    full = os.path.join(dirpath, name)
+                    _register(static_folder, os.path.relpath(full, static_folder).replace(os.sep, '/'))
+
+        for name in ROOT_ASSETS:
+            if os.path.isfile(os.path.join(static_folder, name)):
+                _register(static_folder, name)
+
+        # Pages last, so their references can be rewritten
+        for name in HTML_PAGES:
+            if os.path.isfile(os.path.join(static_folder, name)):
+                _register_page(static_folder, name)
+
+        _built = True
+    return len(_manifest)
+
+
+def ensure_built(static_folder):
+    if not _built and config.ASSET_PIPELINE:
+        try:
+            build(static_folder)
+        except OSError as e:
+            print(f'Asset pipeline disabled: {e}')
+
+
+def lookup(path):
+    """Return (asset, immutable) for a requested asset path, or (None, False)."""
+    asset = _fingerprinted.get(path)
+    if asset:
+        return asset, True
+    return _manifest.get(path), False
+
+
+def get_page(name):
+    return _pages.get(name)
+
+
+def send_asset(asset, immutable=False):
+    """Send the best precompressed variant the client accepts."""
+    encoding = 'identity'
+    for candidate in ('br', 'gzip'):
+        if candidate in asset.variants and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+
+    response = send_file(
+        asset.variants[encoding],
+        mimetype=asset.mimetype,
+        etag=f'{asset.digest}-{encoding}',
+        max_age=config.IMMUTABLE_MAX_AGE if immutable else None
+    )
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    if len(asset.variants) > 1:
+        response.vary.add('Accept-Encoding')
+
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={config.IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        # Unversioned names must be revalidated (cheap 304 via ETag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+if __name__ == '__main__':
+    static = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    count = build(static)
+    print(f'Built {count} assets and {len(_pages)} pages into {config.ASSET_CACHE_FOLDER}')
@@ -3,16 +3,24 @@ Authentication utilities for Knowledge Repository
 JWT token handling and password hashing compatible with the Node.js version
 """
 
+import os
 import hashlib
 import secrets
+import threading
 import time
 import base64
 import hmac
 import json
+from concurrent.futures import ProcessPoolExecutor
 from functools import wraps
 from flask import request, jsonify, g
 from config import config
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows - the hashing limit is then per process
+    fcntl = None
+
 
 def base64url_encode(data: bytes) -> str:
     """Encode bytes to base64url string (no padding)."""
@@ -94,20 +102,120 @@ def verify_token(token: str) -> dict | None:
         return None
 
 
-def hash_password(password: str) -> str:
-    """
-    Hash a password using PBKDF2 compatible with the Node.js implementation.
-    Returns format: salt:hash
-    """
-    salt = secrets.token_hex(16)
-    hash_bytes = hashlib.pbkdf2_hmac(
+# Iteration count used by the Node.js implementation. Hashes created with it
+# keep the plain salt:hash format; other counts are stored as salt:hash:iterations.
+LEGACY_HASH_ITERATIONS = 10000
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing executor is saturated and the request should be retried."""
+    pass
+
+
+_hash_executor = None
+_hash_executor_pid = None
+_hash_slots = threading.BoundedSemaphore(max(1, config.PASSWORD_HASH_MAX_CONCURRENCY))
+_hash_executor_lock = threading.Lock()
+
+# How often a waiting request retries the host-wide slot locks
+_HASH_SLOT_POLL = 0.01
+
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    """Compute the PBKDF2-SHA512 digest (runs inside the hashing pool)."""
+    return hashlib.pbkdf2_hmac(
         'sha512',
         password.encode(),
         salt.encode(),
-        10000,
+        iterations,
         dklen=64
-    )
-    return f"{salt}:{hash_bytes.hex()}"
+    ).hex()
+
+
+def _get_hash_executor():
+    """Get the per-process hashing pool, recreating it after a fork."""
+    global _hash_executor, _hash_executor_pid
+    
+    if config.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    
+    with _hash_executor_lock:
+        if _hash_executor is None or _hash_executor_pid != os.getpid():
+            _hash_executor = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS)
+            _hash_executor_pid = os.getpid()
+        return _hash_executor
+
+
+def _acquire_hash_slot():
+    """
+    Take one of PASSWORD_HASH_MAX_CONCURRENCY host-wide hashing slots, waiting
+    up to the queue timeout. A slot is an exclusive flock on one of N files in
+    PASSWORD_HASH_SLOT_DIR, so the limit holds across all gunicorn workers.
+    Returns a release callable, or None when no slot freed up in time.
+    """
+    if fcntl is None:
+        if not _hash_slots.acquire(timeout=config.PASSWORD_HASH_QUEUE_TIMEOUT):
+            return None
+        return _hash_slots.release
+    
+    os.makedirs(config.PASSWORD_HASH_SLOT_DIR, exist_ok=True)
+    slots = max(1, config.PASSWORD_HASH_MAX_CONCURRENCY)
+    deadline = time.monotonic() + config.PASSWORD_HASH_QUEUE_TIMEOUT
+    while True:
+        for slot in range(slots):
+            fd = os.open(os.path.join(config.PASSWORD_HASH_SLOT_DIR, f'slot-{slot}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return lambda: os.close(fd)  # closing the descriptor drops the lock
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(_HASH_SLOT_POLL)
+
+
+def _run_pbkdf2(password: str, salt: str, iterations: int) -> str:
+    """
+    Run PBKDF2 under the host-wide concurrency limit, in the hashing pool
+    when one is configured. The calling thread waits for the result either way.
+    Raises PasswordHashingBusy if no slot frees up within the queue timeout.
+    """
+    release = _acquire_hash_slot()
+    if release is None:
+        raise PasswordHashingBusy('Password hashing capacity exceeded')
+    try:
+        executor = _get_hash_executor()
+        if executor is None:
+            return _pbkdf2(password, salt, iterations)
+        return executor.submit(_pbkdf2, password, salt, iterations).result()
+    finally:
+        release()
+
+
+def _parse_password_hash(stored: str):
+    """Split a stored hash into (salt, hash, iterations)."""
+    parts = stored.split(':')
+    if len(parts) == 2:
+        return parts[0], parts[1], LEGACY_HASH_ITERATIONS
+    if len(parts) == 3:
+        return parts[0], parts[1], int(parts[2])
+    raise ValueError('Invalid password hash format')
+
+
+def hash_password(password: str, iterations: int = None) -> str:
+    """
+    Hash a password using PBKDF2 compatible with the Node.js implementation.
+    Returns format: salt:hash (or salt:hash:iterations for non-default cost)
+    """
+    if iterations is None:
+        iterations = config.PASSWORD_HASH_ITERATIONS
+    
+    salt = secrets.token_hex(16)
+    hash_hex = _run_pbkdf2(password, salt, iterations)
+    if iterations == LEGACY_HASH_ITERATIONS:
+        return f"{salt}:{hash_hex}"
+    return f"{salt}:{hash_hex}:{iterations}"
 
 
 def verify_password(password: str, stored: str) -> bool:
@@ -116,15 +224,18 @@ def verify_password(password: str, stored: str) -> bool:
     Compatible with the Node.js implementation.
     """
     try:
-        salt, stored_hash = stored.split(':')
-        hash_bytes = hashlib.pbkdf2_hmac(
-            'sha512',
-            password.encode(),
-            salt.encode(),
-            10000,
-            dklen=64
-        )
-        return hash_bytes.hex() == stored_hash
+        salt, stored_hash, iterations = _parse_password_hash(stored)
+    except Exception:
+        return False
+    
+    hash_hex = _run_pbkdf2(password, salt, iterations)
+    return hmac.compare_digest(hash_hex, stored_hash)
+
+
+def password_needs_rehash(stored: str) -> bool:
+    """Check whether a stored hash was created with a different iteration count."""
+    try:
+        return _parse_password_hash(stored)[2] != config.PASSWORD_HASH_ITERATIONS
     except Exception:
         return False
 
@@ -0,0 +1,98 @@
+"""
+JSON serialization benchmark for Knowledge Repository
+Times jsonify of an article-list payload with Flask's default provider
+(isoformat() strings, as the models used to produce) against FastJSONProvider
+(raw datetimes, orjson when installed)
+
+Usage:
+    python benchmarks/json_serialization.py --articles 5000 --rounds 20
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from json_provider import FastJSONProvider, orjson
+
+
+def make_articles(count, iso):
+    """Build article dicts shaped like Article.to_dict() output."""
+    now = datetime.utcnow()
+    stamp = (lambda d: d.isoformat()) if iso else (lambda d: d)
+    content = '<p>' + 'נוהל עבודה לדוגמה עם תוכן HTML ארוך. ' * 40 + '</p>'
+    articles = []
+    for i in range(count):
+        created = now - timedelta(minutes=i)
+        articles.append({
+            'id': i,
+            'title': f'מאמר מספר {i}',
+            'summary': 'תקציר קצר של המאמר',
+            'content': content,
+            'category_id': i % 6,
+            'department_id': i % 6,
+            'priority_id': i % 4,
+            'author': 'user@example.com',
+            'author_id': '1',
+            'views': i * 3,
+            'created_at': stamp(created),
+            'updated_at': stamp(created),
+            'category_name': 'נהלים',
+            'department_name': 'תפעול',
+            'priority_name': 'גבוהה',
+            'priority_color': '#E74C5C',
+            'priority_level': 3,
+            'tags': [{'id': 1, 'name': 'tag', 'created_by': None, 'created_at': stamp(created)}],
+            'attachments': []
+        })
+    return articles
+
+
+def bench(provider_class, articles, rounds, build=None):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        best = float('inf')
+        size = 0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            payload = build() if build else articles
+            response = jsonify(payload)
+            best = min(best, time.perf_counter() - start)
+            size = len(response.get_data())
+    return best * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON provider benchmark')
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    raw = make_articles(args.articles, iso=False)
+
+    # Baseline pays for isoformat() in to_dict plus the stdlib encoder
+    baseline_ms, baseline_size = bench(
+        DefaultJSONProvider, None, args.rounds,
+        build=lambda: [
+            {**a, 'created_at': a['created_at'].isoformat(), 'updated_at': a['updated_at'].isoformat(),
+             'tags': [{**t, 'created_at': t['created_at'].isoformat()} for t in a['tags']]}
+            for a in raw
+        ]
+    )
+    fast_ms, fast_size = bench(FastJSONProvider, raw, args.rounds)
+
+    engine = 'orjson' if orjson is not None else 'stdlib fallback'
+    print(f'{args.articles} articles, best of {args.rounds} rounds')
+    print(f'Default provider + isoformat: {baseline_ms:8.1f} ms  {baseline_size / 1024:8.0f} KB')
+    print(f'FastJSONProvider ({engine}):  {fast_ms:8.1f} ms  {fast_size / 1024:8.0f} KB')
+    print(f'Speedup: {baseline_ms / fast_ms:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Login load test for Knowledge Repository
+Fires concurrent POST /api/auth/login requests and reports latency percentiles
+
+Usage:
+    python benchmarks/login_load.py --url http://localhost:5000 \
+        --email user@example.com --password secret --concurrency 32 --requests 2000
+"""
+
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+def login_once(url, body):
+    """Send one login request and return (status, latency_ms)."""
+    request = urllib.request.Request(
+        f'{url}/api/auth/login',
+        data=body,
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError:
+        status = 0
+    return status, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login endpoint load test')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    body = json.dumps({'email': args.email, 'password': args.password}).encode()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: login_once(args.url, body), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(ms for _, ms in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f'Requests:    {args.requests} (concurrency {args.concurrency})')
+    print(f'Throughput:  {args.requests / elapsed:.1f} req/s')
+    print(f'Latency p50: {percentile(latencies, 50):.1f} ms')
+    print(f'Latency p95: {percentile(latencies, 95):.1f} ms')
+    print(f'Latency p99: {percentile(latencies, 99):.1f} ms')
+    print(f'Statuses:    {statuses}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Query construction overhead benchmark for Knowledge Repository
+Times hot model lookups written with the legacy Query API (built and
+compiled-cache-keyed on every call) against the prebuilt statements the
+models now use, on an in-memory SQLite database so Python-side overhead
+dominates
+
+Usage:
+    python benchmarks/query_overhead.py --calls 20000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, SessionLocal, engine
+from models.orm import User, Category, Tag, Article
+import models.articles
+import models.categories
+import models.tags
+import models.users
+
+
+def setup():
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    db.add_all([Category(name=f'category {i}') for i in range(6)])
+    db.add_all([Tag(name=f'tag{i}') for i in range(20)])
+    db.add(User(email='user@example.com', password_hash='x'))
+    db.add(Article(title='article'))
+    db.commit()
+    return db
+
+
+def cases(db):
+    """(name, legacy Query call, prebuilt statement call)"""
+    return [
+        ('Articles.get_by_id',
+         lambda: db.query(Article).filter_by(id=1).first(),
+         lambda: db.execute(models.articles._BY_ID, {'id': 1}).scalars().first()),
+        ('Users.get_by_email',
+         lambda: db.query(User).filter_by(email='user@example.com').first(),
+         lambda: db.execute(models.users._BY_EMAIL, {'email': 'user@example.com'}).scalars().first()),
+        ('Categories.get_all',
+         lambda: db.query(Category).order_by(Category.name).all(),
+         lambda: db.execute(models.categories._ALL).scalars().all()),
+        ('Tags.get_by_name',
+         lambda: db.query(Tag).filter_by(name='tag7').first(),
+         lambda: db.execute(models.tags._BY_NAME, {'name': 'tag7'}).scalars().first()),
+    ]
+
+
+def per_call_us(fn, calls):
+    for _ in range(min(calls, 500)):  # warm the compiled-statement cache
+        fn()
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query construction overhead benchmark')
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    db = setup()
+    print(f'{args.calls} calls each, in-memory SQLite')
+    print(f'{"lookup":<22} {"Query API":>12} {"prebuilt":>12} {"speedup":>8}')
+    for name, legacy, prebuilt in cases(db):
+        before = per_call_us(legacy, args.calls)
+        after = per_call_us(prebuilt, args.calls)
+        print(f'{name:<22} {before:9.1f} us {after:9.1f} us {before / after:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Upload directory layout benchmark for Knowledge Repository
+Compares file lookup (stat) and listing cost of a flat uploads directory
+against the sharded two-level layout
+
+Usage:
+    python benchmarks/upload_lookup.py --files 1000000 --dir /tmp/upload-bench
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import legacy_shard_path
+
+
+def populate(root, names, sharded):
+    for name in names:
+        relpath = legacy_shard_path(name) if sharded else name
+        path = os.path.join(root, *relpath.split('/'))
+        if sharded:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+
+
+def time_lookups(root, names, sharded, samples):
+    picks = random.sample(names, min(samples, len(names)))
+    start = time.perf_counter()
+    for name in picks:
+        relpath = legacy_shard_path(name) if sharded else name
+        os.stat(os.path.join(root, *relpath.split('/')))
+    return (time.perf_counter() - start) / len(picks) * 1e6
+
+
+def time_listing(root, sharded):
+    start = time.perf_counter()
+    count = 0
+    if sharded:
+        for _, _, files in os.walk(root):
+            count += len(files)
+    else:
+        with os.scandir(root) as entries:
+            count = sum(1 for _ in entries)
+    return time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flat vs sharded uploads layout')
+    parser.add_argument('--files', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=10_000)
+    parser.add_argument('--dir', default='/tmp/upload-layout-bench')
+    args = parser.parse_args()
+
+    names = [f'{int(time.time() * 1000)}-{uuid.uuid4()}.pdf' for _ in range(args.files)]
+
+    for sharded in (False, True):
+        label = 'sharded' if sharded else 'flat'
+        root = os.path.join(args.dir, label)
+        shutil.rmtree(root, ignore_errors=True)
+        os.makedirs(root)
+
+        start = time.perf_counter()
+        populate(root, names, sharded)
+        create_s = time.perf_counter() - start
+
+        lookup_us = time_lookups(root, names, sharded, args.samples)
+        list_s, count = time_listing(root, sharded)
+
+        print(f'{label:8} files={count:>9}  create={create_s:7.1f}s  '
+              f'stat={lookup_us:6.1f}us  full listing={list_s:6.2f}s')
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Gunicorn worker class comparison for Knowledge Repository
+Starts the app under each worker configuration against the same database,
+drives GET load at a fixed client concurrency and reports throughput and
+latency percentiles
+
+Usage:
+    python benchmarks/worker_classes.py --sqlite /tmp/worker-bench.db --articles 200 \
+        --workers 2 --configs sync,gthread:8,gevent --concurrency 32 --requests 3000
+    # or against an existing database (DATABASE_URL from the environment)
+    python benchmarks/worker_classes.py --path /api/articles/stats
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from login_load import percentile
+
+
+def seed_sqlite(path, articles):
+    """Create a fresh SQLite database with `articles` tagged articles."""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    code = (
+        'from database import init_db, get_db\n'
+        'from models.articles import Articles\n'
+        'init_db()\n'
+        f'for i in range({articles}):\n'
+        '    Articles.create({"title": f"Article {i}", "summary": "Summary", '
+        '"content": "<p>" + "Body text " * 200 + "</p>", "tags": [f"tag{i % 10}", "common"]})\n'
+    )
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{path}'}
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return env['DATABASE_URL']
+
+
+def get_once(url):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError:
+        status = 0
+    return status, (time.perf_counter() - start) * 1000
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if get_once(url)[0] == 200:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def run_config(name, threads, args, database_url):
+    port = str(args.port)
+    env = {
+        **os.environ,
+        'DATABASE_URL': database_url,
+        'PORT': port,
+        'GUNICORN_WORKERS': str(args.workers),
+        'GUNICORN_WORKER_CLASS': name,
+        'GUNICORN_THREADS': str(threads),
+        'GUNICORN_WORKER_CONNECTIONS': str(args.concurrency),
+        'LOG_LEVEL': 'warning',
+        'SQL_INSTRUMENTATION': 'false',
+        'SLOW_QUERY_MS': '0'
+    }
+    server = subprocess.Popen(
+        ['gunicorn', '--config', 'gunicorn.conf.py', '--access-logfile', '/dev/null', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}{args.path}'
+    try:
+        if not wait_ready(url):
+            return None
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda _: get_once(url), range(args.concurrency * 2)))  # warm up
+            start = time.perf_counter()
+            results = list(pool.map(lambda _: get_once(url), range(args.requests)))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(ms for status, ms in results if status == 200)
+    errors = sum(1 for status, _ in results if status != 200)
+    return {
+        'rps': len(results) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gunicorn worker class comparison')
+    parser.add_argument('--configs', default='sync,gthread:4,gthread:8,gevent',
+                        help='comma-separated worker classes, gthread:<threads> for thread count')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--path', default='/api/articles')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--sqlite', help='seed a fresh SQLite database at this path instead of using DATABASE_URL')
+    parser.add_argument('--articles', type=int, default=100)
+    args = parser.parse_args()
+
+    database_url = seed_sqlite(args.sqlite, args.articles) if args.sqlite else os.environ['DATABASE_URL']
+
+    print(f'GET {args.path}, {args.workers} workers, {args.concurrency} clients, {args.requests} requests')
+    print(f'{"worker class":<14} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for spec in args.configs.split(','):
+        name, _, threads = spec.partition(':')
+        threads = int(threads or 1)
+        result = run_config(name, threads, args, database_url)
+        label = f'{name}:{threads}' if name == 'gthread' else name
+        if result is None:
+            print(f'{label:<14} failed to start')
+            continue
+        print(f'{label:<14} {result["rps"]:8.0f} {result["p50"]:8.1f} {result["p99"]:8.1f} {result["errors"]:7d}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+API response compression for Knowledge Repository
+Negotiates zstd/brotli/gzip for large JSON responses, optionally caching
+compressed bodies so repeated GETs are not recompressed
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import request
+from config import config
+import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional
+    zstandard = None
+
+
+def _encoders():
+    """Available encoders in server preference order."""
+    encoders = []
+    if zstandard is not None:
+        encoders.append(('zstd', lambda data: zstandard.ZstdCompressor(level=config.COMPRESSION_LEVEL_ZSTD).compress(data)))
+    if brotli is not None:
+        encoders.append(('br', lambda data: brotli.compress(data, quality=config.COMPRESSION_LEVEL_BROTLI)))
+    encoders.append(('gzip', lambda data: gzip.compress(data, compresslevel=config.COMPRESSION_LEVEL_GZIP)))
+    return encoders
+
+
+_ENCODERS = _encoders()
+
+# (body digest, encoding) -> compressed bytes, least recently used first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _negotiate(accept_encodings):
+    """Pick the preferred encoding the client accepts, or None."""
+    best, best_quality = None, 0
+    for name, encode in _ENCODERS:
+        quality = accept_encodings[name]
+        if quality > best_quality:
+            best, best_quality = (name, encode), quality
+    return best
+
+
+def _compress(data, encoding, encode, cacheable):
+    if not cacheable or config.COMPRESSION_CACHE_ENTRIES <= 0:
+        return encode(data)
+
+    key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            metrics.increment('compression.cache_hits')
+            return cached
+
+    compressed = encode(data)
+    with _cache_lock:
+        _cache[key] = compressed
+        while len(_cache) > config.COMPRESSION_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return compressed
+
+
+def encode_body(data, accept_encodings, cacheable):
+    """
+    Compress a JSON body with the best encoding in `accept_encodings`
+    (a parsed Accept-Encoding header). Returns (encoding, body), or
+    (None, data) when the body is small or the client accepts no encoding.
+    """
+    if len(data) < config.COMPRESSION_MIN_SIZE:
+        return None, data
+
+    negotiated = _negotiate(accept_encodings)
+    if negotiated is None:
+        return None, data
+    encoding, encode = negotiated
+
+    compressed = _compress(data, encoding, encode, cacheable)
+
+    metrics.increment('compression.responses')
+    metrics.increment('compression.bytes_in', len(data))
+    metrics.increment('compression.bytes_out', len(compressed))
+    metrics.increment('compression.bytes_saved', len(data) - len(compressed))
+    return encoding, compressed
+
+
+def compress_response(response):
+    """after_request hook: compress large JSON API responses."""
+    if (
+        not request.path.startswith('/api/')
+        or response.mimetype != 'application/json'
+        or response.status_code != 200
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    cacheable = request.method == 'GET' and 'Set-Cookie' not in response.headers
+    encoding, body = encode_body(response.get_data(), request.accept_encodings, cacheable)
+    if encoding is None:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    if config.COMPRESSION_ENABLED:
+        app.after_request(compress_response)
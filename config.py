@@ -4,6 +4,8 @@ Configuration management for Knowledge Repository Flask Backend
 
 import os
 import secrets
+import tempfile
+import multiprocessing
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,6 +17,50 @@ class Config:
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://localhost/knowledge_repo')
     
+    # Connection pool (per worker process). 'queue' keeps a local pool; 'pgbouncer'
+    # opens a connection per checkout (NullPool) and leaves pooling to PgBouncer
+    DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'queue').lower()
+    # Same variables and defaults as gunicorn.conf.py
+    WEB_WORKERS = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+    WEB_WORKER_CLASS = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+    WEB_THREADS = int(os.getenv('GUNICORN_THREADS', '4'))
+    # Requests one worker serves at once; async workers are capped at 10 concurrent DB users
+    WEB_CONCURRENCY = {'sync': 1, 'gthread': WEB_THREADS}.get(WEB_WORKER_CLASS, 10)
+    DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', '0'))  # budget across all workers, 0 = no cap
+    # One per in-flight request, +1 for background workers: 2 for sync, threads + 1
+    # for gthread (5 with the default 4 threads), 11 for gevent
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', str(WEB_CONCURRENCY + 1)))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '3'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # seconds; replaces per-checkout pre-ping
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'false').lower() == 'true'
+    
+    # Read replicas (comma-separated URLs) for GET requests; empty = primary only
+    DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+    REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))  # reads stay on the primary this long after a write
+    REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', '30'))  # a failed replica is skipped this long
+    
+    # Optional ASGI read path (asgi.py). Empty URL = DATABASE_URL with asyncpg
+    # (PostgreSQL) or aiosqlite (SQLite) swapped in as the driver
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', '')
+    ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', '20'))  # per process, shared by all coroutines
+    
+    # Per-request SQL instrumentation (query count/time, Server-Timing, N+1 detection)
+    SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', 'true').lower() == 'true'
+    SQL_LOG_REQUESTS = os.getenv('SQL_LOG_REQUESTS', 'false').lower() == 'true'  # log every request, not only flagged ones
+    SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', '5'))  # same statement this often in one request = N+1
+    SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', '0'))  # default max queries per request, 0 = unlimited
+    SQL_STRICT = os.getenv('SQL_STRICT', 'false').lower() == 'true'  # raise instead of logging (for tests)
+    
+    # Slow-query log with sampled EXPLAIN (ANALYZE, BUFFERS) of slow SELECTs
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '500'))  # 0 = disabled
+    SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', '0'))  # fraction of slow SELECTs to explain
+    SLOW_QUERY_EXPLAIN_TIMEOUT = int(os.getenv('SLOW_QUERY_EXPLAIN_TIMEOUT', '10'))  # seconds, EXPLAIN ANALYZE reruns the query
+    SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', '')  # rotating JSON-lines file; empty = stdout
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', '5'))
+    SLOW_QUERY_RECENT = int(os.getenv('SLOW_QUERY_RECENT', '50'))  # entries kept for /api/admin/slow-queries
+    
     # JWT Secret - use env variable or generate a secure random one
     JWT_SECRET = os.getenv('JWT_SECRET', secrets.token_hex(64))
     JWT_EXPIRY_HOURS = int(os.getenv('JWT_EXPIRY_HOURS', '24'))
@@ -23,16 +69,63 @@ class Config:
     PORT = int(os.getenv('PORT', '3000'))
     DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
     
+    # Password hashing (PBKDF2-SHA512, Node.js-compatible salt:hash format)
+    PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '10000'))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))  # 0 = hash on the request thread
+    # Hashes running at once across ALL workers on the host (flock slots in
+    # PASSWORD_HASH_SLOT_DIR); excess logins wait up to the queue timeout, then get 503
+    PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv('PASSWORD_HASH_MAX_CONCURRENCY', str(multiprocessing.cpu_count())))
+    PASSWORD_HASH_SLOT_DIR = os.getenv('PASSWORD_HASH_SLOT_DIR', os.path.join(tempfile.gettempdir(), 'knowledge-repo-hash-slots'))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '2'))
+    
+    # Static assets: fingerprinted, precompressed copies of css/js/html
+    ASSET_PIPELINE = os.getenv('ASSET_PIPELINE', 'true').lower() == 'true'
+    ASSET_CACHE_FOLDER = os.path.join(os.path.dirname(__file__), '.asset-cache')
+    IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60  # one year, for content-hashed URLs
+    
+    # API response compression (zstd/brotli used when installed, gzip always)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))  # bytes
+    COMPRESSION_LEVEL_GZIP = int(os.getenv('COMPRESSION_LEVEL_GZIP', '6'))
+    COMPRESSION_LEVEL_BROTLI = int(os.getenv('COMPRESSION_LEVEL_BROTLI', '4'))
+    COMPRESSION_LEVEL_ZSTD = int(os.getenv('COMPRESSION_LEVEL_ZSTD', '3'))
+    COMPRESSION_CACHE_ENTRIES = int(os.getenv('COMPRESSION_CACHE_ENTRIES', '128'))  # 0 = no caching
+    
     # File uploads
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
-    MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20MB max file size
+    MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20MB max request body (single upload or one chunk)
+    MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', str(2 * 1024 * 1024 * 1024)))  # per-file limit for resumable uploads
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # suggested chunk size for resumable uploads
+    UPLOAD_COMPLETION_WORKERS = int(os.getenv('UPLOAD_COMPLETION_WORKERS', '2'))  # hash/store finished uploads; 0 = on the request thread
+    UPLOAD_COMPLETION_TIMEOUT = int(os.getenv('UPLOAD_COMPLETION_TIMEOUT', '3600'))  # seconds before a 'processing' session counts as interrupted
+    UPLOAD_GC_GRACE_HOURS = int(os.getenv('UPLOAD_GC_GRACE_HOURS', '24'))  # unreferenced files younger than this are kept
+    
+    # Let a fronting proxy stream uploads: '' (Python sends bytes), 'x-sendfile' or 'x-accel-redirect'
+    UPLOAD_OFFLOAD = os.getenv('UPLOAD_OFFLOAD', '').lower()
+    UPLOAD_ACCEL_PREFIX = os.getenv('UPLOAD_ACCEL_PREFIX', '/_protected_uploads/')  # nginx internal location
     
-    # S3 (optional)
+    # Image derivatives (resized WebP variants for inline images, needs Pillow)
+    IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in os.getenv('IMAGE_DERIVATIVE_WIDTHS', '320,640,1024,1600').split(',') if w]
+    IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', '2'))
+    IMAGE_WEBP_QUALITY = int(os.getenv('IMAGE_WEBP_QUALITY', '80'))
+    
+    # Attachment text extraction for search (PDF needs pypdf)
+    EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '1'))  # 0 = disabled
+    EXTRACTION_TIMEOUT = float(os.getenv('EXTRACTION_TIMEOUT', '30'))  # seconds per file
+    EXTRACTION_MAX_CHARS = int(os.getenv('EXTRACTION_MAX_CHARS', '200000'))
+    
+    # S3 (optional) - S3_ENDPOINT may point at any S3-compatible store (MinIO, moto server)
     S3_BUCKET = os.getenv('S3_BUCKET')
     S3_REGION = os.getenv('S3_REGION', 'us-east-1')
     S3_ENDPOINT = os.getenv('S3_ENDPOINT')
     S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID')
     S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY')
+    S3_KEY_PREFIX = os.getenv('S3_KEY_PREFIX', 'uploads/')
+    S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+    S3_PRESIGN_EXPIRY = int(os.getenv('S3_PRESIGN_EXPIRY', '3600'))  # seconds
+    
+    # Attachment storage backend: 'local' or 's3' (defaults to s3 when a bucket is set)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 's3' if S3_BUCKET else 'local')
 
 
 config = Config()
@@ -2,29 +2,188 @@
 SQLAlchemy database configuration for Knowledge Repository
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
+import time
+import uuid
+import itertools
+import threading
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import create_engine, event, inspect, make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 from config import config
+import metrics
 
-# Create engine from DATABASE_URL
-engine = create_engine(
-    config.DATABASE_URL,
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True,
-    echo=config.DEBUG  # Log SQL in debug mode
+
+def _pool_limits():
+    """(pool_size, max_overflow) for this worker, capped by DB_MAX_CONNECTIONS across all workers."""
+    size, overflow = config.DB_POOL_SIZE, config.DB_MAX_OVERFLOW
+    if config.DB_MAX_CONNECTIONS > 0:
+        per_worker = max(1, config.DB_MAX_CONNECTIONS // max(1, config.WEB_WORKERS))
+        size = min(size, per_worker)
+        overflow = max(0, min(overflow, per_worker - size))
+        if size + overflow < config.WEB_CONCURRENCY:
+            print(f'⚠️  DB_MAX_CONNECTIONS={config.DB_MAX_CONNECTIONS} leaves {size + overflow} connections per '
+                  f'{config.WEB_WORKER_CLASS} worker for {config.WEB_CONCURRENCY} concurrent requests; '
+                  f'requests will wait up to DB_POOL_TIMEOUT for a connection')
+    return size, overflow
+
+
+# Applied to every SQLite connection
+SQLITE_PRAGMAS = (
+    'journal_mode=WAL',       # readers do not block the writer (no-op for :memory:)
+    'synchronous=NORMAL',     # durable with WAL; fsync only at checkpoints
+    'foreign_keys=ON',        # enforce ON DELETE CASCADE / SET NULL like PostgreSQL
+    'busy_timeout=5000',      # wait for a concurrent writer instead of failing
+    'cache_size=-65536',      # 64 MB page cache
+    'temp_store=MEMORY',
+    'mmap_size=268435456'     # 256 MB memory-mapped reads
 )
 
+
+def _sqlite_options(url):
+    """Engine options for SQLite: a shared single connection for :memory:, a small pool for files."""
+    options = {'echo': config.DEBUG, 'connect_args': {'check_same_thread': False}}
+    if url.database in (None, '', ':memory:'):
+        options['poolclass'] = StaticPool
+    else:
+        pool_size, max_overflow = _pool_limits()
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=config.DB_POOL_TIMEOUT)
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f'PRAGMA {pragma}')
+    cursor.close()
+
+
+def _engine_options(url):
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        return _sqlite_options(url)
+    
+    options = {
+        'echo': config.DEBUG,  # Log SQL in debug mode
+        'pool_pre_ping': config.DB_POOL_PRE_PING
+    }
+    if config.DB_POOL_MODE == 'pgbouncer':
+        # PgBouncer owns the pool; holding idle connections here would pin server slots
+        options['poolclass'] = NullPool
+    else:
+        pool_size, max_overflow = _pool_limits()
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE
+        )
+    return options
+
+
+# Create engine from DATABASE_URL
+engine = create_engine(config.DATABASE_URL, **_engine_options(config.DATABASE_URL))
+
+
+# Optional read replicas, load-balanced round robin
+replica_engines = [create_engine(url, **_engine_options(url)) for url in config.DATABASE_REPLICA_URLS]
+_replica_cycle = itertools.count()
+_replica_down_until = {}  # replica index -> time.monotonic() when it may be retried
+_replica_lock = threading.Lock()
+
+# Cookie marking a client that wrote recently, so its reads see its own writes
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _count_connect(dbapi_connection, connection_record):
+    metrics.increment('db.pool.connects')
+
+
+for _engine in [engine] + replica_engines:
+    event.listen(_engine, 'connect', _count_connect)
+    if _engine.dialect.name == 'sqlite':
+        event.listen(_engine, 'connect', _set_sqlite_pragmas)
+
+
+class RetryingSession(Session):
+    """
+    Session that retries a statement once when it failed because the server
+    dropped the connection (restart, failover, idle timeout). Only the first
+    statement of a transaction is retried, so no earlier work is lost.
+    Stands in for pool_pre_ping, which costs a round trip on every checkout.
+    """
+    
+    def execute(self, statement, *args, **kwargs):
+        fresh = not self.in_transaction()
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except DBAPIError as e:
+            if not (fresh and e.connection_invalidated):
+                raise
+            metrics.increment('db.reconnects')
+            self.rollback()
+            return super().execute(statement, *args, **kwargs)
+
+
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RetryingSession)
 
 # Declarative base for ORM models
 Base = declarative_base()
 
 
+class RequestSession(RetryingSession):
+    """
+    Session shared by every model call in one request, bound to a single
+    pooled connection. close() only ends the caller's transaction (rolling
+    back anything it did not commit); the connection is returned to the pool
+    on app-context teardown.
+    """
+    
+    def close(self):
+        self.rollback()
+    
+    def release(self):
+        super().close()
+    
+    def commit(self):
+        super().commit()
+        g.db_wrote = True
+
+
+class ReplicaSession(RequestSession):
+    """
+    Request-scoped read session bound to a replica connection. If the replica
+    fails on the first statement of a transaction, it is marked down and the
+    session moves to a primary connection and retries.
+    """
+    
+    replica = None
+    
+    def execute(self, statement, *args, **kwargs):
+        fresh = not self.in_transaction()
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except (OperationalError, InterfaceError):
+            if not fresh or self.replica is None:
+                raise
+            _mark_replica_down(self.replica)
+            self.rollback()
+            g.pop('read_db_connection').close()
+            self.bind = g.read_db_connection = _checkout()
+            self.replica = None
+            return super().execute(statement, *args, **kwargs)
+
+
 def get_db():
     """
     Get a database session.
+    Inside a request this is the request-scoped session, so all model calls
+    in the request share one pooled connection. Outside (scripts, background
+    workers) it is a new standalone session.
     Usage:
         db = get_db()
         try:
@@ -32,6 +191,13 @@ def get_db():
         finally:
             db.close()
     """
+    if has_app_context():
+        db = g.get('db')
+        if db is None:
+            g.db_connection = _checkout()
+            db = g.db = RequestSession(bind=g.db_connection, autoflush=False)
+        return db
+    
     db = SessionLocal()
     try:
         return db
@@ -40,11 +206,212 @@ def get_db():
         raise
 
 
-def init_db():
-    """Initialize database tables from ORM models."""
+def _mark_replica_down(index):
+    with _replica_lock:
+        _replica_down_until[index] = time.monotonic() + config.REPLICA_RETRY_SECONDS
+    metrics.increment('db.replica.failures')
+
+
+def _replica_checkout():
+    """(index, connection) for the next healthy replica, or None when none is usable."""
+    count = len(replica_engines)
+    start = next(_replica_cycle)
+    for offset in range(count):
+        index = (start + offset) % count
+        with _replica_lock:
+            if _replica_down_until.get(index, 0) > time.monotonic():
+                continue
+        try:
+            return index, replica_engines[index].connect()
+        except (OperationalError, InterfaceError, PoolTimeoutError):
+            _mark_replica_down(index)
+    return None
+
+
+def get_read_db():
+    """
+    Get a session for read-only queries.
+    GET requests are served from a replica when DATABASE_REPLICA_URLS is set,
+    unless the client wrote within REPLICA_PIN_SECONDS (read-your-writes) or no
+    replica is reachable. Everything else gets the primary session from get_db().
+    Usage is the same as get_db().
+    """
+    if (
+        not replica_engines
+        or not has_request_context()
+        or request.method not in SAFE_METHODS
+        or PIN_COOKIE in request.cookies
+    ):
+        return get_db()
+    
+    db = g.get('read_db')
+    if db is None:
+        checkout = _replica_checkout()
+        if checkout is None:
+            metrics.increment('db.replica.fallbacks')
+            return get_db()
+        index, g.read_db_connection = checkout
+        db = g.read_db = ReplicaSession(bind=g.read_db_connection, autoflush=False)
+        db.replica = index
+        metrics.increment('db.replica.checkouts')
+    return db
+
+
+def _checkout():
+    """Check out the request's connection, recording how long the pool made us wait."""
+    start = time.perf_counter()
+    try:
+        connection = engine.connect()
+    except PoolTimeoutError:
+        metrics.increment('db.pool.timeouts')
+        raise
+    metrics.increment('db.pool.checkouts')
+    metrics.increment('db.pool.wait_ms', round((time.perf_counter() - start) * 1000, 3))
+    return connection
+
+
+def _describe_pool(pool):
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(0, pool.overflow())
+        )
+    return stats
+
+
+def pool_stats():
+    """Current pool occupancy for this worker process (primary, then each replica)."""
+    stats = {'mode': config.DB_POOL_MODE, **_describe_pool(engine.pool)}
+    if replica_engines:
+        now = time.monotonic()
+        with _replica_lock:
+            down = dict(_replica_down_until)
+        stats['replicas'] = [
+            {**_describe_pool(replica.pool), 'healthy': down.get(index, 0) <= now}
+            for index, replica in enumerate(replica_engines)
+        ]
+    return stats
+
+
+def pin_after_write(response):
+    """after_request hook: keep a client that just wrote on the primary for a while."""
+    if replica_engines and g.get('db_wrote') and request.method not in SAFE_METHODS:
+        response.set_cookie(
+            PIN_COOKIE, '1', max_age=config.REPLICA_PIN_SECONDS,
+            httponly=True, samesite='Lax', secure=request.is_secure
+        )
+    return response
+
+
+def close_request_db(exc=None):
+    """Release the request-scoped sessions and their connections (teardown hook)."""
+    for session_key, connection_key in (('db', 'db_connection'), ('read_db', 'read_db_connection')):
+        db = g.pop(session_key, None)
+        connection = g.pop(connection_key, None)
+        if db is not None:
+            db.release()
+        if connection is not None:
+            connection.close()
+
+
+def init_app(app):
+    """Register request-scoped session cleanup and replica pinning on the Flask app."""
+    app.after_request(pin_after_write)
+    app.teardown_appcontext(close_request_db)
+
+
+# Async drivers substituted into sync URLs for the ASGI read path (asgi.py)
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_database_url(url):
+    """`url` with an asyncio driver; URLs that name one explicitly (asyncpg, psycopg 3, aiosqlite) are kept."""
+    url = make_url(url)
+    if '+' in url.drivername and url.get_driver_name() in ('asyncpg', 'psycopg', 'psycopg_async', 'aiosqlite'):
+        return url
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name())
+    if drivername is None:
+        raise ValueError(f'No async driver known for {url.get_backend_name()}; set ASYNC_DATABASE_URL')
+    return url.set(drivername=drivername)
+
+
+def create_async_engine_for(url):
+    """
+    AsyncEngine for `url` with the same pool mode and SQLite pragmas as the
+    sync engines. Its pool is ASYNC_DB_POOL_SIZE: coroutines only hold a
+    connection while a statement runs, so a few connections serve many readers.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
+    url = async_database_url(url)
+    options = _engine_options(url)
+    if 'pool_size' in options:
+        options['pool_size'] = config.ASYNC_DB_POOL_SIZE
+    if url.get_dialect().driver == 'asyncpg' and config.DB_POOL_MODE == 'pgbouncer':
+        # asyncpg prepares every statement; under transaction-mode PgBouncer the
+        # caches must be off and names unique, or another client's server
+        # connection sees "prepared statement already exists"
+        options['connect_args'] = {
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__'
+        }
+    
+    async_engine = create_async_engine(url, **options)
+    event.listen(async_engine.sync_engine, 'connect', _count_connect)
+    if url.get_backend_name() == 'sqlite':
+        event.listen(async_engine.sync_engine, 'connect', _set_sqlite_pragmas)
+    return async_engine
+
+
+# Revision that matches the schema create_all produced before migrations existed
+BASELINE_REVISION = '0001'
+
+
+def alembic_config(configure_logger=True):
+    """Alembic configuration for the migrations/ directory next to this file."""
+    from alembic.config import Config as AlembicConfig
+    
+    root = os.path.dirname(os.path.abspath(__file__))
+    cfg = AlembicConfig(os.path.join(root, 'alembic.ini'))
+    cfg.set_main_option('script_location', os.path.join(root, 'migrations'))
+    cfg.attributes['configure_logger'] = configure_logger
+    return cfg
+
+
+def migrate(revision='head', configure_logger=False):
+    """
+    Upgrade the schema to `revision`.
+    An empty database is created from the ORM models and stamped at head; a
+    database created before migrations existed is stamped at the baseline and
+    then upgraded. Returns the revision the database is at afterwards.
+    """
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
     from models.orm import (
         User, Category, Department, Priority, Tag,
-        Article, ArticleTag, Attachment, UserFavorite, RecentlyViewed
+        Article, ArticleTag, Blob, ImageDerivative, Attachment, UploadSession, UserFavorite, RecentlyViewed
     )
-    Base.metadata.create_all(bind=engine)
-    print('✅ Database tables created via SQLAlchemy')
+    
+    cfg = alembic_config(configure_logger)
+    tables = inspect(engine).get_table_names()
+    if 'alembic_version' not in tables:
+        if 'users' not in tables:
+            Base.metadata.create_all(bind=engine)
+            command.stamp(cfg, 'head')
+        else:
+            command.stamp(cfg, BASELINE_REVISION)
+    command.upgrade(cfg, revision)
+    
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def init_db():
+    """Create or upgrade database tables to the latest migration."""
+    current = migrate()
+    print(f'✅ Database schema at revision {current}')
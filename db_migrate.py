@@ -0,0 +1,72 @@
+"""
+Database migration CLI for Knowledge Repository
+Thin wrapper around Alembic that uses DATABASE_URL and knows how to adopt
+databases created before migrations existed.
+
+Usage:
+    python db_migrate.py upgrade [revision]      # default: head
+    python db_migrate.py downgrade <revision>
+    python db_migrate.py current
+    python db_migrate.py history
+    python db_migrate.py revision -m "add articles slug" [--autogenerate]
+    python db_migrate.py stamp <revision>
+    python db_migrate.py upgrade --sql           # print SQL instead of running it
+"""
+
+import os
+import sys
+import argparse
+
+# Add server directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from alembic import command
+import database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Knowledge Repository schema migrations')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    upgrade = subparsers.add_parser('upgrade', help='Upgrade to a revision (default: head)')
+    upgrade.add_argument('revision', nargs='?', default='head')
+    upgrade.add_argument('--sql', action='store_true', help='Print SQL instead of running it')
+    
+    downgrade = subparsers.add_parser('downgrade', help='Downgrade to a revision')
+    downgrade.add_argument('revision')
+    
+    subparsers.add_parser('current', help='Show the current revision')
+    subparsers.add_parser('history', help='List revisions')
+    
+    revision = subparsers.add_parser('revision', help='Create a new revision file')
+    revision.add_argument('-m', '--message', required=True)
+    revision.add_argument('--autogenerate', action='store_true', help='Diff models/orm.py against the database')
+    
+    stamp = subparsers.add_parser('stamp', help='Record a revision without running it')
+    stamp.add_argument('revision')
+    
+    args = parser.parse_args()
+    cfg = database.alembic_config()
+    
+    if args.command == 'upgrade':
+        if args.sql:
+            command.upgrade(cfg, args.revision, sql=True)
+        else:
+            print(f'Database at revision {database.migrate(args.revision, configure_logger=True)}')
+    elif args.command == 'downgrade':
+        command.downgrade(cfg, args.revision)
+    elif args.command == 'current':
+        command.current(cfg, verbose=True)
+    elif args.command == 'history':
+        command.history(cfg)
+    elif args.command == 'revision':
+        command.revision(cfg, message=args.message, autogenerate=args.autogenerate)
+    elif args.command == 'stamp':
+        command.stamp(cfg, args.revision)
+
+
+if __name__ == '__main__':
+    main()
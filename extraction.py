@@ -0,0 +1,196 @@
+"""
+Attachment text extraction for Knowledge Repository
+Pulls plain text out of uploaded documents in the background so article
+search can match on what is inside attachments
+"""
+
+import os
+import re
+import zipfile
+import tempfile
+import threading
+import multiprocessing
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from config import config
+import storage
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf is optional - PDFs are then skipped
+    PdfReader = None
+
+_TEXT_EXTENSIONS = {'.txt', '.md', '.csv', '.json', '.xml', '.html', '.htm', '.log'}
+
+# WordprocessingML namespace, as ElementTree spells tags
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Extractors run in child processes started from a clean forkserver (spawn
+# where unavailable): forking the threaded web or pool worker itself can copy
+# locks held by other threads and deadlock the child
+_process_context = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+
+def document_kind(file_name, mime_type=None):
+    """Classify a file as 'pdf', 'docx' or 'text', or None if unsupported."""
+    ext = os.path.splitext(file_name or '')[1].lower()
+    mime_type = mime_type or ''
+    if ext == '.pdf' or mime_type == 'application/pdf':
+        return 'pdf' if PdfReader is not None else None
+    if ext == '.docx' or mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+        return 'docx'
+    if ext in _TEXT_EXTENSIONS or mime_type.startswith('text/'):
+        return 'text'
+    return None
+
+
+def _extract_pdf(path, max_chars):
+    parts, total = [], 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        total += len(text)
+        if total >= max_chars:
+            break
+    return '\n'.join(parts)
+
+
+def _extract_docx(path, max_chars):
+    # DOCX is zipped XML: paragraphs are <w:p>, text runs are <w:t>. The XML is
+    # streamed and parsing stops once max_chars of text are collected, so a
+    # zip bomb is never fully inflated (the timeout bounds markup-only XML)
+    parts, total = [], 0
+    with zipfile.ZipFile(path) as docx, docx.open('word/document.xml') as member:
+        body = None
+        for event, elem in ElementTree.iterparse(member, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == _W + 'body':
+                    body = elem
+                continue
+            if elem.tag == _W + 't' and elem.text:
+                parts.append(elem.text)
+                total += len(elem.text)
+                if total >= max_chars:
+                    break
+            elif elem.tag in (_W + 'tab', _W + 'p', _W + 'br'):
+                # One separator per gap, so runs of empty paragraphs cost nothing
+                if parts and not parts[-1].isspace():
+                    parts.append('\t' if elem.tag == _W + 'tab' else '\n')
+                if elem.tag == _W + 'p' and body is not None:
+                    body.clear()  # paragraphs already read
+    return ''.join(parts)[:max_chars]
+
+
+def _extract_text(path, max_chars):
+    with open(path, 'rb') as f:
+        data = f.read(max_chars * 4)
+    text = data.decode('utf-8', errors='ignore')
+    return re.sub(r'<[^>]*>', ' ', text)
+
+
+_EXTRACTORS = {'pdf': _extract_pdf, 'docx': _extract_docx, 'text': _extract_text}
+
+
+def _extract_worker(path, kind, max_chars, conn):
+    """Child-process entry point: send back extracted text (or None on failure)."""
+    try:
+        text = _EXTRACTORS[kind](path, max_chars)
+        text = re.sub(r'\s+', ' ', text).strip()[:max_chars]
+        conn.send(text)
+    except Exception:
+        conn.send(None)
+    finally:
+        conn.close()
+
+
+def extract_text(path, kind, timeout=None, max_chars=None):
+    """
+    Extract text from a local file in a child process, killing it after
+    `timeout` seconds so a pathological document cannot stall the pool.
+    Returns the text, or None on failure/timeout.
+    """
+    if timeout is None:
+        timeout = config.EXTRACTION_TIMEOUT
+    if max_chars is None:
+        max_chars = config.EXTRACTION_MAX_CHARS
+
+    parent_conn, child_conn = _process_context.Pipe(duplex=False)
+    process = _process_context.Process(target=_extract_worker, args=(path, kind, max_chars, child_conn), daemon=True)
+    process.start()
+    child_conn.close()
+    try:
+        if parent_conn.poll(timeout):
+            return parent_conn.recv()
+        return None
+    except EOFError:
+        return None
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join(1)
+        parent_conn.close()
+
+
+def _get_executor():
+    """Get the per-process extraction pool, recreating it after a fork."""
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=config.EXTRACTION_WORKERS,
+                thread_name_prefix='text-extraction'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def schedule_extraction(attachment):
+    """Queue text extraction for a newly created attachment dict."""
+    if config.EXTRACTION_WORKERS <= 0 or not attachment.get('sha256'):
+        return
+    kind = document_kind(attachment.get('file_name'), attachment.get('mime_type'))
+    if kind is None:
+        return
+    _get_executor().submit(process_attachment, attachment['id'], attachment['sha256'], attachment['url'], kind)
+
+
+def process_attachment(attachment_id, sha256, url, kind):
+    """Extract and store the text of one attachment (runs in the extraction pool)."""
+    from models.attachments import Attachments
+
+    try:
+        # Identical content was already extracted for another attachment
+        text = Attachments.get_extracted_text_by_blob(sha256)
+        if text is None:
+            relpath = url.rsplit('/uploads/', 1)[-1]
+            local_path = os.path.join(config.UPLOAD_FOLDER, *relpath.split('/'))
+            temp_path = None
+            try:
+                if not os.path.isfile(local_path):
+                    # Object storage: pull a local copy for the extractor
+                    # (a unique file: the same content may be extracted twice at once)
+                    os.makedirs(storage.TEMP_FOLDER, exist_ok=True)
+                    fd, temp_path = tempfile.mkstemp(dir=storage.TEMP_FOLDER, suffix='.extract')
+                    with storage.get_storage().open(relpath) as src, os.fdopen(fd, 'wb') as dst:
+                        while True:
+                            chunk = src.read(storage.CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            dst.write(chunk)
+                    local_path = temp_path
+                text = extract_text(local_path, kind)
+            finally:
+                if temp_path:
+                    storage.discard_temp(temp_path)
+
+        # Store an empty string on failure so the file is not retried forever
+        Attachments.set_extracted_text(attachment_id, text or '')
+    except Exception as e:
+        print(f'Text extraction error for attachment {attachment_id}: {e}')
@@ -0,0 +1,271 @@
+"""
+Upload garbage collector for Knowledge Repository
+Removes attachments that are no longer linked to an article, stored files that
+nothing references any more, and abandoned resumable upload sessions.
+
+Usage:
+    python gc_uploads.py --dry-run          # report only
+    python gc_uploads.py [--grace-hours N]  # delete
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+# Add server directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import exists, func, and_, or_
+from config import config
+from database import get_db
+from models.orm import Article, Attachment, Blob, UploadSession
+from models.upload_sessions import UploadSessions
+import storage
+
+BATCH_SIZE = 500
+
+# Any /uploads/<path> reference inside article HTML (src, href, srcset)
+UPLOAD_REF_RE = re.compile(r'/uploads/([^"\'\s<>)?#]+)')
+
+# Content-addressed blob name, with or without a derivative suffix
+SHA256_RE = re.compile(r'([0-9a-f]{64})')
+
+
+def iter_batches(db, query, id_column):
+    """Yield query results in primary-key order, BATCH_SIZE rows at a time."""
+    last_id = None
+    while True:
+        batch = query
+        if last_id is not None:
+            batch = batch.filter(id_column > last_id)
+        rows = batch.order_by(id_column).limit(BATCH_SIZE).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+class Report:
+    def __init__(self):
+        self.counts = {}
+        self.bytes_freed = 0
+
+    def add(self, kind, size=0):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.bytes_freed += size or 0
+
+    def print(self, dry_run):
+        verb = 'Would remove' if dry_run else 'Removed'
+        for kind, count in sorted(self.counts.items()):
+            print(f'{verb} {count} {kind}')
+        if not self.counts:
+            print('Nothing to collect.')
+        print(f'{"Reclaimable" if dry_run else "Freed"}: {self.bytes_freed / (1024 * 1024):.1f} MB')
+
+
+def collect_content_refs(db):
+    """Referenced upload paths and blob hashes across all article content."""
+    paths, hashes = set(), set()
+    query = db.query(Article.id, Article.content).filter(Article.content.like('%/uploads/%'))
+    for rows in iter_batches(db, query, Article.id):
+        for _, content in rows:
+            for path in UPLOAD_REF_RE.findall(content or ''):
+                paths.add(path)
+                match = SHA256_RE.search(path)
+                if match:
+                    hashes.add(match.group(1))
+    return paths, hashes
+
+
+def collect_orphaned_attachments(db, cutoff, content_paths, report, dry_run):
+    """
+    Delete attachments not linked to any article. Returns {sha256: released}
+    so blob reference counts can be projected in dry-run mode.
+    """
+    released = {}
+    query = db.query(Attachment.id, Attachment.blob_sha256, Attachment.url, Attachment.size).filter(
+        Attachment.article_id.is_(None),
+        Attachment.created_at < cutoff
+    )
+    for rows in iter_batches(db, query, Attachment.id):
+        for id, sha256, url, size in rows:
+            report.add('unlinked attachments')
+            if sha256:
+                released[sha256] = released.get(sha256, 0) + 1
+            else:
+                # Legacy flat file - remove it unless something else points at it
+                name = url.rsplit('/uploads/', 1)[-1]
+                shared = db.query(exists().where(Attachment.url == url, Attachment.id != id)).scalar()
+                if name not in content_paths and not shared:
+                    report.add('legacy files', size)
+                    if not dry_run:
+                        storage.LocalStorage().delete(storage.resolve_legacy_path(name))
+
+        if not dry_run:
+            ids = [row[0] for row in rows]
+            for sha256 in {row[1] for row in rows if row[1]}:
+                db.query(Blob).filter_by(sha256=sha256).update(
+                    {'ref_count': Blob.ref_count - sum(1 for row in rows if row[1] == sha256)},
+                    synchronize_session=False
+                )
+            db.query(Attachment).filter(Attachment.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+    return released
+
+
+def collect_unreferenced_blobs(db, cutoff, content_hashes, released, report, dry_run):
+    """
+    Delete blobs (and their derivatives) with no attachments and no content
+    references that nothing has uploaded since the cutoff. Rows are locked
+    and re-checked, deleted and committed before any file is unlinked, so a
+    concurrent upload of the same content either keeps the blob or waits
+    and stores its own copy again (Blobs._acquire_internal); files of a blob
+    stored again by the time they would be unlinked are left alone.
+    """
+    # Rows written before last_used_at existed only have created_at
+    last_used = func.coalesce(Blob.last_used_at, Blob.created_at)
+    query = db.query(Blob.sha256, Blob.size, Blob.ref_count).filter(last_used < cutoff)
+    for rows in iter_batches(db, query, Blob.sha256):
+        candidates = [
+            sha256 for sha256, _, ref_count in rows
+            if ref_count - released.get(sha256, 0) <= 0 and sha256 not in content_hashes
+        ]
+        if not candidates:
+            continue
+
+        if dry_run:
+            for blob in db.query(Blob).filter(Blob.sha256.in_(candidates)):
+                report.add('unreferenced blobs', blob.size)
+                for derivative in blob.derivatives:
+                    report.add('image derivatives', derivative.size)
+            continue
+
+        removed = {}
+        locked = db.query(Blob).filter(
+            Blob.sha256.in_(candidates),
+            Blob.ref_count <= 0,
+            last_used < cutoff
+        ).order_by(Blob.sha256).with_for_update()
+        for blob in locked:
+            if db.query(exists().where(Attachment.blob_sha256 == blob.sha256)).scalar():
+                continue
+            report.add('unreferenced blobs', blob.size)
+            removed[blob.sha256] = [blob.path]
+            for derivative in blob.derivatives:
+                report.add('image derivatives', derivative.size)
+                removed[blob.sha256].append(derivative.path)
+            db.delete(blob)
+        db.commit()
+        if not removed:
+            continue
+
+        stored_again = {sha256 for (sha256,) in db.query(Blob.sha256).filter(Blob.sha256.in_(list(removed)))}
+        db.commit()
+        for sha256, paths in removed.items():
+            if sha256 not in stored_again:
+                for path in paths:
+                    storage.remove_blob(path)
+
+
+def collect_legacy_files(db, cutoff, content_paths, report, dry_run):
+    """Delete pre-blob files in the flat uploads root that nothing references."""
+    attachment_names = set()
+    query = db.query(Attachment.id, Attachment.url).filter(Attachment.blob_sha256.is_(None))
+    for rows in iter_batches(db, query, Attachment.id):
+        attachment_names.update(url.rsplit('/uploads/', 1)[-1] for _, url in rows)
+
+    cutoff_ts = cutoff.timestamp()
+    for entry in iter_legacy_files():
+        if entry.name in attachment_names or entry.name in content_paths:
+            continue
+        stat = entry.stat()
+        if stat.st_mtime >= cutoff_ts:
+            continue
+        report.add('legacy files', stat.st_size)
+        if not dry_run:
+            os.remove(entry.path)
+
+
+def iter_legacy_files():
+    """Yield DirEntry objects for flat legacy uploads, both unmigrated and sharded."""
+    with os.scandir(config.UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if not entry.name.startswith('.') and entry.is_file():
+                yield entry
+
+    legacy_root = os.path.join(config.UPLOAD_FOLDER, 'legacy')
+    for dirpath, _, _ in os.walk(legacy_root):
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    yield entry
+
+
+def collect_stale_sessions(db, cutoff, report, dry_run):
+    """
+    Delete resumable upload sessions (and staged data) abandoned before the
+    cutoff. Sessions being completed are skipped unless their completion
+    job was interrupted (UploadSessions.interrupted).
+    """
+    stale = and_(
+        UploadSession.created_at < cutoff,
+        or_(UploadSession.status != 'processing', UploadSessions.interrupted())
+    )
+    query = db.query(UploadSession.id).filter(stale)
+    for rows in iter_batches(db, query, UploadSession.id):
+        ids = [row[0] for row in rows]
+        if not dry_run:
+            # Locked and re-checked, so a completion claimed meanwhile keeps its session
+            ids = [id for (id,) in db.query(UploadSession.id).filter(
+                UploadSession.id.in_(ids), stale
+            ).order_by(UploadSession.id).with_for_update()]
+            db.query(UploadSession).filter(UploadSession.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+
+        for id in ids:
+            part_path = storage.session_part_path(id)
+            report.add('stale upload sessions', storage.staged_size(part_path))
+            if not dry_run:
+                storage.discard_temp(part_path)
+
+
+def run_gc(grace_hours=None, dry_run=False):
+    if grace_hours is None:
+        grace_hours = config.UPLOAD_GC_GRACE_HOURS
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    report = Report()
+    start = time.perf_counter()
+
+    db = get_db()
+    try:
+        content_paths, content_hashes = collect_content_refs(db)
+        released = collect_orphaned_attachments(db, cutoff, content_paths, report, dry_run)
+        collect_unreferenced_blobs(db, cutoff, content_hashes, released, report, dry_run)
+        if os.path.isdir(config.UPLOAD_FOLDER):
+            collect_legacy_files(db, cutoff, content_paths, report, dry_run)
+        collect_stale_sessions(db, cutoff, report, dry_run)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f'Upload GC ({"dry run, " if dry_run else ""}grace period {grace_hours}h) '
+          f'finished in {time.perf_counter() - start:.1f}s')
+    report.print(dry_run)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Remove unreferenced uploads')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be removed')
+    parser.add_argument('--grace-hours', type=int, default=None,
+                        help=f'keep files younger than this (default {config.UPLOAD_GC_GRACE_HOURS})')
+    args = parser.parse_args()
+    run_gc(args.grace_hours, args.dry_run)
@@ -10,8 +10,16 @@ bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
 # Worker Processes
 # Rule of thumb: 2-4 workers per core
 workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = 'sync'
-worker_connections = 1000
+# sync: one request at a time per worker
+# gthread: `threads` concurrent requests per worker, sharing its DB pool
+# gevent: cooperative greenlets, up to `worker_connections` per worker
+#         (pip install gevent psycogreen; startup fails without psycogreen)
+# config.py reads the same variables to size each worker's DB pool, so gthread
+# and gevent also raise DB_POOL_SIZE per worker (see DB_MAX_CONNECTIONS).
+# sync stays the default until a PostgreSQL comparison shows a gain
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))  # gevent/eventlet only
 timeout = 120
 keepalive = 5
 
@@ -35,6 +43,18 @@ proc_name = 'knowledge-repo-server'
 # Server Hooks
 def on_starting(server):
     print("🚀 Gunicorn starting...")
+    # psycopg2 blocks the gevent hub unless its wait callback is made cooperative;
+    # without it every worker serves one query at a time
+    if server.cfg.worker_class_str == 'gevent':
+        try:
+            import psycogreen.gevent  # noqa: F401
+        except ImportError:
+            raise RuntimeError('gevent workers need psycogreen: pip install psycogreen') from None
+
+def post_fork(server, worker):
+    if server.cfg.worker_class_str == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
 
 def on_exit(server):
     print("👋 Gunicorn shutting down...")
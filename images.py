@@ -0,0 +1,130 @@
+"""
+Image derivative pipeline for Knowledge Repository
+Generates resized WebP variants of inline images off the request thread
+"""
+
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import config
+import storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # in requirements.txt; a minimal install without it serves images at original size
+    Image = None
+
+DERIVATIVE_FORMAT = 'webp'
+
+# Matches derivative paths produced by derivative_path()
+_DERIVATIVE_RE = re.compile(r'^(?:[0-9a-f]{2}/[0-9a-f]{2}/)?([0-9a-f]{64})-(\d+)w\.webp$')
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def is_enabled():
+    """Whether derivatives can be generated in this environment."""
+    return Image is not None and config.IMAGE_DERIVATIVE_WORKERS > 0
+
+
+def derivative_path(sha256, width):
+    """Relative path of a derivative: ab/cd/<sha256>-<width>w.webp"""
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}-{width}w.{DERIVATIVE_FORMAT}'
+
+
+def parse_derivative_path(filename):
+    """Return (sha256, width) if the path names a derivative, else None."""
+    match = _DERIVATIVE_RE.match(filename)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def probe_width(relpath):
+    """Read an image's pixel width from its header, or None if it is not a raster image."""
+    if Image is None:
+        return None
+    try:
+        with storage.get_storage().open(relpath) as f, Image.open(f) as img:
+            # Animated images would lose their frames when resized
+            if getattr(img, 'n_frames', 1) > 1:
+                return None
+            return img.width
+    except Exception:
+        return None
+
+
+def target_widths(original_width):
+    """Configured derivative widths smaller than the original."""
+    if not original_width:
+        return []
+    return sorted(w for w in config.IMAGE_DERIVATIVE_WIDTHS if w < original_width)
+
+
+def srcset(sha256, widths, original_url, original_width):
+    """Build a srcset attribute value for the derivatives plus the original."""
+    entries = [f'/uploads/{derivative_path(sha256, w)} {w}w' for w in widths]
+    entries.append(f'{original_url} {original_width}w')
+    return ', '.join(entries)
+
+
+def _get_executor():
+    """Get the per-process derivative pool, recreating it after a fork."""
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=config.IMAGE_DERIVATIVE_WORKERS,
+                thread_name_prefix='image-derivatives'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def schedule_derivatives(sha256, relpath, widths):
+    """Queue derivative generation for an uploaded image."""
+    if not widths or not is_enabled():
+        return
+    _get_executor().submit(generate_derivatives, sha256, relpath, widths)
+
+
+def generate_derivatives(sha256, relpath, widths):
+    """Resize an image to each width and record the WebP variants."""
+    from models.image_derivatives import ImageDerivatives
+
+    backend = storage.get_storage()
+    try:
+        with backend.open(relpath) as f, Image.open(f) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+            for width in widths:
+                target = derivative_path(sha256, width)
+                size = None
+
+                if not backend.exists(target):
+                    height = max(1, round(img.height * width / img.width))
+                    resized = img.resize((width, height), Image.LANCZOS)
+
+                    # Write to a unique staging file first so readers never see a
+                    # partial file, even when two threads render the same derivative
+                    os.makedirs(storage.TEMP_FOLDER, exist_ok=True)
+                    fd, temp_path = tempfile.mkstemp(dir=storage.TEMP_FOLDER, suffix='.tmp')
+                    try:
+                        with os.fdopen(fd, 'wb') as out:
+                            resized.save(out, 'WEBP', quality=config.IMAGE_WEBP_QUALITY, method=4)
+                        size = os.path.getsize(temp_path)
+                        storage.place_blob(temp_path, target, f'image/{DERIVATIVE_FORMAT}')
+                    except Exception:
+                        storage.discard_temp(temp_path)
+                        raise
+
+                ImageDerivatives.create(sha256, width, DERIVATIVE_FORMAT, target, size)
+    except Exception as e:
+        print(f'Image derivative error for {sha256}: {e}')
@@ -0,0 +1,68 @@
+"""
+JSON provider for Knowledge Repository
+Serializes responses with orjson when it is installed, falling back to the
+standard library. Both encode datetimes as ISO 8601 strings, so models can
+hand datetimes straight to jsonify instead of calling isoformat() per field.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - stdlib json is used instead
+    orjson = None
+
+
+def _default(o):
+    """Encode types neither serializer handles natively."""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def dumps_bytes(obj):
+    """UTF-8 JSON body for `obj`, encoded as FastJSONProvider encodes responses (for non-Flask callers)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(JSONProvider):
+    """orjson-backed provider with a stdlib fallback producing the same output."""
+
+    # Key order carries no meaning for API clients; skipping the sort is cheaper
+    sort_keys = False
+
+    def _orjson_dumps(self, obj):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self._orjson_dumps(obj).decode('utf-8')
+
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            body = self._orjson_dumps(obj)
+        else:
+            body = self.dumps(obj).encode('utf-8')
+        return self._app.response_class(body, mimetype='application/json')
@@ -0,0 +1,22 @@
+"""
+In-process metrics for Knowledge Repository
+Simple thread-safe counters, reported per worker process
+"""
+
+import os
+import threading
+
+_counters = {}
+_lock = threading.Lock()
+
+
+def increment(name, value=1):
+    """Add `value` to a counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot():
+    """Current counters for this worker process."""
+    with _lock:
+        return {'pid': os.getpid(), 'counters': dict(_counters)}
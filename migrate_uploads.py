@@ -0,0 +1,69 @@
+"""
+Uploads layout migration for Knowledge Repository
+Moves flat legacy files (uploads/<name>) into the sharded layout
+(uploads/legacy/ab/cd/<name>) in batches. Old /uploads/<name> URLs keep
+working because the server resolves them to the sharded location.
+
+Usage:
+    python migrate_uploads.py --dry-run
+    python migrate_uploads.py [--batch-size 1000] [--pause 0.5]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add server directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from config import config
+import storage
+
+
+def iter_flat_files():
+    """Yield names of regular files sitting directly in the uploads root."""
+    with os.scandir(config.UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if not entry.name.startswith('.') and entry.is_file():
+                yield entry.name
+
+
+def migrate(batch_size=1000, pause=0.0, dry_run=False):
+    moved = 0
+    batch = 0
+    start = time.perf_counter()
+
+    for name in iter_flat_files():
+        target = os.path.join(config.UPLOAD_FOLDER, *storage.legacy_shard_path(name).split('/'))
+        if dry_run:
+            print(f'{name} -> {storage.legacy_shard_path(name)}')
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Same filesystem, so this is an atomic rename with no data copy
+            os.replace(os.path.join(config.UPLOAD_FOLDER, name), target)
+
+        moved += 1
+        batch += 1
+        if batch >= batch_size:
+            print(f'{moved} files {"planned" if dry_run else "moved"}...')
+            batch = 0
+            # Throttle so backups/serving are not starved of disk I/O
+            if pause and not dry_run:
+                time.sleep(pause)
+
+    print(f'Done: {moved} files {"would be moved" if dry_run else "moved"} '
+          f'in {time.perf_counter() - start:.1f}s')
+    return moved
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move flat uploads into the sharded layout')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    migrate(args.batch_size, args.pause, args.dry_run)
@@ -0,0 +1,5 @@
+"""
+Versioned schema migrations for Knowledge Repository (Alembic)
+Fresh databases are created from models/orm.py and stamped at head, so every
+change to the models needs a matching revision in migrations/versions.
+"""
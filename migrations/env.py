@@ -0,0 +1,67 @@
+"""
+Alembic environment for Knowledge Repository
+Migrates the database named by DATABASE_URL against the ORM metadata.
+"""
+
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from config import config
+from database import Base
+import models.orm  # noqa: F401 - registers every table on Base.metadata
+
+alembic_config = context.config
+if alembic_config.config_file_name and alembic_config.attributes.get('configure_logger', True):
+    fileConfig(alembic_config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names):
+    """Keep autogenerate away from SQLite's FTS5 tables and their shadow tables."""
+    return not (type_ == 'table' and name.startswith(('articles_fts', 'attachments_fts')))
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout instead of running it (alembic upgrade --sql)."""
+    context.configure(
+        url=config.DATABASE_URL,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'}
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = alembic_config.attributes.get('connection')
+    if connection is not None:
+        _run(connection)
+        return
+    
+    engine = create_engine(config.DATABASE_URL, poolclass=NullPool)
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection):
+    # One transaction per revision, so a revision that leaves the transaction
+    # for CREATE INDEX CONCURRENTLY does not affect the ones before it
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        transaction_per_migration=True,
+        render_as_batch=connection.dialect.name == 'sqlite'
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
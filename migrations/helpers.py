@@ -0,0 +1,87 @@
+"""
+Helpers for online schema changes in Alembic revisions
+Indexes on existing tables are built with CREATE INDEX CONCURRENTLY on
+PostgreSQL so writes are not blocked, and data backfills run in small
+committed batches so they never hold long locks or one huge transaction.
+Other dialects fall back to plain statements.
+"""
+
+import time
+from alembic import op
+import sqlalchemy as sa
+
+
+def _is_postgresql():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _drop_invalid_index(name):
+    """A failed concurrent build leaves an INVALID index behind; drop it so the build can be retried."""
+    if op.get_context().as_sql:
+        return  # nothing to inspect when only printing SQL
+    invalid = op.get_bind().execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).first()
+    if invalid:
+        op.execute(sa.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+def create_index_concurrently(name, table, columns, **kw):
+    """Create an index without locking writes to `table` (PostgreSQL), retry-safe."""
+    if not _is_postgresql():
+        op.create_index(name, table, columns, **kw)
+        return
+    
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(name)
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(name, table):
+    if not _is_postgresql():
+        op.drop_index(name, table_name=table)
+        return
+    
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(table, set_clause, where_clause, key='id', batch_size=1000, pause=0.1, **params):
+    """
+    Run UPDATE <table> SET <set_clause> WHERE <where_clause> in keyset batches
+    of `batch_size` rows, committing each batch and sleeping `pause` seconds in
+    between to leave headroom for live traffic and replicas. Returns rows updated.
+    
+    Example:
+        backfill('articles', 'views = 0', 'views IS NULL')
+    """
+    if op.get_context().as_sql:
+        raise RuntimeError('backfill() needs a live connection and cannot run with --sql')
+    
+    bind = op.get_bind()
+    update_batch = sa.text(
+        f'UPDATE {table} SET {set_clause} WHERE {key} IN :keys'
+    ).bindparams(sa.bindparam('keys', expanding=True))
+    
+    updated = 0
+    last_key = None
+    with op.get_context().autocommit_block():
+        while True:
+            condition = f'({where_clause})' if last_key is None else f'({where_clause}) AND {key} > :last_key'
+            keys = bind.execute(
+                sa.text(f'SELECT {key} FROM {table} WHERE {condition} ORDER BY {key} LIMIT :batch_size'),
+                {**params, 'last_key': last_key, 'batch_size': batch_size}
+            ).scalars().all()
+            if not keys:
+                break
+            
+            result = bind.execute(update_batch, {**params, 'keys': keys})
+            updated += result.rowcount
+            last_key = keys[-1]
+            print(f'  {table}: backfilled {updated} rows (through {key}={last_key})')
+            
+            if pause:
+                time.sleep(pause)
+    return updated
@@ -0,0 +1,20 @@
+"""Baseline: schema as created by create_all before migrations were introduced
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+"""
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing databases are stamped at this revision (see database.migrate)
+    pass
+
+
+def downgrade():
+    pass
@@ -0,0 +1,87 @@
+"""Content-addressed blobs, image derivatives, upload sessions, attachment
+text extraction and the user listing indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'blobs',
+        sa.Column('sha256', sa.Text(), primary_key=True),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('size', sa.BigInteger()),
+        sa.Column('mime_type', sa.Text()),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime())
+    )
+    
+    op.create_table(
+        'image_derivatives',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('blob_sha256', sa.Text(), sa.ForeignKey('blobs.sha256', ondelete='CASCADE'), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('format', sa.Text(), nullable=False),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('size', sa.BigInteger()),
+        sa.Column('created_at', sa.DateTime())
+    )
+    op.create_index('idx_image_derivatives_blob', 'image_derivatives', ['blob_sha256', 'width', 'format'], unique=True)
+    
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.Text(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('article_id', sa.Integer(), sa.ForeignKey('articles.id', ondelete='SET NULL')),
+        sa.Column('file_name', sa.Text(), nullable=False),
+        sa.Column('mime_type', sa.Text()),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime())
+    )
+    op.create_index('idx_upload_sessions_created', 'upload_sessions', ['created_at'])
+    
+    # Nullable columns without defaults: a metadata-only change on PostgreSQL
+    with op.batch_alter_table('attachments') as batch:
+        batch.add_column(sa.Column('blob_sha256', sa.Text()))
+        batch.add_column(sa.Column('extracted_text', sa.Text()))
+        batch.create_foreign_key('attachments_blob_sha256_fkey', 'blobs', ['blob_sha256'], ['sha256'])
+    
+    # Existing, possibly large tables: build without blocking writes
+    create_index_concurrently('idx_attachments_blob', 'attachments', ['blob_sha256'])
+    create_index_concurrently('idx_users_created', 'users', ['created_at', 'id'])
+    create_index_concurrently(
+        'idx_users_email_prefix', 'users', ['email'],
+        postgresql_ops={'email': 'text_pattern_ops'}
+    )
+    create_index_concurrently(
+        'idx_users_pending', 'users', ['created_at'],
+        postgresql_where=sa.text('approved = false')
+    )
+
+
+def downgrade():
+    drop_index_concurrently('idx_users_pending', 'users')
+    drop_index_concurrently('idx_users_email_prefix', 'users')
+    drop_index_concurrently('idx_users_created', 'users')
+    drop_index_concurrently('idx_attachments_blob', 'attachments')
+    
+    with op.batch_alter_table('attachments') as batch:
+        batch.drop_constraint('attachments_blob_sha256_fkey', type_='foreignkey')
+        batch.drop_column('extracted_text')
+        batch.drop_column('blob_sha256')
+    
+    op.drop_table('upload_sessions')
+    op.drop_table('image_derivatives')
+    op.drop_table('blobs')
@@ -0,0 +1,68 @@
+"""SQLite FTS5 trigram indexes for article and attachment search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+No-op on PostgreSQL. On SQLite, batch migrations that recreate the articles
+or attachments tables drop their triggers; rerun this revision's statements
+after such a migration.
+"""
+
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of models.orm.SQLITE_FTS_DDL as of this revision - do not edit.
+# Schema changes to the FTS tables or triggers go in a new revision (and in
+# models/orm.py, which new databases are created from); nothing imports this.
+FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+    "title, summary, content, content='articles', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN "
+    "INSERT INTO articles_fts(rowid, title, summary, content) VALUES (new.id, new.title, new.summary, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN "
+    "INSERT INTO articles_fts(articles_fts, rowid, title, summary, content) "
+    "VALUES ('delete', old.id, old.title, old.summary, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, summary, content ON articles BEGIN "
+    "INSERT INTO articles_fts(articles_fts, rowid, title, summary, content) "
+    "VALUES ('delete', old.id, old.title, old.summary, old.content); "
+    "INSERT INTO articles_fts(rowid, title, summary, content) VALUES (new.id, new.title, new.summary, new.content); END",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS attachments_fts USING fts5("
+    "extracted_text, content='attachments', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS attachments_fts_ai AFTER INSERT ON attachments BEGIN "
+    "INSERT INTO attachments_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text); END",
+    "CREATE TRIGGER IF NOT EXISTS attachments_fts_ad AFTER DELETE ON attachments BEGIN "
+    "INSERT INTO attachments_fts(attachments_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text); END",
+    "CREATE TRIGGER IF NOT EXISTS attachments_fts_au AFTER UPDATE OF extracted_text ON attachments BEGIN "
+    "INSERT INTO attachments_fts(attachments_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text); "
+    "INSERT INTO attachments_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text); END",
+    # Index rows that existed before the triggers
+    "INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')",
+    "INSERT INTO attachments_fts(attachments_fts) VALUES ('rebuild')",
+)
+
+
+def _supported():
+    dialect = op.get_bind().dialect
+    return dialect.name == 'sqlite' and dialect.dbapi.sqlite_version_info >= (3, 34, 0)
+
+
+def upgrade():
+    if not _supported():
+        return
+    for statement in FTS_DDL:
+        op.execute(statement)
+
+
+def downgrade():
+    if not _supported():
+        return
+    for name in ('articles_fts_ai', 'articles_fts_ad', 'articles_fts_au',
+                 'attachments_fts_ai', 'attachments_fts_ad', 'attachments_fts_au'):
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.execute('DROP TABLE IF EXISTS articles_fts')
+    op.execute('DROP TABLE IF EXISTS attachments_fts')
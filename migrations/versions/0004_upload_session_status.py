@@ -0,0 +1,33 @@
+"""Upload session status, so resumable uploads are completed in the background
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Constant server default and nullable columns: metadata-only on PostgreSQL 11+
+    with op.batch_alter_table('upload_sessions') as batch:
+        batch.add_column(sa.Column('status', sa.Text(), nullable=False, server_default='open'))
+        batch.add_column(sa.Column('attachment_id', sa.Integer()))
+        batch.add_column(sa.Column('error', sa.Text()))
+        batch.create_foreign_key(
+            'upload_sessions_attachment_id_fkey', 'attachments', ['attachment_id'], ['id'], ondelete='SET NULL'
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('upload_sessions') as batch:
+        batch.drop_constraint('upload_sessions_attachment_id_fkey', type_='foreignkey')
+        batch.drop_column('error')
+        batch.drop_column('attachment_id')
+        batch.drop_column('status')
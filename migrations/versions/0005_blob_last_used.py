@@ -0,0 +1,30 @@
+"""Blob last-used time, so the upload GC grace period also covers re-uploads
+of content that is already stored
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import backfill
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable column without a default: metadata-only on PostgreSQL
+    with op.batch_alter_table('blobs') as batch:
+        batch.add_column(sa.Column('last_used_at', sa.DateTime()))
+    
+    backfill('blobs', 'last_used_at = created_at', 'last_used_at IS NULL AND created_at IS NOT NULL', key='sha256')
+
+
+def downgrade():
+    with op.batch_alter_table('blobs') as batch:
+        batch.drop_column('last_used_at')
@@ -0,0 +1,27 @@
+"""Upload session processing start time, so sessions left 'processing' by a
+restarted worker can be reopened
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable column without a default: metadata-only on PostgreSQL. Sessions
+    # already processing have no start time and count as interrupted
+    with op.batch_alter_table('upload_sessions') as batch:
+        batch.add_column(sa.Column('processing_started_at', sa.DateTime()))
+
+
+def downgrade():
+    with op.batch_alter_table('upload_sessions') as batch:
+        batch.drop_column('processing_started_at')
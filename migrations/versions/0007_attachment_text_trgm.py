@@ -0,0 +1,47 @@
+"""pg_trgm index on extracted attachment text, so searching it does not scan
+every extracted document on PostgreSQL
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+
+No-op on SQLite, which searches attachment text through FTS5 (0003), and
+on servers without the pg_trgm extension (PostgreSQL contrib); search then
+leaves attachment text out until this revision's statements are run.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def _is_postgresql():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if not _is_postgresql():
+        return
+    if not op.get_context().as_sql and not op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )).first():
+        print('  pg_trgm is not installed (PostgreSQL contrib); attachment text stays out of search')
+        return
+    # Trusted extension since PostgreSQL 13: the database owner may create it
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    create_index_concurrently(
+        'idx_attachments_extracted_text_trgm', 'attachments', ['extracted_text'],
+        postgresql_using='gin', postgresql_ops={'extracted_text': 'gin_trgm_ops'}
+    )
+
+
+def downgrade():
+    if not _is_postgresql():
+        return
+    drop_index_concurrently('idx_attachments_extracted_text_trgm', 'attachments')
@@ -8,6 +8,9 @@ from models.priorities import Priorities
 from models.tags import Tags
 from models.articles import Articles
 from models.attachments import Attachments
+from models.blobs import Blobs
+from models.image_derivatives import ImageDerivatives
+from models.upload_sessions import UploadSessions
 from models.users import Users
 from models.favorites import Favorites
 from models.recently_viewed import RecentlyViewed
@@ -19,6 +22,9 @@ __all__ = [
     'Tags',
     'Articles',
     'Attachments',
+    'Blobs',
+    'ImageDerivatives',
+    'UploadSessions',
     'Users',
     'Favorites',
     'RecentlyViewed'
@@ -4,9 +4,54 @@ Articles model for Knowledge Repository - SQLAlchemy version
 
 import re
 from datetime import datetime
-from sqlalchemy import func, or_
-from database import get_db
-from models.orm import Article, Category, Department, Priority, Tag, ArticleTag, Attachment
+from sqlalchemy import func, or_, case, exists, false, select, update, bindparam, text
+from database import get_db, get_read_db
+from models.orm import Article, Category, Department, Priority, Tag, ArticleTag, Attachment, sqlite_fts_supported
+from models.attachments import Attachments
+
+# Prebuilt statements for hot lookups: built once at import, so calls skip
+# query construction and hit the compiled-SQL cache directly
+_BY_ID = select(Article).where(Article.id == bindparam('id'))
+# One atomic UPDATE instead of load-modify-flush (updated_at still bumps via onupdate)
+_INCREMENT_VIEWS = update(Article).where(Article.id == bindparam('article_id')).values(
+    views=func.coalesce(Article.views, 0) + 1
+)
+
+# Engine URLs whose SQLite database has the FTS5 search tables, and whose
+# PostgreSQL database has the attachment text trigram index. Only hits are
+# cached, so they are picked up once migrations 0003/0007 have run
+_sqlite_fts = set()
+_pg_trgm = set()
+
+
+def _has_sqlite_fts(db):
+    bind = db.get_bind()
+    if not sqlite_fts_supported(bind.dialect):
+        return False
+    key = str(bind.engine.url)
+    if key in _sqlite_fts:
+        return True
+    found = db.execute(text(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ('articles_fts', 'attachments_fts')"
+    )).scalar() == 2
+    if found:
+        _sqlite_fts.add(key)
+    return found
+
+
+def _has_pg_trgm_index(db):
+    bind = db.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return False
+    key = str(bind.engine.url)
+    if key in _pg_trgm:
+        return True
+    found = db.execute(text(
+        "SELECT 1 FROM pg_indexes WHERE tablename = 'attachments' AND indexname = 'idx_attachments_extracted_text_trgm'"
+    )).first() is not None
+    if found:
+        _pg_trgm.add(key)
+    return found
 
 
 class Articles:
@@ -15,7 +60,7 @@ class Articles:
         if filters is None:
             filters = {}
         
-        db = get_db()
+        db = get_read_db()
         try:
             query = db.query(Article)
             
@@ -35,9 +80,9 @@ class Articles:
     
     @staticmethod
     def get_by_id(id):
-        db = get_db()
+        db = get_read_db()
         try:
-            article = db.query(Article).filter_by(id=id).first()
+            article = db.execute(_BY_ID, {'id': id}).scalars().first()
             return article.to_dict() if article else None
         finally:
             db.close()
@@ -57,8 +102,7 @@ class Articles:
                 author_id=data.get('author_id')
             )
             db.add(article)
-            db.commit()
-            db.refresh(article)
+            db.flush()  # Get article ID; tags and attachments commit with it
             
             article_id = article.id
             
@@ -84,7 +128,7 @@ class Articles:
     def update(id, data):
         db = get_db()
         try:
-            article = db.query(Article).filter_by(id=id).first()
+            article = db.execute(_BY_ID, {'id': id}).scalars().first()
             if not article:
                 return None
             
@@ -118,7 +162,7 @@ class Articles:
     def delete(id):
         db = get_db()
         try:
-            article = db.query(Article).filter_by(id=id).first()
+            article = db.execute(_BY_ID, {'id': id}).scalars().first()
             if article:
                 db.delete(article)
                 db.commit()
@@ -148,12 +192,7 @@ class Articles:
     @staticmethod
     def _assign_attachments_internal(db, article_id, attachment_ids):
         """Assign attachments to an article (internal, uses existing db session)."""
-        # Clear current links
-        db.query(Attachment).filter_by(article_id=article_id).update({'article_id': None})
-        
-        # Assign new attachments
-        for att_id in attachment_ids:
-            db.query(Attachment).filter_by(id=att_id).update({'article_id': article_id})
+        Attachments._assign_internal(db, article_id, attachment_ids)
     
     @staticmethod
     def set_tags(article_id, tag_names, author_id=None):
@@ -169,37 +208,96 @@ class Articles:
     def increment_views(id):
         db = get_db()
         try:
-            article = db.query(Article).filter_by(id=id).first()
-            if article:
-                article.views = (article.views or 0) + 1
-                db.commit()
+            db.execute(_INCREMENT_VIEWS, {'article_id': id})
+            db.commit()
         finally:
             db.close()
     
     @staticmethod
     def search(search_term):
-        db = get_db()
+        db = get_read_db()
         try:
             pattern = f'%{search_term}%'
+            article_match, attachment_match = Articles._match_conditions(db, search_term, pattern)
+            
+            # Matches in the article itself rank above text found only in attachments
+            rank = case((article_match, 1), else_=0)
             articles = db.query(Article).filter(
-                or_(
-                    Article.title.ilike(pattern),
-                    Article.summary.ilike(pattern),
-                    Article.content.ilike(pattern)
-                )
-            ).order_by(Article.updated_at.desc()).all()
+                or_(article_match, attachment_match)
+            ).order_by(rank.desc(), Article.updated_at.desc()).all()
             
             result = []
+            attachment_only = []
             for article in articles:
                 article_dict = article.to_dict()
                 article_dict['snippet'] = Articles._generate_snippet(article_dict, search_term)
                 article_dict['matchField'] = Articles._get_match_field(article_dict, search_term)
+                if article_dict['matchField'] == 'unknown':
+                    attachment_only.append(article_dict)
                 result.append(article_dict)
             
+            if attachment_only:
+                Articles._add_attachment_snippets(db, attachment_only, search_term, pattern)
+            
             return result
         finally:
             db.close()
     
+    @staticmethod
+    def _match_conditions(db, search_term, pattern):
+        """
+        (article_match, attachment_match) filters for a search term.
+        On SQLite, terms of 3+ characters use the FTS5 trigram indexes, which
+        match the same substrings as ILIKE without a full scan. Attachment
+        text is only searched through an index - FTS5, or pg_trgm on
+        PostgreSQL, both for terms of 3+ characters - never by scanning every
+        extracted document.
+        """
+        if len(search_term) >= 3 and _has_sqlite_fts(db):
+            phrase = '"' + search_term.replace('"', '""') + '"'
+            article_match = Article.id.in_(
+                text('SELECT rowid FROM articles_fts WHERE articles_fts MATCH :article_phrase')
+                .bindparams(article_phrase=phrase)
+            )
+            attachment_match = exists().where(
+                Attachment.article_id == Article.id,
+                Attachment.id.in_(
+                    text('SELECT rowid FROM attachments_fts WHERE attachments_fts MATCH :attachment_phrase')
+                    .bindparams(attachment_phrase=phrase)
+                )
+            )
+            return article_match, attachment_match
+        
+        article_match = or_(
+            Article.title.ilike(pattern),
+            Article.summary.ilike(pattern),
+            Article.content.ilike(pattern)
+        )
+        if len(search_term) < 3 or not _has_pg_trgm_index(db):
+            return article_match, false()
+        attachment_match = exists().where(
+            Attachment.article_id == Article.id,
+            Attachment.extracted_text.ilike(pattern)
+        )
+        return article_match, attachment_match
+    
+    @staticmethod
+    def _add_attachment_snippets(db, article_dicts, search_term, pattern):
+        """Fill snippet/matchField for articles that matched only through attachment text."""
+        by_id = {a['id']: a for a in article_dicts}
+        matches = db.query(Attachment.article_id, Attachment.file_name, Attachment.extracted_text).filter(
+            Attachment.article_id.in_(by_id.keys()),
+            Attachment.extracted_text.ilike(pattern)
+        ).all()
+        
+        for article_id, file_name, text in matches:
+            article_dict = by_id[article_id]
+            if article_dict['matchField'] == 'attachment':
+                continue
+            article_dict['matchField'] = 'attachment'
+            article_dict['matchAttachment'] = file_name
+            article_dict['snippet'] = Articles._extract_snippet(text, search_term, 150)
+    
     @staticmethod
     def _generate_snippet(article, search_term):
         """Generate a snippet showing content around the search match."""
@@ -258,7 +356,7 @@ class Articles:
     
     @staticmethod
     def get_stats():
-        db = get_db()
+        db = get_read_db()
         try:
             # Total articles count
             total_count = db.query(func.count(Article.id)).scalar()
@@ -286,7 +384,7 @@ class Articles:
                 'totalViews': total_views or 0,
                 'byCategory': [{'name': name, 'count': count} for name, count in cat_stats],
                 'byDepartment': [{'name': name, 'count': count} for name, count in dep_stats],
-                'recentArticles': [{'id': a.id, 'title': a.title, 'updated_at': a.updated_at.isoformat() if a.updated_at else None} for a in recent]
+                'recentArticles': [{'id': a.id, 'title': a.title, 'updated_at': a.updated_at} for a in recent]
             }
         finally:
             db.close()
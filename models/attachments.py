@@ -2,8 +2,13 @@
 Attachments model for Knowledge Repository - SQLAlchemy version
 """
 
-from database import get_db
+from sqlalchemy import update, select, bindparam
+from sqlalchemy.exc import IntegrityError
+from database import get_db, get_read_db
 from models.orm import Attachment
+from models.blobs import Blobs
+
+_BY_ID = select(Attachment).where(Attachment.id == bindparam('id'))
 
 
 class Attachments:
@@ -26,17 +31,86 @@ class Attachments:
             db.close()
     
     @staticmethod
-    def get_by_id(id):
+    def create_from_blob(sha256, path, article_id=None, file_name=None, mime_type=None, size=None, staged_path=None):
+        """
+        Create an attachment that references a shared content-addressed blob,
+        inserting the blob row or bumping its reference count in one transaction.
+        `staged_path` is a kept copy of content that was already stored (see
+        Blobs._acquire_internal).
+        """
+        db = get_db()
+        try:
+            for attempt in range(2):
+                try:
+                    blob = Blobs._acquire_internal(db, sha256, path, size, mime_type, staged_path=staged_path)
+                    attachment = Attachment(
+                        article_id=article_id,
+                        blob_sha256=sha256,
+                        file_name=file_name,
+                        mime_type=mime_type,
+                        size=size,
+                        url=f'/uploads/{blob.path}'
+                    )
+                    db.add(attachment)
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # Concurrent upload of the same content inserted the blob first
+                    db.rollback()
+                    if attempt:
+                        raise
+            db.refresh(attachment)
+            return attachment.to_dict()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def set_extracted_text(id, text):
+        db = get_db()
+        try:
+            db.query(Attachment).filter_by(id=id).update({'extracted_text': text}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_extracted_text_by_blob(sha256):
+        """Text already extracted from another attachment with the same content, if any."""
+        db = get_db()
+        try:
+            return db.query(Attachment.extracted_text).filter(
+                Attachment.blob_sha256 == sha256,
+                Attachment.extracted_text.isnot(None)
+            ).limit(1).scalar()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def delete(id):
         db = get_db()
         try:
-            attachment = db.query(Attachment).filter_by(id=id).first()
+            attachment = db.execute(_BY_ID, {'id': id}).scalars().first()
+            if attachment:
+                if attachment.blob_sha256:
+                    Blobs._release_internal(db, attachment.blob_sha256)
+                db.delete(attachment)
+                db.commit()
+            return True
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_by_id(id):
+        db = get_read_db()
+        try:
+            attachment = db.execute(_BY_ID, {'id': id}).scalars().first()
             return attachment.to_dict() if attachment else None
         finally:
             db.close()
     
     @staticmethod
     def get_by_article_id(article_id):
-        db = get_db()
+        db = get_read_db()
         try:
             attachments = db.query(Attachment).filter_by(article_id=article_id).order_by(Attachment.created_at.desc()).all()
             return [a.to_dict() for a in attachments]
@@ -59,13 +133,38 @@ class Attachments:
         
         db = get_db()
         try:
-            # Clear current links
-            db.query(Attachment).filter_by(article_id=article_id).update({'article_id': None})
-            
-            # Assign new attachments
-            for att_id in attachment_ids:
-                db.query(Attachment).filter_by(id=att_id).update({'article_id': article_id})
-            
+            Attachments._assign_internal(db, article_id, attachment_ids)
             db.commit()
         finally:
             db.close()
+    
+    @staticmethod
+    def _assign_internal(db, article_id, attachment_ids):
+        """
+        Make exactly `attachment_ids` the attachments of an article with two
+        set-based statements (internal, uses existing db session).
+        Raises ValueError if any requested ID does not exist.
+        """
+        ids = {int(att_id) for att_id in attachment_ids}
+        
+        # Unlink only the attachments that were removed
+        unlink = update(Attachment).where(Attachment.article_id == article_id)
+        if ids:
+            unlink = unlink.where(Attachment.id.not_in(ids))
+        db.execute(unlink.values(article_id=None))
+        
+        if not ids:
+            return
+        
+        # Link the requested set; RETURNING validates the IDs in the same round trip
+        link = update(Attachment).where(Attachment.id.in_(ids)).values(article_id=article_id)
+        if db.get_bind().dialect.update_returning:
+            linked = db.execute(link.returning(Attachment.id)).scalars().all()
+        else:
+            # SQLite before 3.35 has no UPDATE ... RETURNING
+            db.execute(link)
+            linked = db.execute(select(Attachment.id).where(Attachment.id.in_(ids))).scalars().all()
+        
+        missing = ids - set(linked)
+        if missing:
+            raise ValueError(f'Attachments not found: {sorted(missing)}')
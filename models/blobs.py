@@ -0,0 +1,81 @@
+"""
+Blobs model for Knowledge Repository - SQLAlchemy version
+"""
+
+from datetime import datetime
+from sqlalchemy import select, bindparam
+from sqlalchemy.exc import IntegrityError
+from database import get_db
+from models.orm import Blob
+import storage
+
+_PATH_BY_SHA256 = select(Blob.path).where(Blob.sha256 == bindparam('sha256'))
+
+
+class Blobs:
+    @staticmethod
+    def get_path(sha256):
+        db = get_db()
+        try:
+            return db.execute(_PATH_BY_SHA256, {'sha256': sha256}).scalar()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def register(sha256, path, size=None, mime_type=None, staged_path=None):
+        """
+        Record a blob without taking a reference (used for inline images).
+        `staged_path` is a kept copy of content that was already stored (see
+        _acquire_internal). Returns the blob's path.
+        """
+        db = get_db()
+        try:
+            try:
+                blob = Blobs._acquire_internal(db, sha256, path, size, mime_type, increment=0, staged_path=staged_path)
+            except IntegrityError:
+                # Concurrent upload of the same content inserted it first
+                db.rollback()
+                blob = Blobs._acquire_internal(db, sha256, path, size, mime_type, increment=0, staged_path=staged_path)
+            db.commit()
+            return blob.path
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _acquire_internal(db, sha256, path, size=None, mime_type=None, increment=1, staged_path=None):
+        """
+        Get or create a blob row, add `increment` references to it and mark
+        it as just used (internal, uses existing db session). Returns the Blob.
+        
+        The row lock waits for a garbage collector deleting the blob. A
+        duplicate upload passes its staged copy as `staged_path`: it is
+        dropped once the row is locked and marked used (GC then keeps it),
+        and stored again if GC removed the blob since it was looked up.
+        """
+        blob = db.query(Blob).filter_by(sha256=sha256).with_for_update().first()
+        if blob:
+            blob.ref_count = Blob.ref_count + increment
+            blob.last_used_at = datetime.utcnow()
+            db.flush()
+            db.refresh(blob)
+            if staged_path:
+                storage.discard_temp(staged_path)
+            return blob
+        
+        if staged_path:
+            storage.place_blob(staged_path, path, mime_type, replace=True)
+        blob = Blob(sha256=sha256, path=path, size=size, mime_type=mime_type, ref_count=increment)
+        db.add(blob)
+        db.flush()
+        return blob
+    
+    @staticmethod
+    def _release_internal(db, sha256):
+        """
+        Drop one reference from a blob (internal, uses existing db session).
+        Unreferenced blobs are left for the garbage collector, since inline
+        images can point at the same file without holding a reference.
+        """
+        db.query(Blob).filter_by(sha256=sha256).update(
+            {'ref_count': Blob.ref_count - 1}, synchronize_session=False
+        )
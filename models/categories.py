@@ -2,26 +2,29 @@
 Categories model for Knowledge Repository - SQLAlchemy version
 """
 
-from sqlalchemy import func
-from database import get_db
+from sqlalchemy import func, select, bindparam
+from database import get_db, get_read_db
 from models.orm import Category, Article
 
+_BY_ID = select(Category).where(Category.id == bindparam('id'))
+_ALL = select(Category).order_by(Category.name)
+
 
 class Categories:
     @staticmethod
     def get_all():
-        db = get_db()
+        db = get_read_db()
         try:
-            categories = db.query(Category).order_by(Category.name).all()
+            categories = db.execute(_ALL).scalars().all()
             return [c.to_dict() for c in categories]
         finally:
             db.close()
     
     @staticmethod
     def get_by_id(id):
-        db = get_db()
+        db = get_read_db()
         try:
-            category = db.query(Category).filter_by(id=id).first()
+            category = db.execute(_BY_ID, {'id': id}).scalars().first()
             return category.to_dict() if category else None
         finally:
             db.close()
@@ -46,7 +49,7 @@ class Categories:
     def update(id, name, description=None):
         db = get_db()
         try:
-            category = db.query(Category).filter_by(id=id).first()
+            category = db.execute(_BY_ID, {'id': id}).scalars().first()
             if category:
                 category.name = name
                 category.description = description
@@ -61,7 +64,7 @@ class Categories:
     def delete(id):
         db = get_db()
         try:
-            category = db.query(Category).filter_by(id=id).first()
+            category = db.execute(_BY_ID, {'id': id}).scalars().first()
             if category:
                 db.delete(category)
                 db.commit()
@@ -2,26 +2,29 @@
 Departments model for Knowledge Repository - SQLAlchemy version
 """
 
-from sqlalchemy import func
-from database import get_db
+from sqlalchemy import func, select, bindparam
+from database import get_db, get_read_db
 from models.orm import Department, Article
 
+_BY_ID = select(Department).where(Department.id == bindparam('id'))
+_ALL = select(Department).order_by(Department.name)
+
 
 class Departments:
     @staticmethod
     def get_all():
-        db = get_db()
+        db = get_read_db()
         try:
-            departments = db.query(Department).order_by(Department.name).all()
+            departments = db.execute(_ALL).scalars().all()
             return [d.to_dict() for d in departments]
         finally:
             db.close()
     
     @staticmethod
     def get_by_id(id):
-        db = get_db()
+        db = get_read_db()
         try:
-            department = db.query(Department).filter_by(id=id).first()
+            department = db.execute(_BY_ID, {'id': id}).scalars().first()
             return department.to_dict() if department else None
         finally:
             db.close()
@@ -46,7 +49,7 @@ class Departments:
     def update(id, name, description=None):
         db = get_db()
         try:
-            department = db.query(Department).filter_by(id=id).first()
+            department = db.execute(_BY_ID, {'id': id}).scalars().first()
             if department:
                 department.name = name
                 department.description = description
@@ -61,7 +64,7 @@ class Departments:
     def delete(id):
         db = get_db()
         try:
-            department = db.query(Department).filter_by(id=id).first()
+            department = db.execute(_BY_ID, {'id': id}).scalars().first()
             if department:
                 db.delete(department)
                 db.commit()
@@ -2,14 +2,20 @@
 Favorites model for Knowledge Repository - SQLAlchemy version
 """
 
-from database import get_db
+from sqlalchemy import select, bindparam
+from database import get_db, get_read_db
 from models.orm import UserFavorite, Article, Category, Department
 
+_IS_FAVORITED = select(UserFavorite.user_id).where(
+    UserFavorite.user_id == bindparam('user_id'),
+    UserFavorite.article_id == bindparam('article_id')
+)
+
 
 class Favorites:
     @staticmethod
     def get_user_favorites(user_id):
-        db = get_db()
+        db = get_read_db()
         try:
             favorites = db.query(UserFavorite).filter_by(user_id=user_id).order_by(UserFavorite.created_at.desc()).all()
             result = []
@@ -20,7 +26,7 @@ class Favorites:
                     department = db.query(Department).filter_by(id=article.department_id).first() if article.department_id else None
                     result.append({
                         'article_id': fav.article_id,
-                        'created_at': fav.created_at.isoformat() if fav.created_at else None,
+                        'created_at': fav.created_at,
                         'title': article.title,
                         'summary': article.summary,
                         'category': category.name if category else None,
@@ -58,7 +64,6 @@ class Favorites:
     def is_favorited(user_id, article_id):
         db = get_db()
         try:
-            exists = db.query(UserFavorite).filter_by(user_id=user_id, article_id=article_id).first()
-            return exists is not None
+            return db.execute(_IS_FAVORITED, {'user_id': user_id, 'article_id': article_id}).first() is not None
         finally:
             db.close()
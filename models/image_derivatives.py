@@ -0,0 +1,39 @@
+"""
+Image Derivatives model for Knowledge Repository - SQLAlchemy version
+"""
+
+from sqlalchemy.exc import IntegrityError
+from database import get_db, get_read_db
+from models.orm import ImageDerivative
+
+
+class ImageDerivatives:
+    @staticmethod
+    def get_by_blob(sha256):
+        db = get_read_db()
+        try:
+            derivatives = db.query(ImageDerivative).filter_by(blob_sha256=sha256).order_by(ImageDerivative.width).all()
+            return [d.to_dict() for d in derivatives]
+        finally:
+            db.close()
+    
+    @staticmethod
+    def create(sha256, width, format, path, size=None):
+        db = get_db()
+        try:
+            derivative = ImageDerivative(
+                blob_sha256=sha256,
+                width=width,
+                format=format,
+                path=path,
+                size=size
+            )
+            db.add(derivative)
+            db.commit()
+            return derivative.to_dict()
+        except IntegrityError:
+            # Already generated (e.g. the same image was uploaded twice)
+            db.rollback()
+            return None
+        finally:
+            db.close()
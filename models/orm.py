@@ -4,9 +4,9 @@ SQLAlchemy ORM models for Knowledge Repository
 
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index
+    Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Index, event
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from database import Base
 
 
@@ -27,6 +27,13 @@ class User(Base):
     favorites = relationship('UserFavorite', back_populates='user', cascade='all, delete-orphan')
     recently_viewed = relationship('RecentlyViewed', back_populates='user', cascade='all, delete-orphan')
     
+    # Indexes
+    __table_args__ = (
+        Index('idx_users_created', 'created_at', 'id'),
+        Index('idx_users_email_prefix', 'email', postgresql_ops={'email': 'text_pattern_ops'}),
+        Index('idx_users_pending', 'created_at', postgresql_where=approved.is_(False)),
+    )
+    
     def to_dict(self, include_password=False):
         data = {
             'id': self.id,
@@ -34,8 +41,8 @@ class User(Base):
             'role': self.role,
             'approved': self.approved,
             'is_root': self.is_root,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login_at': self.last_login_at.isoformat() if self.last_login_at else None
+            'created_at': self.created_at,
+            'last_login_at': self.last_login_at
         }
         if include_password:
             data['password_hash'] = self.password_hash
@@ -61,7 +68,7 @@ class Category(Base):
             'name': self.name,
             'description': self.description,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -84,7 +91,7 @@ class Department(Base):
             'name': self.name,
             'description': self.description,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -109,7 +116,7 @@ class Priority(Base):
             'level': self.level,
             'color': self.color,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -130,7 +137,7 @@ class Tag(Base):
             'id': self.id,
             'name': self.name,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -181,8 +188,8 @@ class Article(Base):
             'author': self.author,
             'author_id': self.author_id,
             'views': self.views,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
         if include_relations:
             data['category_name'] = self.category.name if self.category else None
@@ -207,24 +214,96 @@ class ArticleTag(Base):
     tag = relationship('Tag', back_populates='articles')
 
 
+class Blob(Base):
+    """Content-addressed stored file, shared by every upload with the same bytes."""
+    __tablename__ = 'blobs'
+    
+    sha256 = Column(Text, primary_key=True)
+    path = Column(Text, nullable=False)
+    size = Column(BigInteger)
+    mime_type = Column(Text)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped whenever an upload resolves to this blob; the GC grace period counts from it
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    attachments = relationship('Attachment', back_populates='blob')
+    derivatives = relationship('ImageDerivative', back_populates='blob', cascade='all, delete-orphan')
+
+
+class ImageDerivative(Base):
+    """Resized/re-encoded variant of an image blob."""
+    __tablename__ = 'image_derivatives'
+    
+    id = Column(Integer, primary_key=True)
+    blob_sha256 = Column(Text, ForeignKey('blobs.sha256', ondelete='CASCADE'), nullable=False)
+    width = Column(Integer, nullable=False)
+    format = Column(Text, nullable=False)
+    path = Column(Text, nullable=False)
+    size = Column(BigInteger)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    blob = relationship('Blob', back_populates='derivatives')
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_image_derivatives_blob', 'blob_sha256', 'width', 'format', unique=True),
+    )
+    
+    def to_dict(self):
+        return {
+            'width': self.width,
+            'format': self.format,
+            'size': self.size,
+            'url': f'/uploads/{self.path}'
+        }
+
+
+def pg_trgm_installed(connection):
+    """Whether a PostgreSQL database has the pg_trgm extension."""
+    return connection.dialect.name == 'postgresql' and connection.exec_driver_sql(
+        "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+    ).first() is not None
+
+
+def _create_pg_trgm(table, connection, **kw):
+    # pg_trgm ships with PostgreSQL's contrib package and is a trusted extension
+    # since 13; without it attachment text is left out of search
+    if connection.dialect.name == 'postgresql' and connection.exec_driver_sql(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    ).first():
+        connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
 class Attachment(Base):
     """Attachment model for article file attachments."""
     __tablename__ = 'attachments'
     
     id = Column(Integer, primary_key=True)
     article_id = Column(Integer, ForeignKey('articles.id', ondelete='SET NULL'))
+    blob_sha256 = Column(Text, ForeignKey('blobs.sha256'))
     file_name = Column(Text, nullable=False)
     mime_type = Column(Text)
     size = Column(Integer)
     url = Column(Text, nullable=False)
+    extracted_text = deferred(Column(Text))  # filled in by the background extractor
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     article = relationship('Article', back_populates='attachments')
+    blob = relationship('Blob', back_populates='attachments')
     
     # Indexes
     __table_args__ = (
         Index('idx_attachments_article', 'article_id'),
+        Index('idx_attachments_blob', 'blob_sha256'),
+        # Trigram index behind ILIKE '%term%' search of attachment text
+        Index(
+            'idx_attachments_extracted_text_trgm', 'extracted_text',
+            postgresql_using='gin', postgresql_ops={'extracted_text': 'gin_trgm_ops'}
+        ).ddl_if(callable_=lambda ddl, target, bind, **kw: pg_trgm_installed(bind)),
     )
     
     def to_dict(self):
@@ -235,7 +314,48 @@ class Attachment(Base):
             'mime_type': self.mime_type,
             'size': self.size,
             'url': self.url,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'sha256': self.blob_sha256,
+            'created_at': self.created_at
+        }
+
+
+class UploadSession(Base):
+    """In-progress resumable upload, staged on disk until completed."""
+    __tablename__ = 'upload_sessions'
+    
+    id = Column(Text, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'))
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='SET NULL'))
+    file_name = Column(Text, nullable=False)
+    mime_type = Column(Text)
+    size = Column(BigInteger, nullable=False)
+    # open -> processing (hashed and stored in the background) -> complete | failed
+    status = Column(Text, nullable=False, default='open', server_default='open')
+    attachment_id = Column(Integer, ForeignKey('attachments.id', ondelete='SET NULL'))
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # When the current completion job claimed the session; processing longer
+    # than UPLOAD_COMPLETION_TIMEOUT means the worker died and it is reopened
+    processing_started_at = Column(DateTime)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_upload_sessions_created', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'article_id': self.article_id,
+            'file_name': self.file_name,
+            'mime_type': self.mime_type,
+            'size': self.size,
+            'status': self.status,
+            'attachment_id': self.attachment_id,
+            'error': self.error,
+            'created_at': self.created_at,
+            'processing_started_at': self.processing_started_at
         }
 
 
@@ -277,3 +397,57 @@ class RecentlyViewed(Base):
         Index('idx_recently_viewed_user', 'user_id'),
         Index('idx_recently_viewed_viewed_at', 'viewed_at'),
     )
+
+
+# ==========================================
+# SQLite full-text search
+# ==========================================
+
+# FTS5 trigram indexes over article text and extracted attachment text. The
+# trigram tokenizer lets MATCH find arbitrary substrings of 3+ characters, so
+# search keeps ILIKE '%term%' semantics without scanning every row. Triggers
+# keep the external-content indexes in sync. PostgreSQL does not use these.
+# Migration 0003 keeps its own frozen copy for existing databases, so a change
+# here also needs a new revision.
+SQLITE_FTS_DDL = {
+    'articles': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+        "title, summary, content, content='articles', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN "
+        "INSERT INTO articles_fts(rowid, title, summary, content) VALUES (new.id, new.title, new.summary, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN "
+        "INSERT INTO articles_fts(articles_fts, rowid, title, summary, content) "
+        "VALUES ('delete', old.id, old.title, old.summary, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, summary, content ON articles BEGIN "
+        "INSERT INTO articles_fts(articles_fts, rowid, title, summary, content) "
+        "VALUES ('delete', old.id, old.title, old.summary, old.content); "
+        "INSERT INTO articles_fts(rowid, title, summary, content) VALUES (new.id, new.title, new.summary, new.content); END",
+    ),
+    'attachments': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS attachments_fts USING fts5("
+        "extracted_text, content='attachments', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS attachments_fts_ai AFTER INSERT ON attachments BEGIN "
+        "INSERT INTO attachments_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text); END",
+        "CREATE TRIGGER IF NOT EXISTS attachments_fts_ad AFTER DELETE ON attachments BEGIN "
+        "INSERT INTO attachments_fts(attachments_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text); END",
+        "CREATE TRIGGER IF NOT EXISTS attachments_fts_au AFTER UPDATE OF extracted_text ON attachments BEGIN "
+        "INSERT INTO attachments_fts(attachments_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text); "
+        "INSERT INTO attachments_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text); END",
+    ),
+}
+
+
+def sqlite_fts_supported(dialect):
+    """FTS5's trigram tokenizer needs SQLite 3.34+."""
+    return dialect.name == 'sqlite' and dialect.dbapi.sqlite_version_info >= (3, 34, 0)
+
+
+def _create_sqlite_fts(table, connection, **kw):
+    if sqlite_fts_supported(connection.dialect):
+        for statement in SQLITE_FTS_DDL[table.name]:
+            connection.exec_driver_sql(statement)
+
+
+event.listen(Article.__table__, 'after_create', _create_sqlite_fts)
+event.listen(Attachment.__table__, 'after_create', _create_sqlite_fts)
+event.listen(Attachment.__table__, 'before_create', _create_pg_trgm)
@@ -2,26 +2,29 @@
 Priorities model for Knowledge Repository - SQLAlchemy version
 """
 
-from sqlalchemy import func
-from database import get_db
+from sqlalchemy import func, select, bindparam
+from database import get_db, get_read_db
 from models.orm import Priority, Article
 
+_BY_ID = select(Priority).where(Priority.id == bindparam('id'))
+_ALL = select(Priority).order_by(Priority.level.desc())
+
 
 class Priorities:
     @staticmethod
     def get_all():
-        db = get_db()
+        db = get_read_db()
         try:
-            priorities = db.query(Priority).order_by(Priority.level.desc()).all()
+            priorities = db.execute(_ALL).scalars().all()
             return [p.to_dict() for p in priorities]
         finally:
             db.close()
     
     @staticmethod
     def get_by_id(id):
-        db = get_db()
+        db = get_read_db()
         try:
-            priority = db.query(Priority).filter_by(id=id).first()
+            priority = db.execute(_BY_ID, {'id': id}).scalars().first()
             return priority.to_dict() if priority else None
         finally:
             db.close()
@@ -47,7 +50,7 @@ class Priorities:
     def update(id, name, level=None, color=None):
         db = get_db()
         try:
-            priority = db.query(Priority).filter_by(id=id).first()
+            priority = db.execute(_BY_ID, {'id': id}).scalars().first()
             if priority:
                 priority.name = name
                 if level is not None:
@@ -65,7 +68,7 @@ class Priorities:
     def delete(id):
         db = get_db()
         try:
-            priority = db.query(Priority).filter_by(id=id).first()
+            priority = db.execute(_BY_ID, {'id': id}).scalars().first()
             if priority:
                 db.delete(priority)
                 db.commit()
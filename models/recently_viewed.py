@@ -4,14 +4,14 @@ Recently Viewed model for Knowledge Repository - SQLAlchemy version
 
 from datetime import datetime, timedelta
 from sqlalchemy import text
-from database import get_db
+from database import get_db, get_read_db
 from models.orm import RecentlyViewed as RecentlyViewedModel, Article, Category, Department
 
 
 class RecentlyViewed:
     @staticmethod
     def get_user_recently_viewed(user_id, limit=20):
-        db = get_db()
+        db = get_read_db()
         try:
             three_days_ago = datetime.utcnow() - timedelta(days=3)
             
@@ -28,7 +28,7 @@ class RecentlyViewed:
                     department = db.query(Department).filter_by(id=article.department_id).first() if article.department_id else None
                     result.append({
                         'article_id': view.article_id,
-                        'viewed_at': view.viewed_at.isoformat() if view.viewed_at else None,
+                        'viewed_at': view.viewed_at,
                         'title': article.title,
                         'summary': article.summary,
                         'category': category.name if category else None,
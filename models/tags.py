@@ -2,25 +2,30 @@
 Tags model for Knowledge Repository - SQLAlchemy version
 """
 
-from database import get_db
+from sqlalchemy import select, bindparam
+from database import get_db, get_read_db
 from models.orm import Tag, ArticleTag
 
+_BY_ID = select(Tag).where(Tag.id == bindparam('id'))
+_ALL = select(Tag).order_by(Tag.name)
+_BY_NAME = select(Tag).where(Tag.name == bindparam('name'))
+
 
 class Tags:
     @staticmethod
     def get_all():
-        db = get_db()
+        db = get_read_db()
         try:
-            tags = db.query(Tag).order_by(Tag.name).all()
+            tags = db.execute(_ALL).scalars().all()
             return [t.to_dict() for t in tags]
         finally:
             db.close()
     
     @staticmethod
     def get_by_id(id):
-        db = get_db()
+        db = get_read_db()
         try:
-            tag = db.query(Tag).filter_by(id=id).first()
+            tag = db.execute(_BY_ID, {'id': id}).scalars().first()
             return tag.to_dict() if tag else None
         finally:
             db.close()
@@ -29,7 +34,7 @@ class Tags:
     def get_by_name(name):
         db = get_db()
         try:
-            tag = db.query(Tag).filter_by(name=name).first()
+            tag = db.execute(_BY_NAME, {'name': name}).scalars().first()
             return tag.to_dict() if tag else None
         finally:
             db.close()
@@ -39,7 +44,7 @@ class Tags:
         db = get_db()
         try:
             # Check if tag already exists
-            existing = db.query(Tag).filter_by(name=name).first()
+            existing = db.execute(_BY_NAME, {'name': name}).scalars().first()
             if existing:
                 return existing.to_dict()
             
@@ -55,7 +60,7 @@ class Tags:
     def delete(id):
         db = get_db()
         try:
-            tag = db.query(Tag).filter_by(id=id).first()
+            tag = db.execute(_BY_ID, {'id': id}).scalars().first()
             if tag:
                 db.delete(tag)
                 db.commit()
@@ -65,7 +70,7 @@ class Tags:
     
     @staticmethod
     def get_by_article_id(article_id):
-        db = get_db()
+        db = get_read_db()
         try:
             article_tags = db.query(ArticleTag).filter_by(article_id=article_id).all()
             tags = []
@@ -0,0 +1,120 @@
+"""
+Upload Sessions model for Knowledge Repository - SQLAlchemy version
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, bindparam, and_, or_
+from config import config
+from database import get_db
+from models.orm import UploadSession
+
+_BY_ID = select(UploadSession).where(UploadSession.id == bindparam('id'))
+# Only one request may move a session from open to processing
+_START_PROCESSING = update(UploadSession).where(
+    UploadSession.id == bindparam('session_id'),
+    UploadSession.status == 'open'
+).values(status='processing', processing_started_at=bindparam('started_at'))
+
+
+class UploadSessions:
+    @staticmethod
+    def create(user_id, file_name, size, mime_type=None, article_id=None):
+        db = get_db()
+        try:
+            session = UploadSession(
+                id=uuid.uuid4().hex,
+                user_id=user_id,
+                article_id=article_id,
+                file_name=file_name,
+                mime_type=mime_type,
+                size=size
+            )
+            db.add(session)
+            db.commit()
+            db.refresh(session)
+            return session.to_dict()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_by_id(id):
+        db = get_db()
+        try:
+            session = db.execute(_BY_ID, {'id': id}).scalars().first()
+            return session.to_dict() if session else None
+        finally:
+            db.close()
+    
+    @staticmethod
+    def interrupted():
+        """
+        Filter for sessions stuck in 'processing' for longer than
+        UPLOAD_COMPLETION_TIMEOUT: the completion job died with its worker.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=config.UPLOAD_COMPLETION_TIMEOUT)
+        return and_(
+            UploadSession.status == 'processing',
+            or_(UploadSession.processing_started_at.is_(None), UploadSession.processing_started_at < cutoff)
+        )
+    
+    @staticmethod
+    def start_processing(id):
+        """
+        Mark an open session as being completed. Returns the claim's start
+        time (pass it to finish()), or None if the session was not open.
+        """
+        db = get_db()
+        try:
+            started_at = datetime.utcnow()
+            claimed = db.execute(_START_PROCESSING, {'session_id': id, 'started_at': started_at}).rowcount == 1
+            db.commit()
+            return started_at if claimed else None
+        finally:
+            db.close()
+    
+    @staticmethod
+    def reopen_if_interrupted(id):
+        """
+        Put an interrupted session back to 'open' so it can be completed again
+        or aborted. Returns True if it was reopened.
+        """
+        db = get_db()
+        try:
+            reopened = db.query(UploadSession).filter(UploadSession.id == id, UploadSessions.interrupted()).update(
+                {'status': 'open', 'processing_started_at': None}, synchronize_session=False
+            ) == 1
+            db.commit()
+            return reopened
+        finally:
+            db.close()
+    
+    @staticmethod
+    def finish(id, started_at, status, attachment_id=None, error=None):
+        """
+        Record the outcome of a background completion ('complete' or 'failed').
+        Ignored if the session was reopened since start_processing() returned
+        `started_at`. Returns True if recorded.
+        """
+        db = get_db()
+        try:
+            recorded = db.query(UploadSession).filter_by(
+                id=id, status='processing', processing_started_at=started_at
+            ).update(
+                {'status': status, 'attachment_id': attachment_id, 'error': error},
+                synchronize_session=False
+            ) == 1
+            db.commit()
+            return recorded
+        finally:
+            db.close()
+    
+    @staticmethod
+    def delete(id):
+        db = get_db()
+        try:
+            db.query(UploadSession).filter_by(id=id).delete()
+            db.commit()
+            return True
+        finally:
+            db.close()
@@ -2,17 +2,23 @@
 Users model for Knowledge Repository - SQLAlchemy version
 """
 
+import base64
+import json
 from datetime import datetime
-from database import get_db
+from sqlalchemy import func, tuple_, select, bindparam
+from database import get_db, get_read_db
 from models.orm import User
 
+_BY_ID = select(User).where(User.id == bindparam('id'))
+_BY_EMAIL = select(User).where(User.email == bindparam('email'))
+
 
 class Users:
     @staticmethod
     def get_by_email(email):
         db = get_db()
         try:
-            user = db.query(User).filter_by(email=email).first()
+            user = db.execute(_BY_EMAIL, {'email': email}).scalars().first()
             return user.to_dict(include_password=True) if user else None
         finally:
             db.close()
@@ -21,7 +27,7 @@ class Users:
     def get_by_id(id):
         db = get_db()
         try:
-            user = db.query(User).filter_by(id=id).first()
+            user = db.execute(_BY_ID, {'id': id}).scalars().first()
             return user.to_dict() if user else None
         finally:
             db.close()
@@ -44,13 +50,19 @@ class Users:
             db.close()
     
     @staticmethod
-    def update_last_login(id):
+    def update_last_login(id, password_hash=None):
+        """
+        Record a successful login with a single UPDATE (no SELECT round trip).
+        Optionally stores an upgraded password hash in the same statement.
+        """
+        values = {'last_login_at': datetime.utcnow()}
+        if password_hash:
+            values['password_hash'] = password_hash
+        
         db = get_db()
         try:
-            user = db.query(User).filter_by(id=id).first()
-            if user:
-                user.last_login_at = datetime.utcnow()
-                db.commit()
+            db.query(User).filter_by(id=id).update(values, synchronize_session=False)
+            db.commit()
         finally:
             db.close()
     
@@ -58,7 +70,7 @@ class Users:
     def update_role(id, role):
         db = get_db()
         try:
-            user = db.query(User).filter_by(id=id).first()
+            user = db.execute(_BY_ID, {'id': id}).scalars().first()
             if user:
                 user.role = role
                 db.commit()
@@ -72,7 +84,7 @@ class Users:
     def update_approved(id, approved):
         db = get_db()
         try:
-            user = db.query(User).filter_by(id=id).first()
+            user = db.execute(_BY_ID, {'id': id}).scalars().first()
             if user:
                 user.approved = approved
                 db.commit()
@@ -83,19 +95,89 @@ class Users:
             db.close()
     
     @staticmethod
-    def get_all():
-        db = get_db()
+    def _apply_filters(query, filters):
+        """Apply approved/role/email-prefix filters to a users query."""
+        if filters.get('approved') is not None:
+            query = query.filter(User.approved.is_(filters['approved']))
+        
+        if filters.get('role'):
+            query = query.filter(User.role == filters['role'])
+        
+        if filters.get('email_prefix'):
+            # Plain prefix LIKE so the text_pattern_ops index can be used
+            prefix = filters['email_prefix'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(User.email.like(f'{prefix}%', escape='\\'))
+        
+        return query
+    
+    @staticmethod
+    def _encode_cursor(user):
+        raw = json.dumps([user.created_at.isoformat() if user.created_at else None, user.id])
+        return base64.urlsafe_b64encode(raw.encode()).decode('ascii')
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    
+    @staticmethod
+    def get_all(filters=None):
+        if filters is None:
+            filters = {}
+        
+        db = get_read_db()
         try:
-            users = db.query(User).order_by(User.created_at.desc()).all()
+            query = Users._apply_filters(db.query(User), filters)
+            users = query.order_by(User.created_at.desc()).all()
             return [u.to_dict() for u in users]
         finally:
             db.close()
     
+    @staticmethod
+    def get_page(filters=None, limit=50, cursor=None):
+        """
+        Keyset-paginated user listing ordered by newest first.
+        Returns {'users': [...], 'next_cursor': str | None}.
+        Raises ValueError for a malformed cursor.
+        """
+        if filters is None:
+            filters = {}
+        
+        db = get_read_db()
+        try:
+            query = Users._apply_filters(db.query(User), filters)
+            
+            if cursor:
+                created_at, id = Users._decode_cursor(cursor)
+                query = query.filter(tuple_(User.created_at, User.id) < (created_at, id))
+            
+            users = query.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1).all()
+            
+            next_cursor = None
+            if len(users) > limit:
+                users = users[:limit]
+                next_cursor = Users._encode_cursor(users[-1])
+            
+            return {
+                'users': [u.to_dict() for u in users],
+                'next_cursor': next_cursor
+            }
+        finally:
+            db.close()
+    
+    @staticmethod
+    def count_pending():
+        db = get_read_db()
+        try:
+            return db.query(func.count(User.id)).filter(User.approved.is_(False)).scalar() or 0
+        finally:
+            db.close()
+    
     @staticmethod
     def delete(id):
         db = get_db()
         try:
-            user = db.query(User).filter_by(id=id).first()
+            user = db.execute(_BY_ID, {'id': id}).scalars().first()
             if user and user.is_root:
                 raise Exception('Cannot delete root user')
             if user:
@@ -0,0 +1,144 @@
+"""
+Per-request SQL instrumentation for Knowledge Repository
+Counts statements and database time for each request via SQLAlchemy engine
+events, flags N+1 patterns (the same statement repeated many times), reports
+a Server-Timing header and writes a JSON log line for flagged requests.
+In strict mode budget violations raise instead, so tests can fail on them.
+"""
+
+import re
+import json
+import time
+from collections import Counter
+from functools import wraps
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from config import config
+import metrics
+
+# "IN (%(id_1)s, %(id_2)s, ...)" -> "IN (...)" so expanded lists count as one pattern
+_PARAM = r'(?:\?|%\(\w+\)s|%s|:\w+|\$\d+)'
+_PARAM_LIST_RE = re.compile(rf'\(\s*{_PARAM}(?:\s*,\s*{_PARAM})+\s*\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request exceeds its query budget or repeats a statement."""
+
+
+class RequestQueries:
+    """SQL activity for one request."""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+    
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[_PARAM_LIST_RE.sub('(...)', statement)] += 1
+    
+    def repeated(self, threshold):
+        """Statements run at least `threshold` times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+def current():
+    """RequestQueries for the active request, or None outside one."""
+    if not has_request_context():
+        return None
+    return g.get('sql_queries')
+
+
+def query_budget(max_queries):
+    """Route decorator overriding SQL_QUERY_BUDGET for one endpoint."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            g.sql_query_budget = max_queries
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context: after_cursor_execute does not run for a
+    # statement that raises, so nothing may be left behind on the connection
+    if context is not None:
+        context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_stats_start', None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    queries = current()
+    if queries is not None:
+        queries.record(statement, duration)
+
+
+def instrument(engine):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _start_request():
+    g.sql_queries = RequestQueries()
+
+
+def _problems(queries):
+    problems = []
+    budget = g.get('sql_query_budget', config.SQL_QUERY_BUDGET)
+    if budget and queries.count > budget:
+        problems.append(f'{queries.count} queries exceeds budget of {budget}')
+    for sql, n in queries.repeated(config.SQL_REPEAT_THRESHOLD):
+        problems.append(f'statement repeated {n} times: {sql[:200]}')
+    return problems
+
+
+def _finish_request(response):
+    queries = g.pop('sql_queries', None)
+    if queries is None:
+        return response
+    
+    total_ms = (time.perf_counter() - queries.started) * 1000
+    db_ms = queries.duration * 1000
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={db_ms:.1f};desc="{queries.count} queries", app;dur={total_ms:.1f}'
+    )
+    metrics.increment('sql.queries', queries.count)
+    metrics.increment('sql.time_ms', round(db_ms, 3))
+    
+    problems = _problems(queries)
+    if problems:
+        metrics.increment('sql.flagged_requests')
+        if config.SQL_STRICT:
+            raise QueryBudgetExceeded(f'{request.method} {request.path}: ' + '; '.join(problems))
+    
+    if problems or config.SQL_LOG_REQUESTS:
+        print(json.dumps({
+            'event': 'sql',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': queries.count,
+            'db_ms': round(db_ms, 1),
+            'total_ms': round(total_ms, 1),
+            'problems': problems
+        }, ensure_ascii=False))
+    return response
+
+
+def init_app(app):
+    if not config.SQL_INSTRUMENTATION:
+        return
+    
+    import database
+    for engine in [database.engine] + database.replica_engines:
+        instrument(engine)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -94,6 +94,8 @@ def create():
         article = Articles.create(article_data)
         return jsonify(article), 201
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f'Error creating article: {e}')
         return jsonify({'error': str(e)}), 500
@@ -134,6 +136,8 @@ def update(id):
         article = Articles.update(id, article_data)
         return jsonify(article)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
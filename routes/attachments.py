@@ -3,12 +3,19 @@ Attachments and Images upload routes for Knowledge Repository
 """
 
 import os
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
-from auth import auth_required
+from auth import auth_required, get_current_user
 from config import config
 from models.attachments import Attachments
+from models.blobs import Blobs
+from models.image_derivatives import ImageDerivatives
+from models.upload_sessions import UploadSessions
+import extraction
+import images
+import storage
 
 attachments_bp = Blueprint('attachments', __name__)
 
@@ -16,10 +23,33 @@ attachments_bp = Blueprint('attachments', __name__)
 os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
 
 
-def generate_unique_filename(original_filename):
-    """Generate a unique filename preserving extension."""
-    ext = os.path.splitext(original_filename)[1]
-    return f"{int(__import__('time').time() * 1000)}-{uuid.uuid4()}{ext}"
+def store_upload(file):
+    """
+    Stream an uploaded file to disk, hashing it in the same pass, and place it
+    under its content-addressed path unless identical bytes are already stored.
+    Returns (sha256, relative_path, size, staged_path), see place_upload().
+    """
+    temp_path, sha256, size = storage.stream_to_temp(file.stream)
+    relpath, staged_path = place_upload(temp_path, sha256, file.filename, file.content_type)
+    return sha256, relpath, size, staged_path
+
+
+def place_upload(temp_path, sha256, original_filename, content_type=None):
+    """
+    Move a staged upload into blob storage. Returns (path, staged_path).
+    For content that is already stored the staged copy is kept and returned
+    as staged_path: pass it on to Blobs, which drops it once the blob row is
+    locked, or stores it again if the garbage collector removed the blob.
+    """
+    existing_path = Blobs.get_path(sha256)
+    if existing_path:
+        # Duplicate content - only metadata needs to be written
+        return existing_path, temp_path
+    
+    ext = os.path.splitext(secure_filename(original_filename))[1]
+    relpath = storage.blob_path(sha256, ext)
+    storage.place_blob(temp_path, relpath, content_type)
+    return relpath, None
 
 
 @attachments_bp.route('/attachments', methods=['POST'])
@@ -34,30 +64,23 @@ def upload_attachment():
         if file.filename == '':
             return jsonify({'error': 'File is required'}), 400
         
-        # Generate unique filename
-        filename = generate_unique_filename(secure_filename(file.filename))
-        filepath = os.path.join(config.UPLOAD_FOLDER, filename)
-        
-        # Save file
-        file.save(filepath)
-        
-        # Get file size
-        file_size = os.path.getsize(filepath)
-        
-        # Generate URL
-        file_url = f'/uploads/{filename}'
+        # Stream to content-addressed storage
+        sha256, relpath, file_size, staged_path = store_upload(file)
         
         # Get article_id if provided
         article_id = request.form.get('articleId')
         
-        # Create attachment record
-        attachment = Attachments.create(
+        # Create attachment record referencing the shared blob
+        attachment = Attachments.create_from_blob(
+            sha256,
+            relpath,
             article_id=article_id if article_id else None,
             file_name=file.filename,
             mime_type=file.content_type,
             size=file_size,
-            url=file_url
+            staged_path=staged_path
         )
+        extraction.schedule_extraction(attachment)
         
         return jsonify(attachment), 201
         
@@ -82,26 +105,271 @@ def upload_image():
         if not file.content_type or not file.content_type.startswith('image/'):
             return jsonify({'error': 'Only image files are allowed'}), 400
         
-        # Generate unique filename
-        filename = generate_unique_filename(secure_filename(file.filename))
-        filepath = os.path.join(config.UPLOAD_FOLDER, filename)
-        
-        # Save file
-        file.save(filepath)
-        
-        # Get file size
-        file_size = os.path.getsize(filepath)
+        # Stream to content-addressed storage
+        sha256, relpath, file_size, staged_path = store_upload(file)
+        relpath = Blobs.register(sha256, relpath, file_size, file.content_type, staged_path)
         
         # Generate URL
-        file_url = f'/uploads/{filename}'
+        file_url = f'/uploads/{relpath}'
         
-        return jsonify({
+        result = {
             'url': file_url,
             'fileName': file.filename,
             'mimeType': file.content_type,
-            'size': file_size
-        }), 201
+            'size': file_size,
+            'sha256': sha256
+        }
+        
+        # Resized variants are generated in the background; their URLs are
+        # deterministic and fall back to the original until they exist
+        width = images.probe_width(relpath) if images.is_enabled() else None
+        widths = images.target_widths(width)
+        if widths:
+            images.schedule_derivatives(sha256, relpath, widths)
+            result['width'] = width
+            result['srcset'] = images.srcset(sha256, widths, file_url, width)
+        
+        return jsonify(result), 201
         
     except Exception as e:
         print(f'Image upload error: {e}')
         return jsonify({'error': str(e)}), 500
+
+
+@attachments_bp.route('/images/<sha256>', methods=['GET'])
+def get_image(sha256):
+    """Get an inline image with its generated derivatives."""
+    try:
+        path = Blobs.get_path(sha256)
+        if not path:
+            return jsonify({'error': 'Image not found'}), 404
+        
+        url = f'/uploads/{path}'
+        derivatives = ImageDerivatives.get_by_blob(sha256)
+        width = images.probe_width(path)
+        
+        result = {'url': url, 'width': width, 'derivatives': derivatives}
+        if derivatives and width:
+            entries = [f"{d['url']} {d['width']}w" for d in derivatives]
+            result['srcset'] = ', '.join(entries + [f'{url} {width}w'])
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ==========================================
+# Resumable Uploads
+# ==========================================
+
+_completion_executor = None
+_completion_executor_pid = None
+_completion_executor_lock = threading.Lock()
+
+
+def _get_completion_executor():
+    """Get the per-process upload completion pool, recreating it after a fork."""
+    global _completion_executor, _completion_executor_pid
+    
+    if config.UPLOAD_COMPLETION_WORKERS <= 0:
+        return None
+    
+    with _completion_executor_lock:
+        if _completion_executor is None or _completion_executor_pid != os.getpid():
+            _completion_executor = ThreadPoolExecutor(
+                max_workers=config.UPLOAD_COMPLETION_WORKERS,
+                thread_name_prefix='upload-completion'
+            )
+            _completion_executor_pid = os.getpid()
+        return _completion_executor
+
+
+def _get_owned_session(id):
+    """Get an upload session owned by the current user, or None."""
+    session = UploadSessions.get_by_id(id)
+    if not session or session['user_id'] != get_current_user()['id']:
+        return None
+    # A completion job lost to a worker restart would leave it processing forever
+    if session['status'] == 'processing' and UploadSessions.reopen_if_interrupted(id):
+        session = UploadSessions.get_by_id(id)
+    return session
+
+
+def _session_status(session):
+    part_path = storage.session_part_path(session['id'])
+    status = {
+        'id': session['id'],
+        'fileName': session['file_name'],
+        'size': session['size'],
+        'offset': storage.staged_size(part_path) if session['status'] == 'open' else session['size'],
+        'chunkSize': config.UPLOAD_CHUNK_SIZE,
+        'status': session['status']
+    }
+    if session['status'] == 'complete':
+        status['attachment'] = Attachments.get_by_id(session['attachment_id'])
+    elif session['status'] == 'failed':
+        status['error'] = session['error']
+    return status
+
+
+def finish_upload_session(session, started_at, expected_sha256=None):
+    """
+    Hash a fully received upload, store it and create its attachment, then
+    record the outcome on the session (runs in the completion pool).
+    `started_at` is the claim returned by UploadSessions.start_processing().
+    """
+    part_path = storage.session_part_path(session['id'])
+    try:
+        # Hash from disk in chunks; the staged file is moved, never copied
+        sha256, file_size = storage.hash_file(part_path)
+        
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            storage.discard_temp(part_path)
+            UploadSessions.finish(session['id'], started_at, 'failed', error='Checksum mismatch')
+            return
+        
+        relpath, staged_path = place_upload(part_path, sha256, session['file_name'], session['mime_type'])
+        attachment = Attachments.create_from_blob(
+            sha256,
+            relpath,
+            article_id=session['article_id'],
+            file_name=session['file_name'],
+            mime_type=session['mime_type'],
+            size=file_size,
+            staged_path=staged_path
+        )
+        UploadSessions.finish(session['id'], started_at, 'complete', attachment_id=attachment['id'])
+        extraction.schedule_extraction(attachment)
+    except Exception as e:
+        print(f'Upload completion error for {session["id"]}: {e}')
+        UploadSessions.finish(session['id'], started_at, 'failed', error=str(e))
+
+
+@attachments_bp.route('/upload-sessions', methods=['POST'])
+@auth_required
+def create_upload_session():
+    """Start a resumable upload: {fileName, size, mimeType?, articleId?}."""
+    try:
+        data = request.get_json() or {}
+        file_name = data.get('fileName')
+        size = data.get('size')
+        
+        if not file_name or not isinstance(size, int) or size <= 0:
+            return jsonify({'error': 'fileName and a positive size are required'}), 400
+        
+        if size > config.MAX_UPLOAD_SIZE:
+            return jsonify({'error': 'File exceeds the maximum upload size'}), 413
+        
+        session = UploadSessions.create(
+            get_current_user()['id'],
+            file_name,
+            size,
+            mime_type=data.get('mimeType'),
+            article_id=data.get('articleId')
+        )
+        return jsonify(_session_status(session)), 201
+        
+    except Exception as e:
+        print(f'Upload session error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
+@attachments_bp.route('/upload-sessions/<id>', methods=['GET'])
+@auth_required
+def get_upload_session(id):
+    """Get the current offset of an upload session (used to resume)."""
+    session = _get_owned_session(id)
+    if not session:
+        return jsonify({'error': 'Upload session not found'}), 404
+    return jsonify(_session_status(session))
+
+
+@attachments_bp.route('/upload-sessions/<id>', methods=['PUT'])
+@auth_required
+def upload_chunk(id):
+    """Append a chunk (raw request body) at ?offset=N."""
+    try:
+        session = _get_owned_session(id)
+        if not session:
+            return jsonify({'error': 'Upload session not found'}), 404
+        
+        if session['status'] != 'open':
+            return jsonify({'error': 'Upload is already completed', 'status': session['status']}), 409
+        
+        offset = request.args.get('offset', type=int)
+        if offset is None or offset < 0 or offset > session['size']:
+            return jsonify({'error': 'A valid offset is required'}), 400
+        
+        part_path = storage.session_part_path(id)
+        new_size = storage.append_chunk(part_path, request.stream, offset, session['size'] - offset)
+        return jsonify({'id': id, 'offset': new_size, 'size': session['size']})
+        
+    except storage.OffsetMismatch as e:
+        # Chunks must be sent in order; a mismatch tells the client where to resume
+        return jsonify({'error': 'Offset mismatch', 'offset': e.offset}), 409
+    except storage.ChunkInProgress as e:
+        # A retry while the original request is still streaming; resume once it ends
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 409
+    except Exception as e:
+        print(f'Upload chunk error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
+@attachments_bp.route('/upload-sessions/<id>/complete', methods=['POST'])
+@auth_required
+def complete_upload_session(id):
+    """
+    Finish an upload session. Optional body: {sha256}.
+    Hashing and storing happen in the background: the response is 202 and
+    GET /upload-sessions/<id> reports status 'complete' with the attachment
+    (or 'failed' with an error) once done.
+    """
+    try:
+        session = _get_owned_session(id)
+        if not session:
+            return jsonify({'error': 'Upload session not found'}), 404
+        
+        if session['status'] == 'open':
+            received = storage.staged_size(storage.session_part_path(id))
+            if received != session['size']:
+                return jsonify({'error': 'Upload is incomplete', 'offset': received}), 409
+            
+            # A repeated complete request finds the session already processing
+            started_at = UploadSessions.start_processing(id)
+            if started_at is not None:
+                expected = (request.get_json(silent=True) or {}).get('sha256')
+                executor = _get_completion_executor()
+                if executor is None:
+                    finish_upload_session(session, started_at, expected)
+                else:
+                    executor.submit(finish_upload_session, session, started_at, expected)
+            session = UploadSessions.get_by_id(id)
+        
+        status = _session_status(session)
+        if session['status'] == 'complete':
+            return jsonify(status), 201
+        if session['status'] == 'failed':
+            return jsonify(status), 422
+        return jsonify(status), 202
+        
+    except Exception as e:
+        print(f'Upload completion error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
+@attachments_bp.route('/upload-sessions/<id>', methods=['DELETE'])
+@auth_required
+def abort_upload_session(id):
+    """Abort an upload session and discard staged data."""
+    session = _get_owned_session(id)
+    if not session:
+        return jsonify({'error': 'Upload session not found'}), 404
+    
+    if session['status'] == 'processing':
+        return jsonify({'error': 'Upload is being completed', 'status': session['status']}), 409
+    
+    storage.discard_temp(storage.session_part_path(id))
+    UploadSessions.delete(id)
+    return jsonify({'success': True})
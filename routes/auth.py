@@ -3,12 +3,22 @@ Authentication routes for Knowledge Repository
 """
 
 from flask import Blueprint, request, jsonify
-from auth import hash_password, verify_password, create_token, auth_required, get_current_user
+from auth import (
+    hash_password, verify_password, password_needs_rehash, PasswordHashingBusy,
+    create_token, auth_required, get_current_user
+)
 from models.users import Users
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def _busy_response():
+    """503 returned when the password hashing pool is saturated."""
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user."""
@@ -39,6 +49,8 @@ def register():
             'session': None  # Require approval before login
         }), 201
         
+    except PasswordHashingBusy:
+        return _busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -59,8 +71,13 @@ def login():
         if not user.get('approved') and not user.get('is_root'):
             return jsonify({'error': 'Account is pending admin approval'}), 403
         
-        # Update last login
-        Users.update_last_login(user['id'])
+        # Transparently upgrade hashes created with a different iteration count
+        new_hash = None
+        if password_needs_rehash(user['password_hash']):
+            new_hash = hash_password(password)
+        
+        # Update last login (and upgraded hash) in one statement
+        Users.update_last_login(user['id'], password_hash=new_hash)
         
         # Create JWT token
         token = create_token({
@@ -82,6 +99,8 @@ def login():
             }
         })
         
+    except PasswordHashingBusy:
+        return _busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
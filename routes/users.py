@@ -8,19 +8,57 @@ from models.users import Users
 
 users_bp = Blueprint('users', __name__)
 
+MAX_PAGE_SIZE = 200
+
 
 @users_bp.route('', methods=['GET'])
 @admin_required
 def get_all():
-    """Get all users (admin only)."""
+    """
+    Get users (admin only).
+    Supports ?approved=true|false, ?role=, ?q=<email prefix>.
+    Passing ?limit= and/or ?cursor= returns a page: {users, next_cursor}.
+    """
     try:
-        users = Users.get_all()
-        return jsonify(users)
+        approved = request.args.get('approved')
+        if approved is not None and approved not in ('true', 'false'):
+            return jsonify({'error': 'approved must be "true" or "false"'}), 400
+        
+        filters = {
+            'approved': None if approved is None else approved == 'true',
+            'role': request.args.get('role'),
+            'email_prefix': request.args.get('q')
+        }
+        
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            users = Users.get_all(filters)
+            return jsonify(users)
+        
+        limit = request.args.get('limit', 50, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        try:
+            page = Users.get_page(filters, limit, request.args.get('cursor'))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify(page)
     except Exception as e:
         print(f'Error listing users: {e}')
         return jsonify({'error': str(e)}), 500
 
 
+@users_bp.route('/pending-count', methods=['GET'])
+@admin_required
+def get_pending_count():
+    """Get the number of users awaiting approval (admin only)."""
+    try:
+        return jsonify({'count': Users.count_pending()})
+    except Exception as e:
+        print(f'Error counting pending users: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
 @users_bp.route('/<int:id>/role', methods=['PUT'])
 @admin_required
 def update_role(id):
@@ -0,0 +1,187 @@
+"""
+Slow-query log for Knowledge Repository
+Statements slower than SLOW_QUERY_MS are logged as JSON lines with redacted
+parameters, duration and the calling route. A sample of slow SELECTs is
+re-run in the background under EXPLAIN (ANALYZE, BUFFERS) on the engine that
+ran it, and the plan is logged alongside. Recent entries are kept per worker
+for the admin endpoint.
+"""
+
+import os
+import json
+import time
+import random
+import itertools
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+from flask import has_request_context, request
+from sqlalchemy import event
+from config import config
+import metrics
+
+# Plans waiting beyond this are dropped rather than queued
+MAX_PENDING_EXPLAINS = 4
+
+_recent = deque(maxlen=max(1, config.SLOW_QUERY_RECENT))
+_recent_lock = threading.Lock()
+_sequence = itertools.count(1)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(MAX_PENDING_EXPLAINS)
+
+_file_logger = None
+_file_logger_lock = threading.Lock()
+
+
+def _get_executor():
+    """Get the per-process EXPLAIN worker, recreating it after a fork."""
+    global _executor, _executor_pid
+    
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _get_file_logger():
+    global _file_logger
+    
+    with _file_logger_lock:
+        if _file_logger is None and config.SLOW_QUERY_LOG_FILE:
+            handler = RotatingFileHandler(
+                config.SLOW_QUERY_LOG_FILE,
+                maxBytes=config.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=config.SLOW_QUERY_LOG_BACKUPS,
+                encoding='utf-8'
+            )
+            logger = logging.getLogger('knowledge_repo.slow_queries')
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            _file_logger = logger
+        return _file_logger
+
+
+def _write(entry):
+    line = json.dumps(entry, ensure_ascii=False, default=str)
+    logger = _get_file_logger()
+    if logger is not None:
+        logger.info(line)
+    else:
+        print(line)
+
+
+def redact(parameters):
+    """Keep numbers, booleans and NULLs; replace strings and blobs with their length."""
+    def scrub(value):
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, (str, bytes)):
+            return f'<redacted {len(value)} chars>'
+        if isinstance(value, (list, tuple)):
+            return [scrub(v) for v in value]
+        return f'<redacted {type(value).__name__}>'
+    
+    if isinstance(parameters, dict):
+        return {key: scrub(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [scrub(value) for value in parameters]
+    return scrub(parameters)
+
+
+def _is_select(statement):
+    return statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH')
+
+
+def _explain(engine, statement, parameters, entry_id):
+    """Re-run a statement under EXPLAIN on its own connection and log the plan."""
+    try:
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if engine.dialect.name == 'postgresql':
+                cursor.execute('SET TRANSACTION READ ONLY')
+                cursor.execute(f'SET LOCAL statement_timeout = {config.SLOW_QUERY_EXPLAIN_TIMEOUT * 1000}')
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + statement, parameters)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+            cursor.close()
+        finally:
+            raw.rollback()
+            raw.close()
+    except Exception as e:
+        plan = f'EXPLAIN failed: {e}'
+    finally:
+        _pending.release()
+    
+    with _recent_lock:
+        for entry in _recent:
+            if entry['id'] == entry_id:
+                entry['plan'] = plan
+                break
+    metrics.increment('sql.slow_explains')
+    _write({'event': 'slow_query_plan', 'id': entry_id, 'plan': plan})
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, not conn.info: a statement that raises never
+    # reaches after_cursor_execute and would leave its start time behind
+    if context is not None:
+        context._slow_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_slow_query_start', None)
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms < config.SLOW_QUERY_MS:
+        return
+    
+    entry = {
+        'event': 'slow_query',
+        'id': next(_sequence),
+        'pid': os.getpid(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'duration_ms': round(duration_ms, 1),
+        'route': f'{request.method} {request.path} ({request.endpoint})' if has_request_context() else 'background',
+        'database': conn.engine.url.render_as_string(hide_password=True),
+        'statement': statement[:4000],
+        'parameters': redact(parameters),
+        'plan': None
+    }
+    with _recent_lock:
+        _recent.append(entry)
+    metrics.increment('sql.slow_queries')
+    _write(entry)
+    
+    if (
+        not executemany
+        and _is_select(statement)
+        and random.random() < config.SLOW_QUERY_EXPLAIN_SAMPLE
+        and _pending.acquire(blocking=False)
+    ):
+        _get_executor().submit(_explain, conn.engine, statement, parameters, entry['id'])
+
+
+def recent():
+    """Most recent slow queries for this worker, newest first."""
+    with _recent_lock:
+        return [dict(entry) for entry in reversed(_recent)]
+
+
+def init_app(app):
+    if config.SLOW_QUERY_MS <= 0:
+        return
+    
+    import database
+    for engine in [database.engine] + database.replica_engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,335 @@
+"""
+Upload storage for Knowledge Repository
+Streams uploads to local staging while hashing them, then stores
+content-addressed blobs on local disk or in S3-compatible object storage
+"""
+
+import os
+import re
+import hashlib
+import posixpath
+import tempfile
+import threading
+import unicodedata
+from urllib.parse import quote
+from werkzeug.http import dump_options_header
+from config import config
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows - concurrent chunk writes are then not detected
+    fcntl = None
+
+# Read/write size used when streaming uploads to disk
+CHUNK_SIZE = 64 * 1024
+
+# Staging directory for in-flight uploads (same filesystem as local blobs,
+# so placing a finished upload is an atomic rename)
+TEMP_FOLDER = os.path.join(config.UPLOAD_FOLDER, '.tmp')
+
+
+def stream_to_temp(stream):
+    """
+    Copy an upload stream to a temporary file in chunks, hashing as it goes.
+    Returns (temp_path, sha256_hex, size).
+    """
+    os.makedirs(TEMP_FOLDER, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=TEMP_FOLDER)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        discard_temp(temp_path)
+        raise
+
+    return temp_path, digest.hexdigest(), size
+
+
+def discard_temp(temp_path):
+    """Remove a staged upload, ignoring files that are already gone."""
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def session_part_path(session_id):
+    """Staging file for a resumable upload session."""
+    return os.path.join(TEMP_FOLDER, f'{session_id}.part')
+
+
+def staged_size(part_path):
+    """Number of bytes received so far for a staged upload."""
+    try:
+        return os.path.getsize(part_path)
+    except FileNotFoundError:
+        return 0
+
+
+class OffsetMismatch(Exception):
+    """A chunk does not start where the staged upload currently ends."""
+
+    def __init__(self, offset):
+        super().__init__(f'Staged upload is at offset {offset}')
+        self.offset = offset
+
+
+class ChunkInProgress(Exception):
+    """Another request is still writing to the staged upload."""
+
+
+def append_chunk(part_path, stream, offset, limit):
+    """
+    Write at most `limit` bytes from a stream to a staged upload at `offset`.
+    The staging file is exclusively locked while the offset is checked and
+    the chunk written, so a retried chunk cannot interleave with the request
+    it retries. Raises ChunkInProgress if another request holds the lock and
+    OffsetMismatch if `offset` is not the staged size. Returns the new staged size.
+    """
+    os.makedirs(TEMP_FOLDER, exist_ok=True)
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd, 'r+b') as out:
+        if fcntl is not None:
+            try:
+                fcntl.flock(out, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ChunkInProgress('A chunk for this upload is still being written')
+
+        current = os.fstat(out.fileno()).st_size
+        if offset != current:
+            raise OffsetMismatch(current)
+
+        out.seek(offset)
+        remaining = limit
+        while remaining > 0:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            out.write(chunk)
+            remaining -= len(chunk)
+        return out.tell()
+
+
+def hash_file(path):
+    """Compute (sha256_hex, size) of a file by streaming it in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+# Upload names that can never point at different bytes: content-addressed
+# blobs/derivatives, and legacy <millis>-<uuid4> names
+_IMMUTABLE_NAME_RE = re.compile(
+    r'^(?:[0-9a-f]{64}(?:-\d+w)?'
+    r'|\d{13}-[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?:\.\w+)?$'
+)
+
+
+def is_immutable_path(relpath):
+    """Whether an upload path is unique to its content and safe to cache forever."""
+    return bool(_IMMUTABLE_NAME_RE.match(posixpath.basename(relpath)))
+
+
+def public_upload_path(relpath):
+    """
+    Normalized form of a requested /uploads path, or None if it is absolute or
+    any segment is '..' or hidden (the staging folder and other dot-files).
+    """
+    relpath = posixpath.normpath(relpath)
+    if posixpath.isabs(relpath) or any(part.startswith('.') for part in relpath.split('/')):
+        return None
+    return relpath
+
+
+def content_etag(relpath):
+    """Strong ETag for an immutable upload (its unique name, without extension)."""
+    return posixpath.splitext(posixpath.basename(relpath))[0]
+
+
+def legacy_shard_path(name):
+    """Sharded location of a pre-blob flat upload: legacy/ab/cd/<name>"""
+    h = hashlib.md5(name.encode()).hexdigest()
+    return f'legacy/{h[:2]}/{h[2:4]}/{name}'
+
+
+def resolve_legacy_path(name):
+    """
+    Where a flat /uploads/<name> file lives now: the uploads root if it has
+    not been migrated yet, otherwise its sharded legacy path.
+    """
+    if '/' in name or os.path.isfile(os.path.join(config.UPLOAD_FOLDER, name)):
+        return name
+    return legacy_shard_path(name)
+
+
+def content_disposition(file_name, disposition='inline'):
+    """
+    Content-Disposition header value for a user-supplied file name, built as
+    werkzeug's send_file() does: quoted and escaped, with an RFC 5987
+    filename* parameter and an ASCII fallback for non-ASCII names.
+    """
+    try:
+        file_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', file_name).encode('ascii', 'ignore').decode('ascii')
+        quoted = quote(file_name, safe="!#$&+^`|~")
+        options = {'filename': simple, 'filename*': f"UTF-8''{quoted}"}
+    else:
+        options = {'filename': file_name}
+    return dump_options_header(disposition, options)
+
+
+def blob_path(sha256, ext=''):
+    """Content-addressed relative path: ab/cd/<sha256><ext> (URL-style separators)."""
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}{ext.lower()}'
+
+
+class LocalStorage:
+    """Blobs stored under config.UPLOAD_FOLDER and served by Flask."""
+
+    def _full_path(self, relpath):
+        return os.path.join(config.UPLOAD_FOLDER, *relpath.split('/'))
+
+    def exists(self, relpath):
+        return os.path.exists(self._full_path(relpath))
+
+    def save(self, temp_path, relpath, content_type=None):
+        """Move a staged file into place (atomic rename)."""
+        final_path = self._full_path(relpath)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+
+    def open(self, relpath):
+        return open(self._full_path(relpath), 'rb')
+
+    def delete(self, relpath):
+        try:
+            os.remove(self._full_path(relpath))
+        except FileNotFoundError:
+            pass
+
+    def download_url(self, relpath, file_name=None):
+        """Local blobs have no external URL; /uploads serves them directly."""
+        return None
+
+
+class S3Storage:
+    """Blobs stored in an S3-compatible bucket, downloaded via presigned URLs."""
+
+    def __init__(self):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = config.S3_BUCKET
+        self.prefix = config.S3_KEY_PREFIX
+        self.client = boto3.client(
+            's3',
+            region_name=config.S3_REGION,
+            endpoint_url=config.S3_ENDPOINT,
+            aws_access_key_id=config.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=config.S3_SECRET_ACCESS_KEY
+        )
+        # Large files go up as multipart uploads in parallel parts
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=config.S3_MULTIPART_THRESHOLD
+        )
+
+    def _key(self, relpath):
+        return f'{self.prefix}{relpath}'
+
+    def exists(self, relpath):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(relpath))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def save(self, temp_path, relpath, content_type=None):
+        """Upload a staged file and remove the local copy."""
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_file(
+            temp_path,
+            self.bucket,
+            self._key(relpath),
+            ExtraArgs=extra_args,
+            Config=self.transfer_config
+        )
+        discard_temp(temp_path)
+
+    def open(self, relpath):
+        """Download a blob into a spooled temp file (memory for small objects)."""
+        f = tempfile.SpooledTemporaryFile(max_size=config.S3_MULTIPART_THRESHOLD)
+        self.client.download_fileobj(self.bucket, self._key(relpath), f, Config=self.transfer_config)
+        f.seek(0)
+        return f
+
+    def delete(self, relpath):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(relpath))
+
+    def download_url(self, relpath, file_name=None):
+        """Presigned GET URL so downloads go straight to the object store."""
+        params = {'Bucket': self.bucket, 'Key': self._key(relpath)}
+        if file_name:
+            params['ResponseContentDisposition'] = content_disposition(file_name)
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params=params,
+            ExpiresIn=config.S3_PRESIGN_EXPIRY
+        )
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Get the configured storage backend (config.STORAGE_BACKEND)."""
+    global _storage
+    # Locked: threaded workers may race here, and boto3 client creation is not thread-safe
+    with _storage_lock:
+        if _storage is None:
+            if config.STORAGE_BACKEND == 's3':
+                _storage = S3Storage()
+            elif config.STORAGE_BACKEND == 'local':
+                _storage = LocalStorage()
+            else:
+                raise ValueError(f'Unknown storage backend: {config.STORAGE_BACKEND}')
+        return _storage
+
+
+def place_blob(temp_path, relpath, content_type=None, replace=False):
+    """
+    Move a staged upload to its content-addressed location.
+    If the blob is already stored the staged copy is discarded, unless
+    `replace` is set (the stored file may be about to be garbage collected).
+    """
+    backend = get_storage()
+    if not replace and backend.exists(relpath):
+        discard_temp(temp_path)
+        return
+    backend.save(temp_path, relpath, content_type)
+
+
+def remove_blob(relpath):
+    """Delete a stored blob."""
+    get_storage().delete(relpath)
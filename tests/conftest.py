@@ -0,0 +1,56 @@
+"""
+Shared fixtures for Knowledge Repository tests
+Runs the app against a throwaway SQLite database and upload folder.
+"""
+
+import os
+import sys
+import tempfile
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix='knowledge-repo-tests-')
+
+# Must be set before config is imported
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_workdir, 'test.db')
+os.environ['JWT_SECRET'] = 'test-secret'
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ['PASSWORD_HASH_SLOT_DIR'] = os.path.join(_workdir, 'hash-slots')
+os.environ['EXTRACTION_WORKERS'] = '0'
+os.environ['IMAGE_DERIVATIVE_WORKERS'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config  # noqa: E402
+
+config.UPLOAD_FOLDER = os.path.join(_workdir, 'uploads')
+config.ASSET_CACHE_FOLDER = os.path.join(_workdir, 'asset-cache')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app, seed_default_data
+    from database import init_db
+
+    init_db()
+    seed_default_data()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(app):
+    """Authorization header for an approved admin user."""
+    from auth import hash_password
+    from models.users import Users
+
+    user = Users.get_by_email('admin@example.com')
+    if user is None:
+        user = Users.create('admin@example.com', hash_password('password'), 'admin', True)
+    response = app.test_client().post('/api/auth/login', json={'email': 'admin@example.com', 'password': 'password'})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': 'Bearer ' + response.get_json()['session']['access_token']}
@@ -0,0 +1,63 @@
+"""
+Article search on SQLite FTS5
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from database import get_db
+from models import articles
+from models.orm import sqlite_fts_supported
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/fts.db')
+    if not sqlite_fts_supported(engine.dialect):
+        pytest.skip('SQLite without the FTS5 trigram tokenizer')
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+
+def test_fts_tables_found_after_migration(session):
+    assert not articles._has_sqlite_fts(session)
+
+    # Tables created later (migration 0003) are picked up without a restart
+    session.execute(text("CREATE VIRTUAL TABLE articles_fts USING fts5(title, tokenize='trigram')"))
+    session.execute(text("CREATE VIRTUAL TABLE attachments_fts USING fts5(extracted_text, tokenize='trigram')"))
+    session.commit()
+
+    assert articles._has_sqlite_fts(session)
+
+
+def test_search_uses_fts(client, admin_headers):
+    db = get_db()
+    try:
+        assert articles._has_sqlite_fts(db)
+    finally:
+        db.close()
+
+    response = client.post('/api/articles', headers=admin_headers, json={
+        'title': 'Quarterly fulfilment playbook',
+        'content': '<p>Steps for the warehouse team</p>'
+    })
+    assert response.status_code == 201
+
+    results = client.get('/api/articles/search?q=ulfilmen', headers=admin_headers).get_json()
+
+    assert [a['title'] for a in results] == ['Quarterly fulfilment playbook']
+    assert results[0]['matchField'] == 'title'
+
+
+@pytest.mark.parametrize('term, fts', [('ab', True), ('report', False)])
+def test_attachment_text_only_searched_through_an_index(session, term, fts):
+    if fts:
+        session.execute(text("CREATE VIRTUAL TABLE articles_fts USING fts5(title, tokenize='trigram')"))
+        session.execute(text("CREATE VIRTUAL TABLE attachments_fts USING fts5(extracted_text, tokenize='trigram')"))
+        session.commit()
+
+    _, attachment_match = articles.Articles._match_conditions(session, term, f'%{term}%')
+
+    assert str(attachment_match.compile()) == 'false'
+    assert not articles._has_pg_trgm_index(session)
@@ -0,0 +1,115 @@
+"""
+ASGI read path (asgi.py) against the Flask routes it stands in for
+"""
+
+import json
+import asyncio
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+import asgi  # noqa: E402
+
+
+def _call(app_, path, headers):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        try:
+            await app_(scope, receive, send)
+        finally:
+            for engine in [asgi._primary] + asgi._replicas:
+                if engine is not None:
+                    await engine.dispose()
+
+    asyncio.run(run())
+    start, body = messages
+    return start['status'], json.loads(body['body'])
+
+
+@pytest.fixture
+def asgi_get(monkeypatch):
+    # Engines are bound to the event loop that created them; one per call here
+    def get(path, headers={}):
+        monkeypatch.setattr(asgi, '_primary', None)
+        monkeypatch.setattr(asgi, '_replicas', [])
+        return _call(asgi.app, path, headers)
+    return get
+
+
+@pytest.fixture(scope='module')
+def articles(app, admin_headers):
+    client = app.test_client()
+    for i in range(3):
+        response = client.post('/api/articles', headers=admin_headers, json={
+            'title': f'ASGI handbook {i}',
+            'summary': f'Summary {i}',
+            'content': f'<p>Read path {i}</p>',
+            'category_id': 1,
+            'tags': ['asgi', f'part-{i}']
+        })
+        assert response.status_code == 201
+    return client.get('/api/articles').get_json()
+
+
+def _without_views(payload):
+    if isinstance(payload, list):
+        return [_without_views(item) for item in payload]
+    return {key: value for key, value in payload.items() if key not in ('views', 'updated_at')}
+
+
+@pytest.mark.parametrize('path', [
+    '/api/articles',
+    '/api/articles?category_id=1',
+    '/api/articles/search?q=handbook',
+    '/api/articles/search?q=',
+    '/api/articles/999999'
+])
+def test_matches_flask(client, articles, asgi_get, path):
+    expected = client.get(path)
+
+    status, payload = asgi_get(path)
+
+    assert status == expected.status_code
+    assert _without_views(payload) == _without_views(expected.get_json())
+
+
+def test_single_article_bumps_views(client, articles, asgi_get):
+    id = articles[0]['id']
+    views = client.get(f'/api/articles/{id}').get_json()['views']
+
+    status, payload = asgi_get(f'/api/articles/{id}')
+
+    assert status == 200
+    assert payload['views'] == views + 1
+    assert client.get(f'/api/articles/{id}').get_json()['views'] == views + 2
+
+
+def test_favorites(client, admin_headers, articles, asgi_get):
+    response = client.post(f'/api/favorites/{articles[0]["id"]}', headers=admin_headers)
+    assert response.status_code in (200, 201)
+
+    assert asgi_get('/api/favorites')[0] == 401
+    status, payload = asgi_get('/api/favorites', admin_headers)
+
+    assert status == 200
+    assert articles[0]['id'] in [favorite['article_id'] for favorite in payload]
+    assert payload == client.get('/api/favorites', headers=admin_headers).get_json()
+
+
+def test_invalid_filter(asgi_get):
+    assert asgi_get('/api/articles?category_id=x') == (400, {'error': 'Invalid category_id'})
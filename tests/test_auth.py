@@ -0,0 +1,97 @@
+"""
+Password hashing tests: stored hash formats and the host-wide hashing limit
+"""
+
+import os
+import sys
+import hashlib
+import subprocess
+import pytest
+import auth
+from auth import (
+    LEGACY_HASH_ITERATIONS, PasswordHashingBusy,
+    hash_password, verify_password, password_needs_rehash, _parse_password_hash
+)
+from config import config
+
+
+def test_legacy_format_is_salt_and_hash():
+    stored = hash_password('secret', iterations=LEGACY_HASH_ITERATIONS)
+    salt, digest = stored.split(':')
+    assert _parse_password_hash(stored) == (salt, digest, LEGACY_HASH_ITERATIONS)
+    assert verify_password('secret', stored)
+    assert not verify_password('wrong', stored)
+
+
+def test_legacy_format_matches_nodejs_pbkdf2():
+    salt = 'a' * 32
+    digest = hashlib.pbkdf2_hmac('sha512', b'secret', salt.encode(), LEGACY_HASH_ITERATIONS, dklen=64).hex()
+    assert verify_password('secret', f'{salt}:{digest}')
+
+
+def test_iterations_format_is_salt_hash_iterations():
+    stored = hash_password('secret', iterations=1000)
+    salt, digest, iterations = stored.split(':')
+    assert _parse_password_hash(stored) == (salt, digest, 1000)
+    assert verify_password('secret', stored)
+    assert not verify_password('wrong', stored)
+
+
+def test_needs_rehash_when_iterations_differ(monkeypatch):
+    monkeypatch.setattr(config, 'PASSWORD_HASH_ITERATIONS', 1000)
+    assert password_needs_rehash(hash_password('secret', iterations=LEGACY_HASH_ITERATIONS))
+    assert not password_needs_rehash(hash_password('secret', iterations=1000))
+
+
+@pytest.mark.parametrize('stored', ['', 'nocolon', 'a:b:c:d', 'a:b:notanumber'])
+def test_malformed_hash_never_verifies(stored):
+    assert not verify_password('secret', stored)
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    monkeypatch.setattr(config, 'PASSWORD_HASH_MAX_CONCURRENCY', 1)
+    monkeypatch.setattr(config, 'PASSWORD_HASH_QUEUE_TIMEOUT', 0.1)
+
+
+def test_busy_when_slot_held_by_another_process(one_slot):
+    # Another worker process holds the only slot
+    os.makedirs(config.PASSWORD_HASH_SLOT_DIR, exist_ok=True)
+    holder = subprocess.Popen(
+        [sys.executable, '-c', (
+            'import fcntl, os, sys, time\n'
+            f'fd = os.open({os.path.join(config.PASSWORD_HASH_SLOT_DIR, "slot-0.lock")!r}, os.O_RDWR | os.O_CREAT)\n'
+            'fcntl.flock(fd, fcntl.LOCK_EX)\n'
+            'print("locked", flush=True)\n'
+            'sys.stdin.read()\n'
+        )],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert holder.stdout.readline().strip() == 'locked'
+        with pytest.raises(PasswordHashingBusy):
+            hash_password('secret')
+    finally:
+        holder.stdin.close()
+        holder.wait()
+
+    # The slot is free again once the other process lets go
+    assert verify_password('secret', hash_password('secret'))
+
+
+def test_login_returns_503_when_busy(app, client, one_slot):
+    from models.users import Users
+
+    if Users.get_by_email('busy@example.com') is None:
+        Users.create('busy@example.com', hash_password('password'), 'user', True)
+
+    release = auth._acquire_hash_slot()
+    try:
+        response = client.post('/api/auth/login', json={'email': 'busy@example.com', 'password': 'password'})
+    finally:
+        release()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+    response = client.post('/api/auth/login', json={'email': 'busy@example.com', 'password': 'password'})
+    assert response.status_code == 200
@@ -0,0 +1,143 @@
+"""
+Attachment text extraction
+"""
+
+import os
+import hashlib
+import zipfile
+import threading
+import pytest
+import extraction
+import storage
+from config import config
+from database import get_db
+from models.orm import Attachment
+
+_DOCUMENT = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    '{paragraphs}'
+    '</w:body></w:document>'
+)
+
+
+def _docx(path, paragraphs):
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('word/document.xml', _DOCUMENT.format(paragraphs=body))
+    return str(path)
+
+
+def test_docx_paragraphs(tmp_path):
+    path = _docx(tmp_path / 'notes.docx', ['First paragraph', 'Second paragraph'])
+
+    assert extraction.extract_text(path, 'docx') == 'First paragraph Second paragraph'
+
+
+def test_docx_heavy_formatting_reaches_max_chars(tmp_path):
+    # Every character in its own run with a large property block, as
+    # tracked changes and pasted styles produce
+    run_properties = '<w:rPr>' + '<w:rFonts w:ascii="Calibri" w:hAnsi="Calibri"/><w:color w:val="1F3864"/>' * 20 + '</w:rPr>'
+    path = tmp_path / 'formatted.docx'
+    body = '<w:p>' + ''.join(f'<w:r>{run_properties}<w:t>{c}</w:t></w:r>' for c in 'abcdefghij' * 50) + '</w:p>'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('word/document.xml', _DOCUMENT.format(paragraphs=body))
+
+    assert extraction._extract_docx(str(path), 400) == 'abcdefghij' * 40
+
+
+def test_docx_tables_tabs_and_breaks(tmp_path):
+    body = (
+        '<w:p><w:r><w:t>Name</w:t><w:tab/><w:t>Value</w:t><w:br/><w:t>Next line</w:t></w:r></w:p>'
+        '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Cell one</w:t></w:r></w:p></w:tc>'
+        '<w:tc><w:p><w:r><w:t>Cell two</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+        '<w:p><w:r><w:t>After table</w:t></w:r></w:p>'
+    )
+    path = tmp_path / 'table.docx'
+    with zipfile.ZipFile(path, 'w') as docx:
+        docx.writestr('word/document.xml', _DOCUMENT.format(paragraphs=body))
+
+    assert extraction._extract_docx(str(path), 1000) == 'Name\tValue\nNext line\nCell one\nCell two\nAfter table\n'
+
+
+def test_docx_zip_bomb_is_bounded(tmp_path):
+    # ~50 MB of XML that deflates to well under 1 MB
+    path = tmp_path / 'bomb.docx'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as docx:
+        with docx.open('word/document.xml', 'w', force_zip64=True) as member:
+            member.write(_DOCUMENT.split('{paragraphs}')[0].encode())
+            paragraph = ('<w:p><w:r><w:t>' + 'x' * 1000 + '</w:t></w:r></w:p>').encode()
+            for _ in range(50_000):
+                member.write(paragraph)
+
+    text = extraction._extract_docx(str(path), 1000)
+
+    assert text == 'x' * 1000
+    text = extraction.extract_text(str(path), 'docx', max_chars=5000)
+    assert len(text) == 5000
+    assert set(text) == {'x', ' '}
+
+
+def test_concurrent_extraction_from_object_storage(app, monkeypatch):
+    moto = pytest.importorskip('moto')
+    from models.attachments import Attachments
+
+    monkeypatch.setattr(config, 'S3_BUCKET', 'knowledge-repo-extract')
+    monkeypatch.setattr(config, 'S3_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setattr(config, 'S3_SECRET_ACCESS_KEY', 'testing')
+    data = b'shared content extracted twice'
+    sha256 = hashlib.sha256(data).hexdigest()
+    relpath = storage.blob_path(sha256, '.txt')
+
+    with moto.mock_aws():
+        backend = storage.S3Storage()
+        backend.client.create_bucket(Bucket=config.S3_BUCKET)
+        backend.client.put_object(Bucket=config.S3_BUCKET, Key=backend._key(relpath), Body=data)
+        monkeypatch.setattr(storage, '_storage', backend)
+
+        attachments = [
+            Attachments.create_from_blob(sha256, relpath, file_name=f'copy{i}.txt', size=len(data))
+            for i in range(2)
+        ]
+        # Both jobs download their copy, then the second extracts only after
+        # the first has finished and cleaned up
+        monkeypatch.setattr(Attachments, 'get_extracted_text_by_blob', staticmethod(lambda sha256: None))
+        both_downloaded = threading.Barrier(2)
+        first_stored = threading.Event()
+        extract_text, set_extracted_text = extraction.extract_text, Attachments.set_extracted_text
+
+        def extract_in_turn(path, kind):
+            if both_downloaded.wait(5) != 0:
+                first_stored.wait(5)
+            return extract_text(path, kind)
+
+        def set_and_signal(id, text):
+            set_extracted_text(id, text)
+            first_stored.set()
+        monkeypatch.setattr(extraction, 'extract_text', extract_in_turn)
+        monkeypatch.setattr(Attachments, 'set_extracted_text', staticmethod(set_and_signal))
+
+        threads = [
+            threading.Thread(target=extraction.process_attachment, args=(a['id'], sha256, a['url'], 'text'))
+            for a in attachments
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    db = get_db()
+    try:
+        texts = [db.get(Attachment, a['id']).extracted_text for a in attachments]
+    finally:
+        db.close()
+    assert texts == [data.decode()] * 2
+    assert not [name for name in os.listdir(storage.TEMP_FOLDER) if name.endswith('.extract')]
+
+
+def test_extractor_process_is_not_forked_from_worker(tmp_path):
+    assert extraction._process_context.get_start_method() in ('forkserver', 'spawn')
+
+    path = tmp_path / 'notes.txt'
+    path.write_text('plain <b>text</b>')
+    assert extraction.extract_text(str(path), 'text', timeout=30) == 'plain text'
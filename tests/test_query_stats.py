@@ -0,0 +1,134 @@
+"""
+Per-request SQL instrumentation
+"""
+
+import json
+import re
+import pytest
+from flask import g, jsonify
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+import query_stats
+from config import config
+from models.categories import Categories
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    query_stats.instrument(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_failed_statement_leaves_no_timing_state(app, engine):
+    with app.test_request_context(), engine.connect() as conn:
+        g.sql_queries = query_stats.RequestQueries()
+        info_before = dict(conn.info)
+
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM missing_table'))
+        assert conn.info == info_before
+
+        conn.execute(text('SELECT 1'))
+        queries = g.sql_queries
+        assert queries.count == 1
+        assert queries.statements == {'SELECT 1': 1}
+        assert 0 <= queries.duration < 1
+
+
+@pytest.fixture
+def sql_config(monkeypatch):
+    monkeypatch.setattr(config, 'SQL_REPEAT_THRESHOLD', 5)
+    monkeypatch.setattr(config, 'SQL_QUERY_BUDGET', 0)
+    monkeypatch.setattr(config, 'SQL_STRICT', False)
+    monkeypatch.setattr(config, 'SQL_LOG_REQUESTS', False)
+    return lambda name, value: monkeypatch.setattr(config, name, value)
+
+
+@pytest.fixture
+def n_plus_one(app, monkeypatch):
+    """Serve GET /api/categories with one query per category, six in all."""
+    def view():
+        return jsonify([Categories.get_by_id(id) for id in range(1, 7)])
+    monkeypatch.setitem(app.view_functions, 'categories.get_all', view)
+    return view
+
+
+def _sql_log_lines(capsys):
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{')]
+    return [line for line in lines if line.get('event') == 'sql']
+
+
+def test_server_timing_header(client, sql_config, capsys):
+    response = client.get('/api/categories')
+
+    assert response.status_code == 200
+    match = re.fullmatch(
+        r'db;dur=[\d.]+;desc="(\d+) queries", app;dur=[\d.]+',
+        response.headers['Server-Timing']
+    )
+    assert match and int(match.group(1)) >= 1
+    assert _sql_log_lines(capsys) == []
+
+
+def test_log_every_request(client, sql_config, capsys):
+    sql_config('SQL_LOG_REQUESTS', True)
+
+    client.get('/api/categories')
+
+    [line] = _sql_log_lines(capsys)
+    assert line['path'] == '/api/categories'
+    assert line['endpoint'] == 'categories.get_all'
+    assert line['status'] == 200
+    assert line['queries'] >= 1
+    assert line['problems'] == []
+
+
+def test_repeated_statement_logged(client, sql_config, n_plus_one, capsys):
+    response = client.get('/api/categories')
+
+    assert response.status_code == 200
+    assert 'desc="6 queries"' in response.headers['Server-Timing']
+    [line] = _sql_log_lines(capsys)
+    assert line['method'] == 'GET'
+    assert line['queries'] == 6
+    [problem] = line['problems']
+    assert problem.startswith('statement repeated 6 times: SELECT')
+    assert 'categories' in problem
+
+
+def test_repeats_below_threshold_not_flagged(client, sql_config, n_plus_one, capsys):
+    sql_config('SQL_REPEAT_THRESHOLD', 7)
+
+    client.get('/api/categories')
+
+    assert _sql_log_lines(capsys) == []
+
+
+def test_strict_mode_raises(client, sql_config, n_plus_one):
+    sql_config('SQL_STRICT', True)
+
+    with pytest.raises(query_stats.QueryBudgetExceeded, match='GET /api/categories: statement repeated 6 times'):
+        client.get('/api/categories')
+
+
+def test_query_budget_decorator(app, client, sql_config, n_plus_one, monkeypatch, capsys):
+    sql_config('SQL_REPEAT_THRESHOLD', 100)
+    monkeypatch.setitem(app.view_functions, 'categories.get_all', query_stats.query_budget(2)(n_plus_one))
+
+    client.get('/api/categories')
+
+    [line] = _sql_log_lines(capsys)
+    assert line['problems'] == ['6 queries exceeds budget of 2']
+
+    # The decorator overrides the default budget either way
+    sql_config('SQL_QUERY_BUDGET', 1)
+    sql_config('SQL_STRICT', True)
+    monkeypatch.setitem(app.view_functions, 'categories.get_all', query_stats.query_budget(6)(n_plus_one))
+    assert client.get('/api/categories').status_code == 200
+
+    monkeypatch.setitem(app.view_functions, 'categories.get_all', n_plus_one)
+    with pytest.raises(query_stats.QueryBudgetExceeded, match='6 queries exceeds budget of 1'):
+        client.get('/api/categories')
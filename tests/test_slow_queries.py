@@ -0,0 +1,215 @@
+"""
+Slow query log
+"""
+
+import json
+import time
+from collections import deque
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from config import config
+import slow_queries
+
+
+@pytest.fixture
+def slow_config(monkeypatch):
+    monkeypatch.setattr(slow_queries, '_recent', deque(maxlen=10))
+    monkeypatch.setattr(config, 'SLOW_QUERY_MS', 50)
+    monkeypatch.setattr(config, 'SLOW_QUERY_EXPLAIN_SAMPLE', 0)
+    monkeypatch.setattr(config, 'SLOW_QUERY_LOG_FILE', '')
+    return lambda name, value: monkeypatch.setattr(config, name, value)
+
+
+@pytest.fixture
+def engine(slow_config, tmp_path):
+    # A file, so the EXPLAIN thread's connection sees the same database
+    engine = create_engine(f'sqlite:///{tmp_path}/slow.db')
+
+    @event.listens_for(engine, 'connect')
+    def add_sleep(dbapi_connection, connection_record):
+        dbapi_connection.create_function('sleep_ms', 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+    event.listen(engine, 'before_cursor_execute', slow_queries._before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', slow_queries._after_cursor_execute)
+    yield engine
+    engine.dispose()
+
+
+def _log_lines(capsys, kind):
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{')]
+    return [line for line in lines if line.get('event') == kind]
+
+
+def _wait_for_explains():
+    # Single worker thread: anything submitted before this has finished
+    slow_queries._get_executor().submit(lambda: None).result(timeout=10)
+
+
+def test_threshold(engine, capsys):
+    with engine.connect() as conn:
+        conn.execute(text('SELECT sleep_ms(1)'))
+        conn.execute(text('SELECT sleep_ms(80) AS slow'))
+
+    [entry] = slow_queries.recent()
+    assert entry['statement'] == 'SELECT sleep_ms(80) AS slow'
+    assert entry['duration_ms'] >= 50
+    assert entry['route'] == 'background'
+    assert entry['database'].endswith('slow.db')
+    assert entry['plan'] is None
+    [line] = _log_lines(capsys, 'slow_query')
+    assert line['id'] == entry['id']
+
+
+def test_log_file(engine, slow_config, tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'slow.jsonl'
+    slow_config('SLOW_QUERY_LOG_FILE', str(path))
+    monkeypatch.setattr(slow_queries, '_file_logger', None)
+
+    try:
+        with engine.connect() as conn:
+            conn.execute(text('SELECT sleep_ms(60)'))
+    finally:
+        for handler in slow_queries._file_logger.handlers:
+            handler.close()
+        slow_queries._file_logger.handlers.clear()
+
+    assert _log_lines(capsys, 'slow_query') == []
+    [line] = [json.loads(line) for line in path.read_text().splitlines()]
+    assert line['statement'] == 'SELECT sleep_ms(60)'
+
+
+def test_parameters_redacted(engine):
+    with engine.connect() as conn:
+        conn.execute(
+            text('SELECT sleep_ms(:ms), :email, :active, :score, :missing, :tags'),
+            {'ms': 60, 'email': 'someone@example.com', 'active': True, 'score': 1.5, 'missing': None, 'tags': 'ab'}
+        )
+
+    [entry] = slow_queries.recent()
+    assert entry['parameters'] == [60, '<redacted 19 chars>', 1, 1.5, None, '<redacted 2 chars>']
+    assert 'someone@example.com' not in json.dumps(entry)
+
+
+def test_redact():
+    assert slow_queries.redact({'id': 7, 'token': 'secret', 'blob': b'\x00\x01', 'ids': [1, 'x']}) == {
+        'id': 7,
+        'token': '<redacted 6 chars>',
+        'blob': '<redacted 2 chars>',
+        'ids': [1, '<redacted 1 chars>']
+    }
+    assert slow_queries.redact(('a', 2)) == ['<redacted 1 chars>', 2]
+    assert slow_queries.redact(object()) == '<redacted object>'
+
+
+def test_failed_statement_is_not_logged(engine):
+    with engine.connect() as conn:
+        info_before = dict(conn.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT sleep_ms(60) FROM missing_table'))
+        assert conn.info == info_before
+
+        conn.execute(text('SELECT 1'))
+
+    assert slow_queries.recent() == []
+
+
+def test_sampled_explain(engine, slow_config, capsys):
+    slow_config('SLOW_QUERY_EXPLAIN_SAMPLE', 1)
+
+    with engine.connect() as conn:
+        conn.execute(text('CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)'))
+        conn.execute(text("INSERT INTO t (name) VALUES (sleep_ms(60))"))
+        conn.commit()
+        conn.execute(text('SELECT name, sleep_ms(60) FROM t WHERE id = :id'), {'id': 1})
+    _wait_for_explains()
+
+    select, insert = slow_queries.recent()
+    assert insert['plan'] is None
+    assert 'SEARCH t USING INTEGER PRIMARY KEY' in select['plan']
+    [line] = _log_lines(capsys, 'slow_query_plan')
+    assert line == {'event': 'slow_query_plan', 'id': select['id'], 'plan': select['plan']}
+
+
+def test_unsampled_queries_not_explained(engine):
+    with engine.connect() as conn:
+        conn.execute(text('SELECT sleep_ms(60)'))
+    _wait_for_explains()
+
+    assert slow_queries.recent()[0]['plan'] is None
+
+
+class _RecordingConnection:
+    def __init__(self, fail=None):
+        self.executed = []
+        self.fail = fail
+        self.rolled_back = self.closed = False
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def execute(self, statement, parameters=None):
+                connection.executed.append((statement, parameters))
+                if connection.fail and statement.startswith('EXPLAIN'):
+                    raise connection.fail
+
+            def fetchall(self):
+                return [('Seq Scan on articles',), ('  Buffers: shared hit=1',)]
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize('fail', [None, RuntimeError('canceling statement due to statement timeout')])
+def test_postgresql_explain_is_read_only_with_timeout(slow_config, fail):
+    slow_config('SLOW_QUERY_EXPLAIN_TIMEOUT', 3)
+    raw = _RecordingConnection(fail)
+    engine = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'), raw_connection=lambda: raw)
+    slow_queries._recent.append({'id': 42, 'plan': None})
+
+    assert slow_queries._pending.acquire(blocking=False)
+    slow_queries._explain(engine, 'SELECT * FROM articles WHERE id = %(id)s', {'id': 1}, 42)
+
+    assert raw.executed[:2] == [('SET TRANSACTION READ ONLY', None), ('SET LOCAL statement_timeout = 3000', None)]
+    assert raw.executed[2] == ('EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM articles WHERE id = %(id)s', {'id': 1})
+    assert raw.rolled_back and raw.closed
+    plan = slow_queries.recent()[0]['plan']
+    if fail is None:
+        assert plan == 'Seq Scan on articles\n  Buffers: shared hit=1'
+    else:
+        assert plan == 'EXPLAIN failed: canceling statement due to statement timeout'
+    # The slot is released either way
+    for _ in range(slow_queries.MAX_PENDING_EXPLAINS):
+        assert slow_queries._pending.acquire(blocking=False)
+    for _ in range(slow_queries.MAX_PENDING_EXPLAINS):
+        slow_queries._pending.release()
+
+
+def test_admin_endpoint(client, admin_headers, slow_config):
+    slow_config('SLOW_QUERY_MS', 0.000001)  # every statement is slow
+
+    client.get('/api/categories')
+    response = client.get('/api/admin/slow-queries', headers=admin_headers)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['threshold_ms'] == 0.000001
+    routes = [entry['route'] for entry in body['queries']]
+    assert 'GET /api/categories (categories.get_all)' in routes
+    ids = [entry['id'] for entry in body['queries']]
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_admin_endpoint_requires_admin(client):
+    assert client.get('/api/admin/slow-queries').status_code == 401
@@ -0,0 +1,76 @@
+"""
+S3 storage backend against moto's in-process S3
+"""
+
+import os
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+moto = pytest.importorskip('moto')
+requests = pytest.importorskip('requests')
+
+import storage  # noqa: E402
+from config import config  # noqa: E402
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(config, 'S3_BUCKET', 'knowledge-repo-test')
+    monkeypatch.setattr(config, 'S3_ENDPOINT', None)
+    monkeypatch.setattr(config, 'S3_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setattr(config, 'S3_SECRET_ACCESS_KEY', 'testing')
+    with moto.mock_aws():
+        backend = storage.S3Storage()
+        backend.client.create_bucket(Bucket=config.S3_BUCKET)
+        yield backend
+
+
+def _staged(data):
+    os.makedirs(storage.TEMP_FOLDER, exist_ok=True)
+    path = os.path.join(storage.TEMP_FOLDER, 's3-test.tmp')
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_save_open_and_delete(s3):
+    relpath = storage.blob_path('ab' * 32, '.txt')
+    temp_path = _staged(b'hello object store')
+
+    s3.save(temp_path, relpath, 'text/plain')
+
+    assert not os.path.exists(temp_path)
+    assert s3.exists(relpath)
+    head = s3.client.head_object(Bucket=config.S3_BUCKET, Key=config.S3_KEY_PREFIX + relpath)
+    assert head['ContentType'] == 'text/plain'
+    with s3.open(relpath) as f:
+        assert f.read() == b'hello object store'
+
+    s3.delete(relpath)
+    assert not s3.exists(relpath)
+
+
+def test_presigned_download(s3):
+    relpath = storage.blob_path('cd' * 32, '.pdf')
+    s3.save(_staged(b'%PDF-1.4 test'), relpath, 'application/pdf')
+
+    url = s3.download_url(relpath, 'Résumé "final".pdf')
+    query = parse_qs(urlparse(url).query)
+    assert query['response-content-disposition'] == [
+        'inline; filename="Resume \\"final\\".pdf"; '
+        "filename*=UTF-8''R%C3%A9sum%C3%A9%20%22final%22.pdf"
+    ]
+
+    response = requests.get(url)
+    assert response.status_code == 200
+    assert response.content == b'%PDF-1.4 test'
+    assert response.headers['Content-Disposition'] == query['response-content-disposition'][0]
+
+
+@pytest.mark.parametrize('file_name, expected', [
+    ('report.pdf', 'inline; filename=report.pdf'),
+    ('a "b".pdf', 'inline; filename="a \\"b\\".pdf"'),
+    ('报告.docx', "inline; filename=.docx; filename*=UTF-8''%E6%8A%A5%E5%91%8A.docx")
+])
+def test_content_disposition(file_name, expected):
+    assert storage.content_disposition(file_name) == expected
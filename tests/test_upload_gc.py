@@ -0,0 +1,149 @@
+"""
+Upload garbage collection of unreferenced blobs
+"""
+
+import io
+import os
+import hashlib
+from datetime import datetime, timedelta
+import pytest
+import gc_uploads
+import storage
+from config import config
+from database import get_db
+from models.attachments import Attachments
+from models.blobs import Blobs
+from models.upload_sessions import UploadSessions
+from routes.attachments import place_upload
+from models.orm import Blob, UploadSession
+
+LONG_AGO = datetime.utcnow() - timedelta(days=30)
+
+
+def _stored_blob(sha256, data=b'image'):
+    relpath = storage.blob_path(sha256, '.png')
+    path = os.path.join(config.UPLOAD_FOLDER, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    db = get_db()
+    try:
+        db.add(Blob(sha256=sha256, path=relpath, size=len(data), ref_count=0, created_at=LONG_AGO, last_used_at=LONG_AGO))
+        db.commit()
+    finally:
+        db.close()
+    return path
+
+
+def _blob_exists(sha256):
+    return Blobs.get_path(sha256) is not None
+
+
+@pytest.fixture
+def gc(app):
+    return lambda **kw: gc_uploads.run_gc(grace_hours=24, **kw)
+
+
+def test_collects_unused_blob_after_commit(gc):
+    sha256 = '1' * 64
+    path = _stored_blob(sha256)
+
+    report = gc(dry_run=True)
+    assert report.counts['unreferenced blobs'] >= 1
+    assert _blob_exists(sha256) and os.path.exists(path)
+
+    gc()
+    assert not _blob_exists(sha256)
+    assert not os.path.exists(path)
+
+
+def test_reupload_restarts_grace_period(gc):
+    sha256 = '2' * 64
+    path = _stored_blob(sha256)
+
+    # Same content uploaded again as an inline image
+    Blobs.register(sha256, storage.blob_path(sha256, '.png'), 5, 'image/png')
+
+    gc()
+    assert _blob_exists(sha256)
+    assert os.path.exists(path)
+
+
+def test_keeps_blob_referenced_from_content(gc, client, admin_headers):
+    sha256 = '3' * 64
+    path = _stored_blob(sha256)
+    response = client.post('/api/articles', headers=admin_headers, json={
+        'title': 'GC reference',
+        'content': f'<img src="/uploads/{storage.blob_path(sha256, ".png")}">'
+    })
+    assert response.status_code == 201
+
+    gc()
+    assert _blob_exists(sha256)
+    assert os.path.exists(path)
+
+
+def test_duplicate_upload_racing_gc_stores_content_again(gc, client, admin_headers):
+    data = b'raced with the collector'
+    sha256 = hashlib.sha256(data).hexdigest()
+    stored = _stored_blob(sha256, data)
+
+    # The upload finds the blob already stored and keeps its staged copy...
+    temp_path, _, size = storage.stream_to_temp(io.BytesIO(data))
+    relpath, staged_path = place_upload(temp_path, sha256, 'raced.txt', 'text/plain')
+    assert staged_path == temp_path and os.path.exists(staged_path)
+
+    # ...then GC removes the blob before the attachment takes its reference
+    gc()
+    assert not _blob_exists(sha256) and not os.path.exists(stored)
+
+    attachment = Attachments.create_from_blob(sha256, relpath, file_name='raced.txt', size=size,
+                                              staged_path=staged_path)
+
+    assert attachment['url'] == f'/uploads/{relpath}'
+    with open(stored, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(staged_path)
+    assert client.get(attachment['url']).data == data
+
+
+def test_duplicate_upload_drops_staged_copy(app):
+    data = b'already stored'
+    sha256 = hashlib.sha256(data).hexdigest()
+    _stored_blob(sha256, data)
+
+    temp_path, _, size = storage.stream_to_temp(io.BytesIO(data))
+    relpath, staged_path = place_upload(temp_path, sha256, 'dup.txt', 'text/plain')
+    Attachments.create_from_blob(sha256, relpath, file_name='dup.txt', size=size, staged_path=staged_path)
+
+    assert not os.path.exists(staged_path)
+
+
+def _old_session(status, processing_started_at=None):
+    session = UploadSessions.create(None, 'old.bin', 4)
+    db = get_db()
+    try:
+        db.query(UploadSession).filter_by(id=session['id']).update({
+            'status': status, 'created_at': LONG_AGO, 'processing_started_at': processing_started_at
+        })
+        db.commit()
+    finally:
+        db.close()
+    with open(storage.session_part_path(session['id']), 'wb') as f:
+        f.write(b'data')
+    return session['id']
+
+
+def test_stale_sessions_skip_running_completions(gc):
+    abandoned = _old_session('open')
+    completing = _old_session('processing', datetime.utcnow())
+    interrupted = _old_session('processing', LONG_AGO)
+
+    gc()
+
+    assert UploadSessions.get_by_id(abandoned) is None
+    assert not os.path.exists(storage.session_part_path(abandoned))
+    assert UploadSessions.get_by_id(completing)['status'] == 'processing'
+    assert os.path.exists(storage.session_part_path(completing))
+    assert UploadSessions.get_by_id(interrupted) is None
@@ -0,0 +1,151 @@
+"""
+Resumable upload session tests: ordered chunk writes and background completion
+"""
+
+import os
+import time
+import fcntl
+import hashlib
+from datetime import datetime, timedelta
+import storage
+from database import get_db
+from models.orm import UploadSession
+
+
+def _create(client, headers, size):
+    response = client.post('/api/upload-sessions', headers=headers, json={'fileName': 'data.bin', 'size': size})
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def _put(client, headers, id, offset, data):
+    return client.put(f'/api/upload-sessions/{id}?offset={offset}', headers=headers, data=data)
+
+
+def _mark_processing(id, started_at):
+    """Leave a session as a completion job that was claimed at `started_at`."""
+    db = get_db()
+    try:
+        db.query(UploadSession).filter_by(id=id).update({'status': 'processing', 'processing_started_at': started_at})
+        db.commit()
+    finally:
+        db.close()
+
+
+def _wait_done(client, headers, id):
+    for _ in range(100):
+        status = client.get(f'/api/upload-sessions/{id}', headers=headers).get_json()
+        if status['status'] != 'processing':
+            return status
+        time.sleep(0.05)
+    raise AssertionError('upload session never finished processing')
+
+
+def test_chunks_then_background_completion(client, admin_headers):
+    data = os.urandom(300 * 1024)
+    id = _create(client, admin_headers, len(data))
+
+    assert _put(client, admin_headers, id, 0, data[:100 * 1024]).get_json()['offset'] == 100 * 1024
+    assert _put(client, admin_headers, id, 100 * 1024, data[100 * 1024:]).get_json()['offset'] == len(data)
+
+    response = client.post(f'/api/upload-sessions/{id}/complete', headers=admin_headers,
+                           json={'sha256': hashlib.sha256(data).hexdigest()})
+    assert response.status_code in (201, 202)
+
+    status = _wait_done(client, admin_headers, id)
+    assert status['status'] == 'complete'
+    assert status['attachment']['sha256'] == hashlib.sha256(data).hexdigest()
+    assert status['attachment']['size'] == len(data)
+
+    # Completing again reports the same result instead of redoing the work
+    again = client.post(f'/api/upload-sessions/{id}/complete', headers=admin_headers)
+    assert again.status_code == 201
+    assert again.get_json()['attachment']['id'] == status['attachment']['id']
+
+    # No more chunks once completed
+    assert _put(client, admin_headers, id, len(data), b'x').status_code == 409
+
+
+def test_offset_mismatch_reports_resume_point(client, admin_headers):
+    id = _create(client, admin_headers, 10)
+    _put(client, admin_headers, id, 0, b'abcd')
+
+    response = _put(client, admin_headers, id, 0, b'abcd')
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 4
+
+
+def test_chunk_rejected_while_another_is_being_written(client, admin_headers):
+    id = _create(client, admin_headers, 10)
+    _put(client, admin_headers, id, 0, b'abcd')
+    part_path = storage.session_part_path(id)
+
+    # The original request is still streaming and holds the staging file lock
+    with open(part_path, 'r+b') as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        response = _put(client, admin_headers, id, 4, b'efgh')
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+    assert storage.staged_size(part_path) == 4
+
+    assert _put(client, admin_headers, id, 4, b'efgh').get_json()['offset'] == 8
+    with open(part_path, 'rb') as f:
+        assert f.read() == b'abcdefgh'
+
+
+def test_checksum_mismatch_fails_session(client, admin_headers):
+    id = _create(client, admin_headers, 4)
+    _put(client, admin_headers, id, 0, b'abcd')
+
+    response = client.post(f'/api/upload-sessions/{id}/complete', headers=admin_headers, json={'sha256': '0' * 64})
+    assert response.status_code in (202, 422)
+
+    status = _wait_done(client, admin_headers, id)
+    assert status['status'] == 'failed'
+    assert status['error'] == 'Checksum mismatch'
+    assert not os.path.exists(storage.session_part_path(id))
+
+
+def test_incomplete_upload_cannot_complete(client, admin_headers):
+    id = _create(client, admin_headers, 10)
+    _put(client, admin_headers, id, 0, b'abcd')
+
+    response = client.post(f'/api/upload-sessions/{id}/complete', headers=admin_headers)
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 4
+
+
+def test_processing_session_cannot_be_aborted(client, admin_headers):
+    id = _create(client, admin_headers, 4)
+    _put(client, admin_headers, id, 0, b'abcd')
+    _mark_processing(id, datetime.utcnow())
+
+    response = client.delete(f'/api/upload-sessions/{id}', headers=admin_headers)
+    assert response.status_code == 409
+    assert client.post(f'/api/upload-sessions/{id}/complete', headers=admin_headers).status_code == 202
+
+
+def test_interrupted_completion_is_retried(client, admin_headers):
+    data = b'interrupted'
+    id = _create(client, admin_headers, len(data))
+    _put(client, admin_headers, id, 0, data)
+    # The worker running the completion job restarted long ago
+    _mark_processing(id, datetime.utcnow() - timedelta(days=1))
+
+    response = client.post(f'/api/upload-sessions/{id}/complete', headers=admin_headers)
+    assert response.status_code in (201, 202)
+
+    status = _wait_done(client, admin_headers, id)
+    assert status['status'] == 'complete'
+    assert status['attachment']['sha256'] == hashlib.sha256(data).hexdigest()
+
+
+def test_interrupted_session_can_be_aborted(client, admin_headers):
+    id = _create(client, admin_headers, 4)
+    _put(client, admin_headers, id, 0, b'abcd')
+    _mark_processing(id, None)  # claimed before start times were recorded
+
+    response = client.delete(f'/api/upload-sessions/{id}', headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get(f'/api/upload-sessions/{id}', headers=admin_headers).status_code == 404
+    assert not os.path.exists(storage.session_part_path(id))
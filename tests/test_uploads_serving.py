@@ -0,0 +1,101 @@
+"""
+Serving locally stored uploads: ETag, conditional and range requests, and
+proxy offload
+"""
+
+import hashlib
+import os
+import pytest
+import storage
+from config import config
+
+CONTENT = b'0123456789' * 100
+
+
+@pytest.fixture
+def blob(app):
+    sha256 = hashlib.sha256(CONTENT).hexdigest()
+    relpath = storage.blob_path(sha256, '.txt')
+    path = os.path.join(config.UPLOAD_FOLDER, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(CONTENT)
+    return relpath
+
+
+@pytest.fixture
+def offload(monkeypatch):
+    def set_offload(mode):
+        monkeypatch.setattr(config, 'UPLOAD_OFFLOAD', mode)
+    return set_offload
+
+
+def test_serves_immutable_blob_with_etag(client, blob):
+    response = client.get(f'/uploads/{blob}')
+
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.get_etag() == (storage.content_etag(blob), False)
+    assert 'immutable' in response.headers['Cache-Control']
+
+
+def test_if_none_match_returns_304(client, blob):
+    etag = client.get(f'/uploads/{blob}').headers['ETag']
+
+    response = client.get(f'/uploads/{blob}', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_range_request_returns_206(client, blob):
+    response = client.get(f'/uploads/{blob}', headers={'Range': 'bytes=10-19'})
+
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(CONTENT)}'
+    assert response.data == CONTENT[10:20]
+
+
+def test_staged_uploads_are_hidden(client, blob):
+    assert client.get('/uploads/.tmp/anything').status_code == 404
+
+
+def test_x_accel_redirect(client, blob, offload):
+    offload('x-accel-redirect')
+
+    response = client.get(f'/uploads/{blob}')
+
+    assert response.status_code == 200
+    assert response.headers['X-Accel-Redirect'] == config.UPLOAD_ACCEL_PREFIX + blob
+    assert response.data == b''
+    assert response.mimetype == 'text/plain'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert client.get('/uploads/missing.txt').status_code == 404
+
+
+def test_x_sendfile(client, blob, offload):
+    offload('x-sendfile')
+
+    response = client.get(f'/uploads/{blob}')
+
+    assert response.status_code == 200
+    assert response.headers['X-Sendfile'] == os.path.join(config.UPLOAD_FOLDER, blob)
+    assert response.get_etag() == (storage.content_etag(blob), False)
+
+
+@pytest.mark.parametrize('path', [
+    '/uploads/ab/../.tmp/{name}',
+    '/uploads/ab/%2E%2E/.tmp/{name}',
+    '/uploads/ab/cd/../../.tmp/{name}',
+    '/uploads/.tmp/{name}'
+])
+def test_staged_uploads_unreachable_by_traversal(client, path):
+    os.makedirs(storage.TEMP_FOLDER, exist_ok=True)
+    name = 'traversal-test.part'
+    with open(os.path.join(storage.TEMP_FOLDER, name), 'wb') as f:
+        f.write(b'unfinished upload')
+
+    response = client.get(path.format(name=name))
+
+    assert response.status_code == 404
+    assert b'unfinished upload' not in response.data